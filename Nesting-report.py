@@ -1,8 +1,18 @@
 import os
+import shutil
+import hashlib
+import json
 import datetime
 import configparser
+import queue
+import tempfile
+import threading
+from array import array
+from collections import namedtuple, OrderedDict, Counter
 import ewd
 import subprocess
+from html import escape
+from concurrent.futures import ThreadPoolExecutor
 from ewd import groups
 from company import gdb
 from company import dlg
@@ -13,6 +23,234 @@ import sclcore
 from sclcore import do_debug
 from sclcore import execute_command_bool as exec_bool
 import config
+import report_profile
+import report_history
+import report_export
+import report_upload
+try:
+    import numpy
+except ImportError:   #optional: without numpy the totals of the groups are summed in a Python loop (see SheetTable)
+    numpy = None
+try:
+    import pypdf
+except ImportError:   #optional: without pypdf the combined report is joined from the HTML of the groups and converted once more, a large report in one piece
+    pypdf = None
+
+
+PREVIEW_CACHE_FOLDER = '.preview_cache'   #inside general_folder, so it survives deleting the project folder
+PREVIEW_CACHE_MAX_SIZE = 500 * 1024 * 1024   #bytes, the least recently used previews are deleted above this size
+PDF_CONVERSION_WORKERS = max(1, min(4, (os.cpu_count() or 2) // 2))   #how many PDFs are converted at the same time
+REPORT_MANIFEST_NAME = 'report_manifest.json'   #written into the project folder in the incremental mode
+HTML_WRITE_BUFFER = 1024 * 1024   #bytes, the HTML files are flushed in chunks of this size
+MAX_OPEN_GROUP_FILES = 32   #how many HTML files of the material-thickness groups are kept open while the sheets stream in
+HTML_FORMAT_WORKERS = 2   #threads that format the pages, while the host thread takes the next previews (and copies them into the cache)
+PIPELINE_QUEUE_SIZE = 64   #pages that may wait for the writer thread; if it falls behind, the host thread waits (backpressure)
+PDF_CHUNK_PAGES = 200   #sheet pages per chunk: a larger combined report is converted in chunks in parallel and joined (needs pypdf)
+PART_PAGES = max(1, PDF_CHUNK_PAGES // 4)   #sheet pages per part file of a group in the combined report, so the chunks are at least 3/4 full
+
+#compact_layout: several sheets per page, packed by their measured heights (in pt, for the fonts of .compact-sheet in the CSS)
+COMPACT_PAGE_HEIGHT = 760   #usable height of an A4 page, when the browser prints it with its default margins
+COMPACT_PAGE_HEADER_HEIGHT = 60   #logo and project name, once per page
+COMPACT_SHEET_HEIGHT = 100   #the rows of the sheet name and sizes, the efficiency table and the margins of one sheet
+COMPACT_ROW_HEIGHT = 13   #one row of the piece table
+COMPACT_PICTURE_SCALE = 0.15   #pt per mm of the sheet, so a small offcut gets a small picture
+COMPACT_PICTURE_MIN_HEIGHT = 40   #smaller pictures are enlarged to this height
+COMPACT_PICTURE_MAX_WIDTH = 480   #larger pictures are reduced to fit into this box, with the aspect of the sheet
+COMPACT_PICTURE_MAX_HEIGHT = 150
+STAGING_FOLDER_MARK = '.staging-'   #the new report is built in ".<project>.staging-<id>" inside general_folder and then renamed to <project>
+TOMBSTONE_FOLDER_MARK = '.deleted-'   #the replaced report is renamed to ".<project>.deleted-<id>" and deleted in the background
+LOCAL_BUILD_FOLDER = 'nesting_report_build'   #inside the temp folder: with local_build the report is built there and then uploaded to report_pfad
+
+
+#HTML templates: they are parsed once, the render_* functions below are their bound format methods
+PAGE_BREAK_HTML = '\n<DIV class="page-break-after"></DIV>\n'
+
+#logo and project name at the top of a page
+PAGE_HEADER_TEMPLATE = (
+    '    <HEADER style="display: inline-block; width: 100%; text-align: left;">\n'
+    '        <IMG src="file:///{logo}" alt="company Logo" style="vertical-align: middle; width: 60px; height: 60px; margin: 0 10px 15px 0;">\n'
+    '        <SPAN style="font-size: 35px; padding: 0 0 8px 0;">Projekt: {project} </SPAN>\n'
+    '    </HEADER>\n'
+)
+
+#page_header is empty for a sheet, that follows another one on the same page (compact_layout)
+SHEET_HEADER_TEMPLATE = (
+    ' {page_break}{page_header}'
+    '\n    <DIV class="{container_class}">\n'
+    '    <TABLE class="mainTable">\n'
+    '        <TR>\n            <TD style="font-size:30px" colspan="6">{sheet}{repeat}</TD>\n'
+    '            <TD colspan="4" class="right-align">{date}</TD>\n        </TR>\n'
+    """
+        <TR>
+            <TD align="middle">Breite</TD>
+            <TD align="middle">{width}</TD>
+            <TD align="middle">Höhe</TD>
+            <TD align="middle">{height}</TD>
+            <TD align="middle">Stärke</TD>
+            <TD align="middle">{thickness}</TD>
+            <TD align="middle">Material</TD>
+            <TD align="middle">{material}</TD>
+        </TR>
+
+    """
+    '   <TR>\n      <TD colspan="10">\n         {picture}\n     </TD>\n        </TR>\n'
+)
+
+#after the sheet name, if the page stands for several identical sheets (dedupe_layouts)
+REPEAT_TEMPLATE = '&nbsp;&nbsp;&times;&nbsp;{count}'
+
+#the image path is relative to the HTML file, so the report folder can be moved (see publish_report_folder())
+PICTURE_TEMPLATE = '<IMG src="{img_path}" {size_img}>'
+
+#the image keeps the unrotated size (box_height x box_width) and is turned around the center of the box
+ROTATED_PICTURE_TEMPLATE = (
+    '<DIV class="rotated-picture" style="width: {box_width}pt; height: {box_height}pt;">'
+    '<IMG src="{img_path}" style="width: {box_height}pt; height: {box_width}pt;">'
+    '</DIV>'
+)
+
+#vector preview (svg_preview): drawn from the sizes and positions of the pieces, the colors are in the CSS (.sheet-preview)
+SVG_PICTURE_TEMPLATE = (
+    '<SVG class="sheet-preview" xmlns="http://www.w3.org/2000/svg" style="width: {box_width}pt; height: {box_height}pt;" viewBox="0 0 {view_width} {view_height}">'
+    '<g transform="{transform}">'
+    '<rect class="sheet" x="0" y="0" width="{sheet_width}" height="{sheet_height}"/>'
+    '{pieces}'
+    '</g></SVG>'
+)
+
+SVG_PIECE_TEMPLATE = '<rect class="piece" x="{x}" y="{y}" width="{width}" height="{height}"/>'
+
+SVG_LABEL_TEMPLATE = '<text x="{x}" y="{y}" font-size="{font_size}">{label}</text>'
+
+PIECE_ROW_TEMPLATE = """
+        <TR class="adjustable-table" style="width: 100%;">
+            <TD align="middle">Nr.</TD>
+            <TD align="middle">{0}</TD>
+            <TD align="middle">Bezeichnung</TD>
+            <TD align="middle">{1}</TD>
+            <TD align="middle">Breite</TD>
+            <TD align="middle">{2}</TD>
+            <TD align="middle">Höhe</TD>
+            <TD align="middle">{3}</TD>
+        </TR>
+
+        """
+
+#aggregate_pieces: one row for all pieces with the same label and size
+PIECE_GROUP_ROW_TEMPLATE = """
+        <TR class="adjustable-table" style="width: 100%;">
+            <TD align="middle">Anzahl</TD>
+            <TD align="middle">{count}</TD>
+            <TD align="middle">Bezeichnung</TD>
+            <TD align="middle">{label}</TD>
+            <TD align="middle">Breite</TD>
+            <TD align="middle">{width}</TD>
+            <TD align="middle">Höhe</TD>
+            <TD align="middle">{height}</TD>
+        </TR>
+
+        """
+
+#pieces_appendix: the rows of every single piece, on their own page(s) after the sheet
+PIECES_APPENDIX_TEMPLATE = (
+    '{page_break}'
+    '    <DIV>\n'
+    '    <TABLE>\n'
+    '        <TR>\n            <TD style="font-size:20px" colspan="8">Anhang: Teileliste {sheet}</TD>\n        </TR>\n'
+    '{rows}'
+    '    </TABLE>\n'
+    '    </DIV>\n'
+)
+
+EFFICIENCY_TEMPLATE = """
+    <TABLE class="adjustable-table">
+        <TH colspan="3" class="center-text">Effizienzbericht</TH>
+        <TR>
+            <TD>Gutteile</TD>
+            <TH colspan="2" align="left">{pieces}</TH>
+        </TR>
+        <TR>
+            <TD>Fläche der Platte</TD>
+            <TH colspan="2" align="left">{area} m²</TH>
+        </TR>
+        <TR>
+            <TD class="green">Wiederverwendbares Material</TD>
+            <TD class="green">{reusable_area} m²</TD>
+            <TD class="green td-right">{reusable}% der Platte</TD>
+        </TR>
+        <TR>
+            <TD class="grey">Nicht wiederverwendbares Material</TD>
+            <TD class="grey">{leftover_area} m²</TD>
+            <TD class="grey td-right">{leftover}% der Platte</TD>
+        </TR>
+    </TABLE>
+"""
+
+GEB_HEADER_TEMPLATE = (
+    '<HEADER style="display: block; width: 100%; text-align: left;">\n'
+    '<IMG src="file:///{logo}" alt="company Logo" style="vertical-align: middle; width: 60px; height: 60px; margin: 0 10px 15px 0;">\n'
+    '<SPAN style="font-size: 35px; padding: 0 0 8px 0; ">Projekt: {project} </SPAN>\n'
+    '</HEADER>\n'
+)
+
+GEB_TABLE_TEMPLATE = """
+    <TABLE id="thick-border" class="adjustable-table">
+        <TH colspan="3" class="center-text">Gesamtwirkungsgradbericht</TH>
+
+        <TR>
+            <TH align="left">Material und Dicke</TH>
+            <TD colspan="2" align="left">{material}   {thickness} mm</TD>
+        </TR>
+
+        <TR>
+            <TH align="left">Anzahl Sheets</TH>
+            <TH colspan="2" align="left">{number_of_sheets}</TH>
+        </TR>
+
+        <TR>
+            <TD>Gesamtfläche</TD>
+            <TH colspan="2" align="left">{total_area} m²</TH>
+        </TR>
+
+        <TR>
+            <TD class="green">Gesamt wiederverwendbares Material</TD>
+            <TD class="green">{total_reusable_material} m²</TD>
+            <TD class="green td-right">{total_reusable_percent} %</TD>
+        </TR>            
+        <TR>
+            <TD class="grey">Gesamt nicht wiederverwendbares Material</TD>
+            <TD class="grey">{total_non_reusable_material} m²</TD>
+            <TD class="grey td-right">{total_non_reusable_percent} %</TD>
+        </TR>
+
+        <TR>
+            <TD class="green">Wiederverwendbares Material pro Platte im Durchschnitt:</TD>
+            <TD class="green">{average_reusable_material} m²</TD>
+            <TD class="green td-right">{average_reusable}%</TD>
+        </TR>
+
+        <TR>
+            <TD class="grey">Nicht wiederverwendbares Material pro Platte im Durchschnitt</TD>
+            <TD class="grey">{average_non_reusable_material} m²</TD>
+            <TD class="grey td-right">{average_garbage}%</TD>
+        </TR>
+    </TABLE>
+            """
+
+render_page_header = PAGE_HEADER_TEMPLATE.format
+render_sheet_header = SHEET_HEADER_TEMPLATE.format
+render_repeat = REPEAT_TEMPLATE.format
+render_picture_tag = PICTURE_TEMPLATE.format
+render_rotated_picture_tag = ROTATED_PICTURE_TEMPLATE.format
+render_svg_picture_tag = SVG_PICTURE_TEMPLATE.format
+render_svg_piece = SVG_PIECE_TEMPLATE.format
+render_svg_label = SVG_LABEL_TEMPLATE.format
+render_piece_row = PIECE_ROW_TEMPLATE.format
+render_piece_group_row = PIECE_GROUP_ROW_TEMPLATE.format
+render_pieces_appendix_tag = PIECES_APPENDIX_TEMPLATE.format
+render_efficiency_table = EFFICIENCY_TEMPLATE.format
+render_GEB_header = GEB_HEADER_TEMPLATE.format
+render_GEB_table = GEB_TABLE_TEMPLATE.format
 
 
 class ReportSheet():
@@ -29,16 +267,936 @@ class ReportSheet():
     :type area: float
     :param counter_sheet_in_sheets: the index of this sheet among sheets in sheets_to_report (sheets_to_report are values of the key [material, thickness])
     :type counter_sheet_in_sheets: int
-    :param img_path: the file path to an image of the sheet
+    :param img_path: the path of the image of the sheet, relative to the report folder
     :type img_path: str
+    :param snapshot: all the properties of the sheet, read once from nest
+    :type snapshot: SheetSnapshot
+    :param pieces: the pieces of the sheet
+    :type pieces: PieceTable
+    :param count: the number of identical sheets this page stands for
+    :type count: int
     """
-    def __init__(self, sheet, mat_leftover, mat_reusable, area, counter_sheet_in_sheets, img_path):
+    __slots__ = ('sheet', 'mat_leftover', 'mat_reusable', 'area', 'counter_sheet_in_sheets', 'img_path', 'snapshot', 'pieces', 'count')   #no __dict__ per sheet
+
+    def __init__(self, sheet, mat_leftover, mat_reusable, area, counter_sheet_in_sheets, img_path, snapshot, pieces, count=1):
         self.sheet = sheet
         self.mat_leftover = mat_leftover
         self.mat_reusable = mat_reusable
         self.area = area
         self.counter_sheet_in_sheets = counter_sheet_in_sheets   #index of this sheet among sheets_to_report
         self.img_path = img_path
+        self.snapshot = snapshot
+        self.pieces = pieces
+        self.count = count
+
+
+class SheetSnapshot(namedtuple('SheetSnapshot', ['sheet', 'material', 'thickness', 'width', 'height', 'area', 'mat_reusable', 'mat_leftover', 'pieces_number'])):
+    """
+    Immutable record of every sheet property the report needs. It is read once per sheet by take_sheet_snapshot(),
+    so the later stages (sorting, statistics, HTML) don't have to call nest.get_sheet_property() again.
+
+    Attributes:
+        sheet (str): the name of the sheet
+        material (str): the name of the material of the sheet
+        thickness (float): the thickness of the sheet in millimeters
+        width (float): the width of the sheet in millimeters
+        height (float): the height of the sheet in millimeters
+        area (float): the total area of the sheet in square meters
+        mat_reusable (float): the percentage of material that is reusable for this sheet
+        mat_leftover (float): the percentage of material that is not reusable for this sheet
+        pieces_number (float): the number of pieces on the sheet
+    """
+    __slots__ = ()
+
+
+class PieceTable:
+    """
+    The pieces of one sheet, column by column: the sizes and positions are kept in compact arrays of floats instead of
+    one tuple per piece. It's read once per sheet by read_piece_table() and shared by everything that needs the pieces
+    (fingerprints, SVG preview, piece rows, aggregation). Iterating over it gives (label, width, height, x, y) per piece.
+
+    Attributes:
+        labels (list): the label of every piece
+        widths (array): the width of every piece in millimeters
+        heights (array): the height of every piece in millimeters
+        xs (array): the x position (lower left corner) of every piece in millimeters
+        ys (array): the y position (lower left corner) of every piece in millimeters
+    """
+    __slots__ = ('labels', 'widths', 'heights', 'xs', 'ys')
+
+    def __init__(self):
+        self.labels = []
+        self.widths = array('d')
+        self.heights = array('d')
+        self.xs = array('d')
+        self.ys = array('d')
+
+
+    def append(self, label, width, height, x, y):
+        self.labels.append(label)
+        self.widths.append(width)
+        self.heights.append(height)
+        self.xs.append(x)
+        self.ys.append(y)
+
+
+    def __len__(self):
+        return len(self.labels)
+
+
+    def __iter__(self):
+        return zip(self.labels, self.widths, self.heights, self.xs, self.ys)
+
+
+class PieceListOptions(namedtuple('PieceListOptions', ['aggregate', 'sort_by_area', 'appendix'])):
+    """
+    How the pieces of a sheet are listed on its page, from the config.
+
+    Attributes:
+        aggregate (bool): whether the pieces with the same label and size are shown in one row with their count (aggregate_pieces)
+        sort_by_area (bool): whether the aggregated rows are sorted by their total area instead of their count (sort_pieces_by_area)
+        appendix (bool): whether the single pieces follow the aggregated rows in an appendix (pieces_appendix)
+    """
+    __slots__ = ()
+
+
+class PieceTableCache:
+    """
+    Keeps the piece tables of the sheets, whose pieces are needed by more than one stage (e.g. the hashes in the incremental mode 
+    and later the page), so the pieces of a sheet are read from the host only once per run.
+    The last stage, that needs the pieces of a sheet, takes its table out of the cache, so it doesn't grow with the whole project.
+
+    Attributes:
+        tables (dict): sheet name -> PieceTable
+    """
+
+    def __init__(self):
+        self.tables = {}
+
+
+    def get(self, sheet):
+        """
+        :param sheet: the name of the sheet
+        :type sheet: str
+        :return: the pieces of the sheet, read from the host at the first call and kept for the next stage
+        :rtype: PieceTable
+        """
+        table = self.tables.get(sheet)
+        if table is None:
+            table = self.tables[sheet] = read_piece_table(sheet)
+        return table
+
+
+    def take(self, sheet):
+        """
+        :param sheet: the name of the sheet
+        :type sheet: str
+        :return: the pieces of the sheet, which are removed from the cache (or read from the host, if they were not in it)
+        :rtype: PieceTable
+        """
+        table = self.tables.pop(sheet, None)
+        if table is None:
+            table = read_piece_table(sheet)
+        return table
+
+
+class ReportConfig(namedtuple('ReportConfig', ['do_report', 'rotate', 'general_folder', 'nice_design', 'remove_color_fill', 'reports_pdfs_together', 'divide_material',
+                                               'auto_open', 'open_all', 'browser_path', 'ewd_file', 'show_warning_delete_folder', 'incremental', 'profile', 'svg_preview', 'dedupe_layouts',
+                                               'aggregate_pieces', 'sort_pieces_by_area', 'pieces_appendix', 'history', 'export_csv', 'export_jsonl', 'export_parquet', 'export_only', 'summary_only',
+                                               'local_build', 'combined_report', 'compact_layout'])):
+    """
+    The settings from config.ini, as returned by read_config_ini() (see there for the meaning of the fields).
+    It can be unpacked like a tuple; single settings can be overridden with _replace(), e.g. by the batch mode.
+    """
+    __slots__ = ()
+
+
+class PreviewCache:
+    """
+    Persistent cache of sheet previews. The previews are stored under the fingerprint of the sheet layout 
+    (see sheet_fingerprint()), so a sheet that did not change since the last run doesn't have to be rendered again.
+    If the cache gets bigger than max_size, the least recently used previews are deleted.
+
+    Attributes:
+        cache_folder (str): the folder where the cached previews are stored
+        max_size (int): the maximal total size of the cached previews in bytes
+        entries (dict): file name -> [last use time, size in bytes] of every cached preview
+        total_size (int): the total size of the cached previews in bytes
+    """
+
+    def __init__(self, cache_folder, max_size):
+        """
+        Initializes the PreviewCache and collects the previews that are already in the cache folder.
+
+        :param cache_folder: the folder where the cached previews are stored
+        :type cache_folder: str
+        :param max_size: the maximal total size of the cached previews in bytes
+        :type max_size: int
+        """
+        self.cache_folder = cache_folder
+        self.max_size = max_size
+        self.entries = {}
+        self.total_size = 0
+
+        os.makedirs(cache_folder, exist_ok=True)
+        for entry in os.scandir(cache_folder):
+            if entry.is_file():
+                stat = entry.stat()
+                self.entries[entry.name] = [stat.st_mtime, stat.st_size]
+                self.total_size += stat.st_size
+
+
+    def fetch(self, fingerprint, img_ext, img_path):
+        """
+        Copies the cached preview with this fingerprint to img_path.
+
+        :param fingerprint: the fingerprint of the sheet layout
+        :type fingerprint: str
+        :param img_ext: the file extension of the preview (e.g., '.jpg')
+        :type img_ext: str
+        :param img_path: where the preview should be copied to
+        :type img_path: str
+        :return: True if the preview was in the cache, False if it has to be rendered
+        :rtype: bool
+        """
+        name = f"{fingerprint}{img_ext}"
+        if name not in self.entries:
+            return False
+
+        cached_path = os.path.join(self.cache_folder, name)
+        try:
+            shutil.copyfile(cached_path, img_path)
+            os.utime(cached_path, None)   #mark as recently used
+        except OSError:
+            self.forget(name)
+            return False
+
+        self.entries[name][0] = datetime.datetime.now().timestamp()
+        return True
+
+
+    def store(self, fingerprint, img_ext, img_path):
+        """
+        Copies a freshly rendered preview into the cache and deletes the least recently used previews, if the cache is too big.
+
+        :param fingerprint: the fingerprint of the sheet layout
+        :type fingerprint: str
+        :param img_ext: the file extension of the preview (e.g., '.jpg')
+        :type img_ext: str
+        :param img_path: the rendered preview
+        :type img_path: str
+        """
+        name = f"{fingerprint}{img_ext}"
+        cached_path = os.path.join(self.cache_folder, name)
+        temp_path = f"{cached_path}.{os.getpid()}.tmp"   #per process: the batch mode shares the cache between processes
+        try:
+            shutil.copyfile(img_path, temp_path)
+            os.replace(temp_path, cached_path)   #so a half-written preview is never in the cache
+            size = os.path.getsize(cached_path)
+        except OSError:
+            return
+
+        self.forget(name, delete=False)
+        self.entries[name] = [datetime.datetime.now().timestamp(), size]
+        self.total_size += size
+        self.evict()
+
+
+    def forget(self, name, delete=True):
+        """
+        Removes one preview from the cache.
+
+        :param name: the file name of the cached preview
+        :type name: str
+        :param delete: whether the file should be deleted too
+        :type delete: bool
+        """
+        entry = self.entries.pop(name, None)
+        if entry is None:
+            return
+        self.total_size -= entry[1]
+        if delete:
+            try:
+                os.remove(os.path.join(self.cache_folder, name))
+            except OSError:
+                pass
+
+
+    def evict(self):
+        """
+        Deletes the least recently used previews until the cache is not bigger than max_size.
+        """
+        if self.total_size <= self.max_size:
+            return
+        for name in sorted(self.entries, key=lambda name: self.entries[name][0]):
+            self.forget(name)
+            if self.total_size <= self.max_size:
+                break
+
+
+class PdfScheduler:
+    """
+    Converts finished HTML files to PDF in the background, so the HTML of the next material-thickness group 
+    can be written meanwhile. Every conversion runs in its own browser process, at most max_workers at the same time.
+
+    Attributes:
+        browser_path (str): the file path to the browser executable, which converts the HTML files
+        executor (ThreadPoolExecutor): starts the conversions and waits for them
+        jobs (list): (output_pdf, future) of every queued conversion
+    """
+
+    def __init__(self, browser_path, max_workers):
+        """
+        Initializes the PdfScheduler.
+
+        :param browser_path: the file path to the browser executable, which converts the HTML files
+        :type browser_path: str
+        :param max_workers: the maximal number of conversions running at the same time
+        :type max_workers: int
+        """
+        self.browser_path = browser_path
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.jobs = []
+
+
+    def submit(self, report_file_path, output_pdf):
+        """
+        Queues a finished HTML file for the conversion to PDF.
+
+        :param report_file_path: the finished HTML file
+        :type report_file_path: str
+        :param output_pdf: the PDF file to be created
+        :type output_pdf: str
+        """
+        future = self.executor.submit(to_pdf, report_file_path, output_pdf, self.browser_path)
+        self.jobs.append((output_pdf, future))
+
+
+    def submit_concatenation(self, input_pdfs, output_pdf, temporary_files=()):
+        """
+        Queues the concatenation of PDFs into one PDF (needs pypdf). It starts, when the conversions of the
+        input PDFs, that are queued, are finished; if one of them failed, the concatenation fails too.
+
+        :param input_pdfs: the PDF files, in the order of their pages in output_pdf
+        :type input_pdfs: list
+        :param output_pdf: the PDF file to be created
+        :type output_pdf: str
+        :param temporary_files: the files, that are deleted after the concatenation (also if it failed), e.g. the chunks
+        :type temporary_files: list
+        """
+        inputs = set(input_pdfs)
+        #the conversions were queued before, so they are running or done, when a worker takes this job
+        pending = [future for queued_pdf, future in self.jobs if queued_pdf in inputs]
+
+        def concatenate():
+            try:
+                for future in pending:
+                    future.result()
+                concatenate_pdfs(input_pdfs, output_pdf)
+            finally:
+                for path in temporary_files:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+        self.jobs.append((output_pdf, self.executor.submit(concatenate)))
+
+
+    def wait(self):
+        """
+        Waits until all queued conversions are finished.
+
+        :return: a list of (output_pdf, error) for every conversion that failed
+        :rtype: list
+        """
+        errors = []
+        for output_pdf, future in self.jobs:
+            try:
+                future.result()
+            except Exception as e:
+                errors.append((output_pdf, e))
+        self.executor.shutdown()
+        self.jobs = []
+        return errors
+
+
+class ReportManifest:
+    """
+    Describes what was generated into the project folder, so that the incremental mode can regenerate only the 
+    material-thickness groups that changed since the last run. The manifest is stored as JSON in the project folder.
+
+    Attributes:
+        folder (str): the project folder with the reports
+        flags (dict): the config flags that change the output (nice_design, rotate, reports_pdfs_together, divide_material)
+        groups (dict): "material_thickness" -> {"hash": hash of the group, "files": [file names]} for every group 
+            (in the divided report also "pages": [start, end] of the pages in its HTML file, for the combined report)
+        files (list): the file names that don't belong to one group (the combined report, the Gesamteffizienzbericht)
+    """
+
+    def __init__(self, folder, flags):
+        """
+        Initializes an empty ReportManifest.
+
+        :param folder: the project folder with the reports
+        :type folder: str
+        :param flags: the config flags that change the output
+        :type flags: dict
+        """
+        self.folder = folder
+        self.flags = flags
+        self.groups = {}
+        self.files = []
+
+
+    @classmethod
+    def load(cls, folder, flags):
+        """
+        Loads the manifest of the last run from the project folder.
+
+        :param folder: the project folder with the reports
+        :type folder: str
+        :param flags: the config flags of this run
+        :type flags: dict
+        :return: the manifest of the last run, or None if there is none or if it was made with other flags
+        :rtype: ReportManifest
+        """
+        try:
+            with open(os.path.join(folder, REPORT_MANIFEST_NAME), 'r', encoding='utf-8') as manifest_file:
+                data = json.load(manifest_file)
+        except (OSError, ValueError):
+            return None
+
+        if data.get('flags') != flags:
+            return None
+
+        manifest = cls(folder, flags)
+        manifest.groups = data.get('groups', {})
+        manifest.files = data.get('files', [])
+        return manifest
+
+
+    def save(self):
+        """
+        Writes the manifest into the project folder.
+        """
+        data = {'flags': self.flags, 'groups': self.groups, 'files': self.files}
+        with open(os.path.join(self.folder, REPORT_MANIFEST_NAME), 'w', encoding='utf-8') as manifest_file:
+            json.dump(data, manifest_file, ensure_ascii=False, indent=1)
+
+
+    def is_unchanged(self, key, group_hash):
+        """
+        Checks whether the group has the same hash as in this manifest and whether all its files still exist.
+
+        :param key: the "material_thickness" key of the group
+        :type key: str
+        :param group_hash: the hash of the group in this run
+        :type group_hash: str
+        :rtype: bool
+        """
+        entry = self.groups.get(key)
+        if entry is None or entry['hash'] != group_hash:
+            return False
+        return all(os.path.isfile(os.path.join(self.folder, name)) for name in entry['files'])
+
+
+    def all_files(self):
+        """
+        :return: the names of all files listed in the manifest
+        :rtype: set
+        """
+        names = set(self.files)
+        for entry in self.groups.values():
+            names.update(entry['files'])
+        return names
+
+
+class SheetTable:
+    """
+    The values of every sheet, that the total efficiency report needs, column by column in compact arrays, 
+    with the index of the material-thickness group of every sheet. It's filled one sheet at a time while the sheets stream 
+    through the report pipeline; at the end, the totals of all groups are calculated at once by material_stats().
+    A row takes about 50 bytes (the indexes and counts are unsigned 32-bit integers, the values doubles), 
+    instead of a ReportSheet with its SheetSnapshot per sheet; rows can be read as SheetRow views.
+
+    Attributes:
+        groups (list): (material, thickness) of every group, in the order in which they appear
+        group_indexes (dict): (material, thickness) -> index of the group in groups
+        group_sheets (list): the number of sheets of every group so far
+        group_rows (list): the row indexes of every group, in an array per group (see group_stats())
+        sheet (list): the name of every sheet (of the first sheet of a collapsed layout), for the efficiency history
+        group (array): the group index of every sheet (row)
+        count (array): the number of identical sheets every row stands for (see collapse_identical_layouts())
+        area (array): the area of every sheet in square meters
+        mat_reusable (array): the percentage of reusable material of every sheet
+        mat_leftover (array): the percentage of non-reusable (garbage) material of every sheet
+        pieces_number (array): the number of pieces on every sheet
+    """
+
+    def __init__(self):
+        self.groups = []
+        self.group_indexes = {}
+        self.group_sheets = []
+        self.group_rows = []
+        self.sheet = []
+        self.group = array('I')
+        self.count = array('I')
+        self.area = array('d')
+        self.mat_reusable = array('d')
+        self.mat_leftover = array('d')
+        self.pieces_number = array('d')
+
+
+    def __len__(self):
+        return len(self.group)
+
+
+    def __getitem__(self, index):
+        """
+        :param index: the index of the row
+        :type index: int
+        :return: a view of the row (nothing is copied)
+        :rtype: SheetRow
+        """
+        if not -len(self.group) <= index < len(self.group):
+            raise IndexError(index)
+        return SheetRow(self, index % len(self.group))
+
+
+    def __iter__(self):
+        for index in range(len(self.group)):
+            yield SheetRow(self, index)
+
+
+    def add(self, snapshot, count=1):
+        """
+        Adds one sheet, or count identical sheets, to the table.
+
+        :param snapshot: the snapshot of the sheet
+        :type snapshot: SheetSnapshot
+        :param count: the number of identical sheets with this snapshot
+        :type count: int
+        :return: the number of sheets of the group before this one (the index of this sheet among the sheets of its group)
+        :rtype: int
+        """
+        key = (snapshot.material, snapshot.thickness)
+        group_index = self.group_indexes.get(key)
+        if group_index is None:
+            group_index = self.group_indexes[key] = len(self.groups)
+            self.groups.append(key)
+            self.group_sheets.append(0)
+            self.group_rows.append(array('I'))
+
+        counter_sheet_in_sheets = self.group_sheets[group_index]
+        self.group_sheets[group_index] += count
+
+        self.sheet.append(snapshot.sheet)
+        self.group.append(group_index)
+        self.count.append(count)
+        self.area.append(snapshot.area)    # m²
+        self.mat_reusable.append(snapshot.mat_reusable)    # % of sheet reusable material
+        self.mat_leftover.append(snapshot.mat_leftover)    # % of sheet garbage not reusable material
+        self.pieces_number.append(snapshot.pieces_number)
+        self.group_rows[group_index].append(len(self.group) - 1)   #after the values, so a listed row is always complete
+        return counter_sheet_in_sheets
+
+
+    def group_sums(self):
+        """
+        Sums the columns of every group, each sheet weighted by its count, in one group-by over all rows: 
+        vectorized with numpy, if it's installed, else in one loop.
+        Both add the sheets of a group in their order, so the sums are the same.
+
+        :return: the lists number of sheets, total area, total reusable percentage and total garbage percentage, one value per group
+        :rtype: tuple of list
+        """
+        groups_number = len(self.groups)
+        if numpy is not None:
+            group = numpy.frombuffer(self.group, dtype=numpy.uintc)   #the C unsigned int of array('I')
+            count = numpy.frombuffer(self.count, dtype=numpy.uintc)
+            sums = [
+                numpy.bincount(group, weights=count * numpy.frombuffer(column, dtype=numpy.float64), minlength=groups_number).tolist()
+                for column in (self.area, self.mat_reusable, self.mat_leftover)
+            ]
+            return self.group_sheets, sums[0], sums[1], sums[2]
+
+        total_area = [0.0] * groups_number
+        total_reusable = [0.0] * groups_number
+        total_garbage = [0.0] * groups_number
+        for group_index, count, area, mat_reusable, mat_leftover in zip(self.group, self.count, self.area, self.mat_reusable, self.mat_leftover):
+            total_area[group_index] += count * area
+            total_reusable[group_index] += count * mat_reusable
+            total_garbage[group_index] += count * mat_leftover
+        return self.group_sheets, total_area, total_reusable, total_garbage
+
+
+    def group_stats(self, key):
+        """
+        The totals of one group, as soon as all its sheets are added, while the sheets of the other groups are still added 
+        by another thread. Only the rows of the group are read (no numpy: it would lock the arrays against appending);
+        they are added in the same order as in group_sums(), so the totals are the same.
+
+        :param key: (material, thickness) of the group
+        :type key: tuple
+        :return: the statistics of the group
+        :rtype: MaterialStats
+        """
+        group_index = self.group_indexes[key]
+        total_area = total_reusable = total_garbage = 0.0
+        for row in self.group_rows[group_index]:
+            count = self.count[row]
+            total_area += count * self.area[row]
+            total_reusable += count * self.mat_reusable[row]
+            total_garbage += count * self.mat_leftover[row]
+        return MaterialStats(
+            material=key[0],
+            thickness=key[1],
+            number_of_sheets=self.group_sheets[group_index],
+            total_area=total_area,
+            total_reusable=total_reusable,
+            total_garbage=total_garbage
+        )
+
+
+    def material_stats(self):
+        """
+        :return: a MaterialStats object for every material-thickness group, in the order of the groups
+        :rtype: list of MaterialStats
+        """
+        return [
+            MaterialStats(
+                material=material,
+                thickness=thickness,
+                number_of_sheets=number_of_sheets,
+                total_area=total_area,
+                total_reusable=total_reusable,
+                total_garbage=total_garbage
+            )
+            for (material, thickness), number_of_sheets, total_area, total_reusable, total_garbage in zip(self.groups, *self.group_sums())
+        ]
+
+
+def column_property(column, doc):
+    """
+    :param column: the name of the column (array or list) of the SheetTable
+    :type column: str
+    :param doc: the description of the attribute
+    :type doc: str
+    :return: a read-only attribute of SheetRow, that reads its value from the column
+    :rtype: property
+    """
+    return property(lambda row: getattr(row.table, column)[row.index], doc=doc)
+
+
+class SheetRow:
+    """
+    A view of one row of a SheetTable, with the attribute names of ReportSheet and SheetSnapshot, 
+    for code that wants one object per sheet: the values stay in the arrays of the table, 
+    the view itself is only a reference to the table and the index.
+
+    Attributes:
+        table (SheetTable): the table
+        index (int): the index of the row
+    """
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+
+    sheet = column_property('sheet', "the name of the sheet (of the first sheet of a collapsed layout)")
+    count = column_property('count', "the number of identical sheets this row stands for")
+    area = column_property('area', "the area of the sheet in square meters")
+    mat_reusable = column_property('mat_reusable', "the percentage of reusable material of the sheet")
+    mat_leftover = column_property('mat_leftover', "the percentage of non-reusable material of the sheet")
+    pieces_number = column_property('pieces_number', "the number of pieces on the sheet")
+
+    @property
+    def material(self):
+        return self.table.groups[self.table.group[self.index]][0]
+
+    @property
+    def thickness(self):
+        return self.table.groups[self.table.group[self.index]][1]
+
+
+    def __repr__(self):
+        return f"SheetRow({self.sheet!r}, {self.material!r}, {self.thickness!r}, area={self.area}, count={self.count})"
+
+
+class GroupFileWriter:
+    """
+    Keeps the HTML files of the material-thickness groups open, while the sheets of different groups stream in.
+    At most max_open files are open at the same time, the least recently used one is closed and later reopened for appending.
+
+    Attributes:
+        max_open (int): the maximal number of open files
+        open_files (OrderedDict): "material_thickness" -> open file object, the least recently used first
+        paths (dict): "material_thickness" -> file path of every group that was written, in the order in which the groups appeared
+    """
+
+    def __init__(self, max_open):
+        """
+        Initializes the GroupFileWriter.
+
+        :param max_open: the maximal number of open files
+        :type max_open: int
+        """
+        self.max_open = max_open
+        self.open_files = OrderedDict()
+        self.paths = {}
+
+
+    def get(self, group_key, path):
+        """
+        Returns the open HTML file of the group. A group that was not written yet gets a new file at the given path.
+
+        :param group_key: the "material_thickness" key of the group
+        :type group_key: str
+        :param path: the path of the file, if the group doesn't have one yet
+        :type path: str
+        :return: the open file object and whether the file is new
+        :rtype: tuple (file-like object, bool)
+        """
+        html_file = self.open_files.get(group_key)
+        if html_file is not None:
+            self.open_files.move_to_end(group_key)
+            return html_file, False
+
+        if len(self.open_files) >= self.max_open:
+            self.open_files.popitem(last=False)[1].close()
+
+        is_new = group_key not in self.paths
+        if is_new:
+            self.paths[group_key] = path
+        html_file = open(self.paths[group_key], 'w' if is_new else 'a', encoding='utf-8', buffering=HTML_WRITE_BUFFER)
+        self.open_files[group_key] = html_file
+        return html_file, is_new
+
+
+    def close(self, group_key):
+        """
+        Closes the file of one group, if it's open (e.g. because the group is complete).
+
+        :param group_key: the "material_thickness" key of the group
+        :type group_key: str
+        """
+        html_file = self.open_files.pop(group_key, None)
+        if html_file is not None:
+            html_file.close()
+
+
+    def close_all(self):
+        """
+        Closes all open files.
+        """
+        while self.open_files:
+            self.open_files.popitem()[1].close()
+
+
+class ReportChunks:
+    """
+    The chunks of a large combined report: while the parts are joined into the report, they are also copied into
+    chunk files of whole parts, each one a complete HTML document with at most PDF_CHUNK_PAGES pages.
+    Every chunk starts a new PDF, so the page break before the first sheet of the chunks after the first one is left out;
+    the first chunk starts like the report.
+
+    Attributes:
+        folder (str): the project folder
+        project_name (str): the name of the project
+        nice_design (bool): the design of the report (for the header of every chunk)
+        paths (list): the HTML files of the chunks
+        pdfs (list): the PDF files of the chunks, in the same order
+        html_file (file-like object): the open file of the current chunk, or None
+        pages (int): the number of pages in the current chunk
+        is_first_part (bool): whether the next part is the first one of the current chunk
+    """
+
+    def __init__(self, folder, project_name, nice_design):
+        """
+        :param folder: the project folder
+        :type folder: str
+        :param project_name: the name of the project
+        :type project_name: str
+        :param nice_design: the design of the report
+        :type nice_design: bool
+        """
+        self.folder = folder
+        self.project_name = project_name
+        self.nice_design = nice_design
+        self.paths = []
+        self.pdfs = []
+        self.html_file = None
+        self.pages = 0
+        self.is_first_part = False
+
+
+    def start_part(self, pages):
+        """
+        Starts a new chunk before the next part, if the part doesn't fit into the current chunk anymore.
+
+        :param pages: the number of pages of the next part
+        :type pages: int
+        """
+        if self.html_file is not None and self.pages + pages <= PDF_CHUNK_PAGES:
+            self.pages += pages
+            return
+        self.close()
+        path = os.path.join(self.folder, f".{self.project_name}.chunk{len(self.paths)}.html")
+        self.paths.append(path)
+        self.pdfs.append(os.path.splitext(path)[0] + '.pdf')
+        self.html_file = open(path, 'w', encoding='utf-8', buffering=HTML_WRITE_BUFFER)
+        html_header_and_css(self.html_file, self.project_name, self.nice_design)
+        self.pages = pages
+        self.is_first_part = True
+
+
+    def copy_part(self, part_file, html_file_object):
+        """
+        Copies the next part into the report and into the current chunk.
+
+        :param part_file: the part, open for reading
+        :type part_file: file-like object
+        :param html_file_object: the file of the whole report
+        :type html_file_object: file-like object
+        """
+        if self.is_first_part:
+            self.is_first_part = False
+            #every page starts with " " and its page break (see SHEET_HEADER_TEMPLATE)
+            start = part_file.read(len(' ' + PAGE_BREAK_HTML))
+            html_file_object.write(start)
+            self.html_file.write(' ' if len(self.paths) > 1 and start == ' ' + PAGE_BREAK_HTML else start)
+        while True:
+            text = part_file.read(HTML_WRITE_BUFFER)
+            if not text:
+                break
+            html_file_object.write(text)
+            self.html_file.write(text)
+
+
+    def close(self):
+        """
+        Completes the current chunk.
+        """
+        if self.html_file is not None:
+            close_html(self.html_file)
+            self.html_file.close()
+            self.html_file = None
+
+
+class CompactPageLayout:
+    """
+    Packs the sheets of one report file onto the pages in the compact layout: the height of every sheet is measured
+    from its known sizes (see measure_sheet_block()), and a sheet starts a new page only if it doesn't fit onto the current one.
+    Only the first sheet of a page gets the header with the logo and the project name.
+
+    Attributes:
+        used (float): the height used on the current page in pt, or None before the first sheet
+    """
+    __slots__ = ('used',)
+
+    def __init__(self):
+        self.used = None
+
+
+    def place(self, height, new_page=False):
+        """
+        Places the next sheet.
+
+        :param height: the height of the sheet in pt
+        :type height: float
+        :param new_page: whether the sheet has to start a new page anyway (e.g. a new part file of the combined report)
+        :type new_page: bool
+        :return: whether the sheet starts a new page
+        :rtype: bool
+        """
+        if new_page or self.used is None or self.used + height > COMPACT_PAGE_HEIGHT:
+            self.used = COMPACT_PAGE_HEADER_HEIGHT + height   #a sheet higher than the page gets the page(s) for itself
+            return True
+        self.used += height
+        return False
+
+
+    def end_page(self):
+        """
+        The current page is full (e.g. after the appendix with the pieces, which starts a page of its own).
+        """
+        self.used = float('inf')
+
+
+class PageWriter:
+    """
+    The last stage of the report pipeline in a thread of its own: takes the pages from a bounded queue and writes them, 
+    while the host thread takes the next previews. If the writer falls behind, put() waits until there is room in the queue, 
+    so the pages (and previews) waiting in memory are limited.
+    After an error the remaining pages are still taken from the queue (so the host never waits forever), but not written; 
+    the error is raised in the host thread by the next put() or by finish().
+
+    Attributes:
+        write_page (callable): writes one page, called in the writer thread with every item of put()
+        pages (Queue): the items, that are not written yet; None stops the thread
+        error (BaseException): the first error of write_page(), or None
+        thread (Thread): the writer thread
+    """
+
+    def __init__(self, write_page, queue_size):
+        """
+        Initializes the PageWriter and starts its thread.
+
+        :param write_page: writes one page
+        :type write_page: callable
+        :param queue_size: the maximal number of items waiting in the queue
+        :type queue_size: int
+        """
+        self.write_page = write_page
+        self.pages = queue.Queue(maxsize=queue_size)
+        self.error = None
+        self.thread = threading.Thread(target=self.run, name='report-writer', daemon=True)
+        self.thread.start()
+
+
+    def run(self):
+        while True:
+            item = self.pages.get()
+            if item is None:
+                return
+            if self.error is not None:
+                continue
+            try:
+                self.write_page(item)
+            except BaseException as e:
+                self.error = e
+
+
+    def put(self, item):
+        """
+        Queues one page for writing; waits while the queue is full.
+
+        :param item: the page, as expected by write_page
+        """
+        if self.error is not None:
+            raise self.error
+        self.pages.put(item)
+
+
+    def close(self):
+        """
+        Writes the queued pages and stops the thread. Can be called more than once.
+        """
+        if self.thread.is_alive():
+            self.pages.put(None)
+            self.thread.join()
+
+
+    def finish(self):
+        """
+        Like close(), but raises the error of the writer thread, if there was one.
+        """
+        self.close()
+        if self.error is not None:
+            raise self.error
 
 
 class MaterialStats:
@@ -57,6 +1215,8 @@ class MaterialStats:
         total_reusable_material (float): the total area of reusable material per sheet (in m²)
         total_non_reusable_material(float): the total area of non-reusable material per sheet (in m²)
     """
+    __slots__ = ('material', 'thickness', 'number_of_sheets', 'total_area', 'total_reusable', 'total_garbage',
+                 'average_reusable', 'average_garbage', 'total_reusable_material', 'total_non_reusable_material')
 
     def __init__(self, material, thickness, number_of_sheets, total_area, total_reusable, total_garbage):
         """
@@ -89,7 +1249,7 @@ class MaterialStats:
         self.total_non_reusable_material= total_area * total_garbage / 100 / number_of_sheets
 
 
-    def GEB_to_html(self, html_file_object, project_name, logo, nice_design, i):
+    def GEB_to_html(self, html_file_object, project_name, logo, nice_design, i, header=True):
         """
         Generates HTML for one material-thickness total efficiency report with statistics.
 
@@ -103,183 +1263,476 @@ class MaterialStats:
         :type nice_design: bool
         :param i: index used to determine when to insert a page break, to iterate through each html_file_object in a list
         :type i: int
+        :param header: whether the page break is followed by the GEB header (in the combined report only the first GEB has it)
+        :type header: bool
         """
 
+        page = []
         if i == 0 or i % 4 == 0:
-            line = '\n<DIV class="page-break-after"></DIV>\n'
-            html_file_object.write(line)
-
-        if i == 0 or i % 4 == 0:
-            line = '<HEADER style="display: block; width: 100%; text-align: left;">\n'
-            line += f'<IMG src="file:///{logo}" alt="company Logo" style="vertical-align: middle; width: 60px; height: 60px; margin: 0 10px 15px 0;">\n'
-            line += f'<SPAN style="font-size: 35px; padding: 0 0 8px 0; ">Projekt: {os.path.splitext(project_name)[0]} </SPAN>\n'
-            line += '</HEADER>\n'
-            html_file_object.write(line)
-
-        line = f"""
-    <TABLE id="thick-border" class="adjustable-table">
-        <TH colspan="3" class="center-text">Gesamtwirkungsgradbericht</TH>
-
-        <TR>
-            <TH align="left">Material und Dicke</TH>
-            <TD colspan="2" align="left">{self.material}   {self.thickness} mm</TD>
-        </TR>
-
-        <TR>
-            <TH align="left">Anzahl Sheets</TH>
-            <TH colspan="2" align="left">{self.number_of_sheets}</TH>
-        </TR>
-
-        <TR>
-            <TD>Gesamtfläche</TD>
-            <TH colspan="2" align="left">{round(self.total_area, 2)} m²</TH>
-        </TR>
-
-        <TR>
-            <TD class="green">Gesamt wiederverwendbares Material</TD>
-            <TD class="green">{round(self.total_reusable_material, 2)} m²</TD>
-            <TD class="green td-right">{round(self.total_reusable_material / self.total_area * 100, 2)} %</TD>
-        </TR>            
-        <TR>
-            <TD class="grey">Gesamt nicht wiederverwendbares Material</TD>
-            <TD class="grey">{round(self.total_non_reusable_material, 2)} m²</TD>
-            <TD class="grey td-right">{round(self.total_non_reusable_material/ self.total_area * 100, 2)} %</TD>
-        </TR>
-
-        <TR>
-            <TD class="green">Wiederverwendbares Material pro Platte im Durchschnitt:</TD>
-            <TD class="green">{round(self.total_area * self.average_reusable / 100 / self.number_of_sheets, 2)} m²</TD>
-            <TD class="green td-right">{round(self.total_reusable / self.number_of_sheets, 2)}%</TD>
-        </TR>
-
-        <TR>
-            <TD class="grey">Nicht wiederverwendbares Material pro Platte im Durchschnitt</TD>
-            <TD class="grey">{round(self.total_area * self.average_garbage / 100 / self.number_of_sheets, 2)} m²</TD>
-            <TD class="grey td-right">{round(self.total_garbage / self.number_of_sheets, 2)}%</TD>
-        </TR>
-    </TABLE>
-            """
-        html_file_object.write(line)
+            page.append(PAGE_BREAK_HTML)
+            if header:
+                page.append(render_GEB_header(logo=logo, project=escape(os.path.splitext(project_name)[0])))
+
+        page.append(render_GEB_table(
+            material=escape(str(self.material)),
+            thickness=self.thickness,
+            number_of_sheets=self.number_of_sheets,
+            total_area=round(self.total_area, 2),
+            total_reusable_material=round(self.total_reusable_material, 2),
+            total_reusable_percent=round(self.total_reusable_material / self.total_area * 100, 2),
+            total_non_reusable_material=round(self.total_non_reusable_material, 2),
+            total_non_reusable_percent=round(self.total_non_reusable_material/ self.total_area * 100, 2),
+            average_reusable_material=round(self.total_area * self.average_reusable / 100 / self.number_of_sheets, 2),
+            average_reusable=round(self.total_reusable / self.number_of_sheets, 2),
+            average_non_reusable_material=round(self.total_area * self.average_garbage / 100 / self.number_of_sheets, 2),
+            average_garbage=round(self.total_garbage / self.number_of_sheets, 2),
+        ))
+        html_file_object.write(''.join(page))
 
 
 def nesting_report():
     """
     The program loads settings from an .ini file, creates a new folder, and generates an HTML report with applied CSS. 
     It includes detailed information about each sheet, calculates individual and total efficiency metrics, and then converts the final HTML report(s) into a PDF format.
-    """
-
-    #do_debug()
-    do_report, rotate, general_folder, nice_design, remove_color_fill, reports_pdfs_together, divide_material, auto_open, open_all, browser_path, ewd_file, show_warning_delete_folder = read_config_ini()
 
-    ###if project is not saved --> save it in temp folder or in a temp dircetory in the config file
-    project_name = get_or_create_project_name()
+    The sheets are streamed through the stages enumerate sheets -> snapshot -> group -> render -> emit, 
+    so every page is written to disk as soon as it is rendered and only the running totals of each group are kept in memory.
+    The stages overlap: the host thread only takes the snapshots and previews, the pages are formatted by the format threads 
+    and written by the writer thread, and in the divided report each group is converted to PDF as soon as its last page is written.
 
-    folder = make_or_delete_folder(general_folder, project_name, show_warning_delete_folder)
-
-    report_file_path = create_report_file_path(folder, project_name)
-
-    img_ext = ".jpg"
-    logo = "C:\Program Files\companyProg\Bundles\company logo\company_logo.png"
-
-    set_view_and_shading(nice_design)
-
-    #try:
-    #what i do:
-    #sort sheets depending on material and thickness
-    #for each materials_dict[key] generate html
-
-    materials_dict, total_sheets_amount = sort_for_material() #basically sorting and saving as a dictionary
+    :return: the values of every sheet of the run (e.g. for the batch mode, which keeps the tables of many projects)
+    :rtype: SheetTable
+    """
 
-    materials_stats_list = []
+    #do_debug()
+    do_report, rotate, general_folder, nice_design, remove_color_fill, reports_pdfs_together, divide_material, auto_open, open_all, browser_path, ewd_file, show_warning_delete_folder, incremental, profile, svg_preview, dedupe_layouts, aggregate_pieces, sort_pieces_by_area, pieces_appendix, history, export_csv, export_jsonl, export_parquet, export_only, summary_only, local_build, combined_report, compact_layout = read_config_ini()
+
+    render_pages = not (export_only or summary_only)   #whether the pages of the sheets are rendered (the previews taken)
+    if not render_pages:   #without the pages there is nothing to regenerate
+        incremental = False
+        local_build = False   #the quick runs only write a few files into the existing folder
+    #the combined report of the divided report is assembled from the reports of the groups, they are rendered only once
+    combined_output = divide_material and combined_report and render_pages
+
+    export_formats = [export_format for export_format, enabled in (('csv', export_csv), ('jsonl', export_jsonl), ('parquet', export_parquet)) if enabled]
+    if export_only and not export_formats:
+        export_formats = ['csv']
+    if 'parquet' in export_formats and report_export.pyarrow is None:
+        if export_only and export_formats == ['parquet']:   #the run would write nothing at all
+            dlg.output_box("Fehler: Mit export_only ist nur der Parquet-Export gewählt, dafür wird pyarrow benötigt. "
+                           "Bitte installieren Sie pyarrow oder wählen Sie export_csv bzw. export_jsonl in der Konfigurationsdatei.")
+            return None
+        dlg.output_box("Für den Parquet-Export wird pyarrow benötigt, die Parquet-Dateien werden nicht geschrieben.")
+        export_formats.remove('parquet')
+
+    #with local_build the report is built on the local storage and uploaded at the end; report_general_folder stays in report_pfad
+    report_general_folder = general_folder
+    if local_build:
+        general_folder = local_build_folder(report_general_folder)
+
+    profiler = report_profile.Profiler(profile)
+    profiler.instrument(globals(), ('nest', 'view', 'cad'))   #every call of the host API is counted and timed
+    try:
+        with profiler.timer('setup'):
+            ###if project is not saved --> save it in temp folder or in a temp dircetory in the config file
+            project_name = get_or_create_project_name()
+
+            #config flags that change the output: if one of them changed, the incremental mode has to start from scratch
+            report_flags = {'nice_design': nice_design, 'rotate': rotate, 'reports_pdfs_together': reports_pdfs_together, 'divide_material': divide_material, 'svg_preview': svg_preview, 'dedupe_layouts': dedupe_layouts,
+                            'aggregate_pieces': aggregate_pieces, 'sort_pieces_by_area': sort_pieces_by_area, 'pieces_appendix': pieces_appendix,
+                            'compact_layout': compact_layout, 'combined_report': combined_output}   #with the combined report the pages of the groups carry the project header
+
+            #a new report is built in a staging folder, which replaces the project folder at the end (publish_report_folder())
+            folder, project_folder, old_manifest = make_or_delete_folder(general_folder, project_name, show_warning_delete_folder, incremental, report_flags, keep_existing=not render_pages)   #the quick runs don't delete the full report
+            if local_build:   #the tombstones of replaced reports in report_pfad
+                remove_stale_report_folders(report_general_folder, os.path.basename(project_folder))
+            manifest = ReportManifest(folder, report_flags)
+
+            report_file_path = create_report_file_path(folder, project_name)
+
+            img_ext = ".jpg"
+            logo = "C:\Program Files\companyProg\Bundles\company logo\company_logo.png"
+            preview_cache = PreviewCache(os.path.join(general_folder, PREVIEW_CACHE_FOLDER), PREVIEW_CACHE_MAX_SIZE) if render_pages else None
+            pdf_scheduler = PdfScheduler(browser_path, PDF_CONVERSION_WORKERS)
+
+            if not svg_preview and render_pages:   #the vector previews, the GEB and the export don't need the view
+                set_view_and_shading(nice_design)
+
+            sheets = nest.get_sheets()
+            total_sheets_amount = len(sheets)
+            #in the divided report a group is complete, when its last sheet is written, so the groups of the sheets 
+            #are read first (their snapshots take material and thickness from here, so it costs no extra host calls)
+            sheet_groups = read_sheet_groups(sheets) if divide_material and render_pages else None
+        snapshots = profiler.stage('snapshot', iter_sheet_snapshots(sheets, sheet_groups))
+
+        piece_tables = PieceTableCache()   #so the pieces of a sheet are read only once, even if several stages need them
+        group_hashes = {}   #"material_thickness" -> hash of the group, only needed in the incremental mode
+        if incremental:
+            #the hashes have to be known before anything is rendered, so here the snapshots are kept in memory
+            snapshots = list(snapshots)
+            with profiler.timer('hash'):
+                group_hashes = get_group_hashes(snapshots, report_flags, piece_tables)
+
+        #if no group changed, the reports in the folder are still up to date
+        nothing_changed = (old_manifest is not None
+                           and set(old_manifest.groups) == set(group_hashes)
+                           and all(old_manifest.is_unchanged(key, group_hash) for key, group_hash in group_hashes.items())
+                           and all(os.path.isfile(os.path.join(folder, name)) for name in old_manifest.files)
+                           and (not divide_material or (f'{project_name}.pdf' in old_manifest.files) == combined_output))   #the combined report was (not) wanted
+        if nothing_changed:
+            manifest.files = old_manifest.files
+
+        #groups, whose reports from the last run are still up to date: they are counted, but not rendered
+        skip_groups = set()
+        if old_manifest is not None and (divide_material or nothing_changed):
+            skip_groups = {key for key, group_hash in group_hashes.items() if old_manifest.is_unchanged(key, group_hash)}
+            if combined_output and pypdf is None:   #the combined HTML needs to know where the pages of the group are in its file
+                skip_groups = {key for key in skip_groups if 'pages' in old_manifest.groups[key]}
+
+        sheet_table = SheetTable()   #the values of every sheet for the GEB, grouped by material and thickness
+        group_images = {}   #"material_thickness" -> images of the group, only needed in the incremental mode
+        group_files = GroupFileWriter(MAX_OPEN_GROUP_FILES)   #only used by the writer thread, until it's stopped
+        finished_groups = set()   #the groups, that were completed and converted while the other groups were still rendered
+        group_pages = {}   #"material_thickness" -> (start, end) of the pages in the HTML file of the group, for the combined report
+        part_pages = Counter()   #(group key, part number) -> number of pages in the part file, in the combined report
+        group_page_numbers = Counter()   #"material_thickness" -> number of pages of the group written so far, in the combined report
+
+        #"material_thickness" -> number of sheets of the group, that are not written yet (in the divided report): 
+        #each group is completed and converted while the sheets of the other groups are still streamed and rendered
+        open_sheets = None
+        if sheet_groups is not None:
+            open_sheets = Counter(group_key for group_key in (get_group_key(*material_and_thickness) for material_and_thickness in sheet_groups) if group_key not in skip_groups)
+
+        def finish_group(material_and_thickness, material_stats_obj):
+            """
+            Completes the report of one group in the divided report (with its GEB, if reports_pdfs_together) and converts it in the background.
 
-    counter_for_full_pdf = 0
-    counter_sheet_in_sheets = 0   #index of this sheet among sheets_to_report
+            :param material_and_thickness: (material, thickness) of the group
+            :type material_and_thickness: tuple
+            :param material_stats_obj: the statistics of the group
+            :type material_stats_obj: MaterialStats
+            """
+            group_key = get_group_key(*material_and_thickness)
+            project_name_mat_thick = f"{project_name}_{group_key}"
+            group_report_path = group_files.paths[group_key]
+            group_pages[group_key] = (group_pages[group_key][0], os.path.getsize(group_report_path))   #the pages end before the GEB
+            with open(group_report_path, 'a', encoding='utf-8', buffering=HTML_WRITE_BUFFER) as html_file:
+                if reports_pdfs_together:
+                    material_stats_obj.GEB_to_html(html_file, project_name, logo, nice_design, 0)
+                close_html(html_file)
 
-    for material_and_thickness, sheets_values in materials_dict.items():
-        material, thickness = material_and_thickness  #extract material and thickness from the key
+            output_pdf = os.path.join(folder, f'{project_name_mat_thick}.pdf')
+            pdf_scheduler.submit(group_report_path, output_pdf)   #the other groups are rendered while this one is converted
 
-        material_stats_obj = create_object_material_stats(material_and_thickness, sheets_values)
-        materials_stats_list.append(material_stats_obj)
+            if incremental:
+                manifest.groups[group_key] = {'hash': group_hashes[group_key], 'files': group_images.get(group_key, []) + [f"{project_name_mat_thick}.html", f"{project_name_mat_thick}.pdf"],
+                                              'pages': list(group_pages[group_key])}
 
-        #html with a new name
-        if divide_material:
-            project_name_mat_thick = f"{project_name}_{material}_{thickness}"    #.replace('.ewd', '')
-            report_file_path = os.path.join(folder, f"{project_name_mat_thick}.html")
+        def write_page(item):
+            """
+            Emit stage of the report pipeline, in the writer thread: writes one page into the file of its group.
 
+            :param item: (material_and_thickness, snapshot, count, page) as yielded by render_sheets()
+            :type item: tuple
+            """
+            material_and_thickness, snapshot, count, page = item
+            page = page.result()   #waits for the format thread
+            with profiler.timer('emit'):
+                group_key = get_group_key(*material_and_thickness)
+
+                if divide_material:   #every group has its own HTML file
+                    project_name_mat_thick = f"{project_name}_{group_key}"
+                    html_file, is_new = group_files.get(group_key, os.path.join(folder, f"{project_name_mat_thick}.html"))
+                    if is_new:
+                        html_header_and_css(html_file, project_name_mat_thick, nice_design)
+                        group_pages[group_key] = (html_file.tell(), None)   #the pages start after the header
+                else:   #every group is written into part files of at most PART_PAGES pages, the parts are joined into one report at the end
+                    group_page = group_page_numbers[group_key]
+                    group_page_numbers[group_key] += 1
+                    part_key = (group_key, group_page // PART_PAGES)
+                    if group_page and group_page % PART_PAGES == 0:   #the last part of the group is complete
+                        group_files.close((group_key, part_key[1] - 1))
+                    html_file, is_new = group_files.get(part_key, os.path.join(folder, f".{project_name}.part{len(group_files.paths)}.html"))
+                    part_pages[part_key] += 1
+
+                html_file.write(page)
+
+                if incremental and not svg_preview:
+                    group_images.setdefault(group_key, []).append(f"{snapshot.sheet}{img_ext}")
+
+                if divide_material and open_sheets is not None:
+                    open_sheets[group_key] -= count
+                    if open_sheets[group_key] == 0:   #the last sheet of the group: all its rows are in the sheet table too
+                        group_files.close(group_key)
+                        finish_group(material_and_thickness, sheet_table.group_stats(material_and_thickness))
+                        finished_groups.add(group_key)
+
+        exporter = None   #the export files, if an export format is chosen
+        render_error = None   #the error, that stopped the rendering of the pages
+        grouped = None
+        failed_groups = []   #(output_pdf, error) of the groups, whose reports couldn't be completed after an error
+        try:
+            if export_formats:
+                exporter = report_export.ReportExporter(folder, project_name, export_formats)
+
+            layouts = ((snapshot, 1, None) for snapshot in snapshots)
+            if exporter is not None:   #every sheet is exported (before the identical ones are collapsed), also those of the groups that are not rendered again
+                layouts = profiler.stage('export', export_sheets(layouts, exporter, piece_tables), exclude=('snapshot',))
+            if dedupe_layouts and render_pages:   #one page for all sheets with the same layout
+                layouts = profiler.stage('dedupe', collapse_identical_layouts(layouts, nice_design, piece_tables), exclude=('snapshot', 'export'))
+            grouped = profiler.stage('group', group_for_material(layouts, sheet_table, skip_groups), exclude=('snapshot', 'dedupe', 'export'))
+
+            if not render_pages:   #no pages: the sheets only have to be added to the sheet table for the GEB (and exported)
+                for _ in grouped:
+                    pass
+            else:
+                with ThreadPoolExecutor(max_workers=HTML_FORMAT_WORKERS) as format_pool:
+                    page_writer = PageWriter(write_page, PIPELINE_QUEUE_SIZE)
+                    try:
+                        pages = render_sheets(grouped, folder, img_ext, logo, project_name, nice_design, rotate, reports_pdfs_together, divide_material, total_sheets_amount, preview_cache, svg_preview, PieceListOptions(aggregate_pieces, sort_pieces_by_area, pieces_appendix), piece_tables,
+                                              format_pool, profiler.timed('format', render_sheet_page), compact_layout, group_header=not combined_output)
+                        pages = profiler.stage('render', pages, exclude=('snapshot', 'dedupe', 'export', 'group'), sheet_of=lambda item: item[1].sheet)
+
+                        #the time, that the host thread waits for the writer thread, because the queue is full
+                        with profiler.timer('backpressure', exclude=('snapshot', 'dedupe', 'export', 'group', 'render')):
+                            for item in pages:
+                                page_writer.put(item)
+                        page_writer.finish()
+                    finally:
+                        page_writer.close()   #also after an error, so no format thread waits for the queue
+
+        except IOError as e:
+            render_error = e
+            dlg.output_box(f"Ein Fehler ist beim Schreiben der Datei '{report_file_path}' aufgetreten: {e}")
+        except Exception as e:
+            render_error = e
+            dlg.output_box(f" :C {e}")
+        finally:
+            group_files.close_all()
+
+        if render_error is not None and grouped is not None:   #the sheets after the error are still counted, so the GEB and the error report cover every group
             try:
-                os.makedirs(os.path.dirname(report_file_path), exist_ok=True)
-            except OSError as e:
-                dlg.output_box(f"Fehler beim Ordner erstellen in {os.path.dirname(report_file_path)}")
-
-            with open(report_file_path, 'w', encoding='utf-8') as html_file:
-                try:
-                    create_report(report_file_path, html_file, project_name_mat_thick, folder, img_ext, logo, nice_design, rotate, reports_pdfs_together, divide_material, sheets_values, total_sheets_amount, materials_dict, counter_for_full_pdf, 0)
-                    test = 3
-                    
-                    if reports_pdfs_together:
-                        material_stats_obj.GEB_to_html(html_file, project_name, logo, nice_design, 0)
+                for _ in grouped:
+                    pass
+            except Exception as e:
+                dlg.output_box(f" :C {e}")
+
+        with profiler.timer('assemble'):
+            materials_stats_list = sheet_table.material_stats()
+
+            if render_pages:   #the reports: the groups are completed (or joined into one report)
+                if divide_material:
+                    for material_and_thickness, material_stats_obj in zip(sheet_table.groups, materials_stats_list):
+                        group_key = get_group_key(*material_and_thickness)
+                        if group_key in skip_groups:   #the reports of this group from the last run are still up to date
+                            manifest.groups[group_key] = old_manifest.groups[group_key]
+                            if 'pages' in old_manifest.groups[group_key]:
+                                group_pages[group_key] = tuple(old_manifest.groups[group_key]['pages'])
+                        elif group_key not in finished_groups:   #only after an error, else the writer thread completed all groups
+                            if group_key in group_files.paths:   #the pages written before the error can still be looked at
+                                finish_group(material_and_thickness, material_stats_obj)
+                            failed_groups.append((os.path.join(folder, f"{project_name}_{group_key}.pdf"), render_error))
+
+                    if combined_output and not nothing_changed:   #the report of all groups, from the reports of the groups
+                        #the pages of the groups already carry the header of the project (see render_sheets()); 
+                        #after an error only the groups, that have a report, are joined (see failed_groups)
+                        output_pdf = os.path.join(folder, f'{project_name}.pdf')
+                        reported_groups = [material_and_thickness for material_and_thickness in sheet_table.groups
+                                           if get_group_key(*material_and_thickness) in group_pages or get_group_key(*material_and_thickness) in skip_groups]
+                        if pypdf is not None:   #page by page from the PDFs of the groups, after their conversion
+                            pdf_scheduler.submit_concatenation([os.path.join(folder, f"{project_name}_{get_group_key(*material_and_thickness)}.pdf") for material_and_thickness in reported_groups], output_pdf)
+                            manifest.files.append(f'{project_name}.pdf')
+                        else:   #the pages of the groups are copied from their HTML files, the combined HTML is converted
+                            with open(report_file_path, 'w', encoding='utf-8', buffering=HTML_WRITE_BUFFER) as html_file:
+                                html_header_and_css(html_file, project_name, nice_design)
+                                for material_and_thickness, material_stats_obj in zip(sheet_table.groups, materials_stats_list):
+                                    if material_and_thickness not in reported_groups:
+                                        continue
+                                    group_key = get_group_key(*material_and_thickness)
+                                    copy_html_pages(html_file, os.path.join(folder, f"{project_name}_{group_key}.html"), *group_pages[group_key])
+                                    if reports_pdfs_together:   #like in the PDFs of the groups, every group is followed by its GEB, only the first one with the GEB header
+                                        material_stats_obj.GEB_to_html(html_file, project_name, logo, nice_design, 0, header=material_and_thickness == reported_groups[0])
+                                close_html(html_file)
+                            pdf_scheduler.submit(report_file_path, output_pdf)
+                            manifest.files += [f'{project_name}.html', f'{project_name}.pdf']
+
+                elif not nothing_changed:   #if not divide_material: join the parts of all groups into one report
+                    #the parts of every group one after another, the groups in the order in which they appeared
+                    group_order = {}
+                    for group_key, _ in group_files.paths:
+                        group_order.setdefault(group_key, len(group_order))
+                    parts = sorted(group_files.paths.items(), key=lambda part: (group_order[part[0][0]], part[0][1]))
+
+                    #a large report is also written in chunks of whole parts (at most PDF_CHUNK_PAGES pages),
+                    #which are converted in parallel and joined page by page
+                    chunks = ReportChunks(folder, project_name, nice_design) if pypdf is not None and sum(part_pages.values()) > PDF_CHUNK_PAGES else None
+                    with open(report_file_path, 'w', encoding='utf-8', buffering=HTML_WRITE_BUFFER) as html_file:
+                        html_header_and_css(html_file, project_name, nice_design)
+                        for part_key, part_path in parts:
+                            if chunks is not None:
+                                chunks.start_part(part_pages[part_key])
+                            with open(part_path, 'r', encoding='utf-8') as part_file:
+                                if chunks is None:
+                                    shutil.copyfileobj(part_file, html_file, HTML_WRITE_BUFFER)
+                                else:
+                                    chunks.copy_part(part_file, html_file)
+                            os.remove(part_path)
+
+                        if reports_pdfs_together: #write GEB in the same big PDF at the end
+                            for i, material_stats_obj in enumerate(materials_stats_list):
+                                material_stats_obj.GEB_to_html(html_file, project_name, logo, nice_design, i)
+                                if chunks is not None:   #in the last chunk
+                                    material_stats_obj.GEB_to_html(chunks.html_file, project_name, logo, nice_design, i)
                         close_html(html_file)
 
-                    else: #if not reports_pdfs_together
-                        close_html(html_file)
-
-                except Exception as e:
-                    raise e
-            output_pdf = os.path.join(folder, f'{project_name_mat_thick}.pdf')
-            to_pdf(report_file_path, output_pdf, open_all)
-        
-        else: #if not divide_material:    - _in_ the loop of material_and_thickness
-            if counter_for_full_pdf == 0: 
-                with open(report_file_path, 'w', encoding='utf-8') as html_file:
-                    create_report(report_file_path, html_file, project_name, folder, img_ext, logo, nice_design, rotate, reports_pdfs_together, divide_material, sheets_values, total_sheets_amount, materials_dict, counter_for_full_pdf, counter_sheet_in_sheets)
-                    test = 6
-
-            else:  #if counter_for_full_pdf != 0: 
-                with open(report_file_path, 'a', encoding='utf-8') as html_file:
-                    create_report(report_file_path, html_file, project_name, folder, img_ext, logo, nice_design, rotate, reports_pdfs_together, divide_material, sheets_values, total_sheets_amount, materials_dict, counter_for_full_pdf, counter_sheet_in_sheets)
-                    test = 5
-            counter_for_full_pdf +=1
-
-    # _after_ the loop of material_and_thickness
-    if not divide_material:
-
-        if reports_pdfs_together: #write GEB in the same big PDF at the end
-            with open(report_file_path, 'a', encoding='utf-8') as html_file:
-                for i, material_stats_obj in enumerate(materials_stats_list):
-                    material_stats_obj.GEB_to_html(html_file, project_name, logo, nice_design, i)
-                close_html(html_file)
-
-            output_pdf = os.path.join(folder, f'{project_name}.pdf')
-            to_pdf(report_file_path, output_pdf, open_all)
+                    output_pdf = os.path.join(folder, f'{project_name}.pdf')
+                    if chunks is None:
+                        pdf_scheduler.submit(report_file_path, output_pdf)
+                    else:
+                        chunks.close()
+                        for chunk_path, chunk_pdf in zip(chunks.paths, chunks.pdfs):
+                            pdf_scheduler.submit(chunk_path, chunk_pdf)
+                        pdf_scheduler.submit_concatenation(chunks.pdfs, output_pdf, temporary_files=chunks.paths + chunks.pdfs)
+                    manifest.files = [f'{project_name}.html', f'{project_name}.pdf']
+
+                    if incremental:
+                        for key, group_hash in group_hashes.items():
+                            manifest.groups[key] = {'hash': group_hash, 'files': group_images.get(key, [])}
+
+                else:   #if nothing changed
+                    manifest.groups = old_manifest.groups
+
+            #write GEB in the separate PDF at the end (in the summary-only mode it's the only report)
+            if not export_only and (summary_only or not reports_pdfs_together) and not nothing_changed:
+                report_file_path = os.path.join(folder, f'Gesamteffizienbericht_{project_name}.html')
+                with open(report_file_path, 'w', encoding='utf-8', buffering=HTML_WRITE_BUFFER) as html_file_GEB:
+
+                    html_header_and_css(html_file_GEB, project_name, nice_design)     
+                    for i, material_stats_obj in enumerate(materials_stats_list):
+                        material_stats_obj.GEB_to_html(html_file_GEB, project_name, logo, nice_design, i)
+                    close_html(html_file_GEB)
 
-        else:   #if not reports_pdfs_together:     #write GEB in the separate PDF at the end
-            output_pdf = os.path.join(folder, f'{project_name}.pdf')
-            to_pdf(report_file_path, output_pdf, open_all)
+                output_pdf = os.path.join(folder, f'Gesamteffizienbericht_{project_name}.pdf')
+                pdf_scheduler.submit(report_file_path, output_pdf)
+                manifest.files += [f'Gesamteffizienbericht_{project_name}.html', f'Gesamteffizienbericht_{project_name}.pdf']
 
-            report_file_path = os.path.join(folder, f'Gesamteffizienbericht_{project_name}.html')
+            if exporter is not None:
+                try:
+                    exporter.add_groups(materials_stats_list)
+                    exporter.close()
+                except IOError as e:
+                    dlg.output_box(f"Ein Fehler ist beim Schreiben der Exportdateien aufgetreten: {e}")
+                manifest.files += [name for name in exporter.file_names if name not in manifest.files]
+
+        if history:   #while the PDFs are converted
+            with profiler.timer('history'):
+                try:
+                    report_history.record_run(os.path.join(report_general_folder, report_history.HISTORY_FILE_NAME), project_name, sheet_table, materials_stats_list, report_flags)
+                except Exception as e:
+                    dlg.output_box(f"Die Effizienzdaten konnten nicht in der Verlaufsdatenbank gespeichert werden: {e}")
+
+        # _after_ all HTML files are written: wait for the conversions, then open the PDFs once
+        with profiler.timer('pdf'):
+            errors = failed_groups + pdf_scheduler.wait()
+        if errors:
+            message = "Fehler beim Erstellen der PDF-Datei(en):\n"
+            message += "\n".join(f"{os.path.basename(output_pdf)}: {e}" for output_pdf, e in errors)
+            dlg.output_box(message)
+
+        if incremental:
+            update_manifest(manifest, old_manifest, errors)
+
+        with profiler.timer('publish'):   #all files are written and converted
+            folder = publish_report_folder(folder, project_folder, show_warning_delete_folder)
+
+        uploader = None
+        if local_build:   #in large sequential writes, while the local PDFs are opened
+            uploader = report_upload.ReportUploader(folder, os.path.join(report_general_folder, os.path.basename(project_folder)))
+            uploader.start()
+
+        if auto_open and not export_only:
+            open_pdf(open_all and not summary_only, reports_pdfs_together and not summary_only, folder, browser_path)   #in the summary-only mode only the GEB
+
+        if uploader is not None:
+            with profiler.timer('upload'):
+                upload_errors = uploader.wait()
+            if upload_errors:   #the verified files are kept in the upload folder, the next run continues from there
+                message = f"Fehler beim Hochladen des Berichts nach '{report_general_folder}', er liegt lokal in '{folder}':\n"
+                message += "\n".join(f"{relative_path}: {e}" for relative_path, e in upload_errors)
+                dlg.output_box(message)
+            else:
+                folder = publish_report_folder(uploader.upload_folder, uploader.remote_folder, show_warning_delete_folder)
+
+        upload_info = {'uploaded_files': uploader.uploaded, 'skipped_files': uploader.skipped, 'reused_files': uploader.reused, 'uploaded_bytes': uploader.uploaded_bytes} if uploader else {}
+        profiler.write(os.path.join(folder, report_profile.PROFILE_FILE_NAME), project=project_name, sheets=total_sheets_amount, flags=report_flags, incremental=incremental, **upload_info)
+        return sheet_table
+    finally:
+        profiler.restore()
+
+
+def get_group_key(material, thickness):
+    """
+    :return: the "material_thickness" key of a material-thickness group, as it is used in the file names and in the manifest
+    :rtype: str
+    """
+    return f"{material}_{thickness}"
 
-            with open(report_file_path, 'w', encoding='utf-8') as html_file_GEB:
 
-                html_header_and_css(html_file_GEB, project_name, nice_design)     
-                for i, material_stats_obj in enumerate(materials_stats_list):
-                    material_stats_obj.GEB_to_html(html_file_GEB, project_name, logo, nice_design, i)
-                close_html(html_file_GEB)
+def get_group_hashes(snapshots, report_flags, piece_tables):
+    """
+    Calculates a hash of every material-thickness group from the snapshots and the pieces of its sheets and the config flags, 
+    that change the output. If the hash is the same as in the last run, the reports of the group don't have to be regenerated.
+
+    :param snapshots: the snapshots of all sheets
+    :type snapshots: iterable of SheetSnapshot
+    :param report_flags: the config flags that change the output
+    :type report_flags: dict
+    :param piece_tables: the pieces read here are kept for rendering
+    :type piece_tables: PieceTableCache
+    :return: "material_thickness" -> hash of the group as a hex string
+    :rtype: dict
+    """
+    flags = repr(sorted(report_flags.items())).encode('utf-8')
+    group_hashes = {}
+    for snapshot in snapshots:
+        group_key = get_group_key(snapshot.material, snapshot.thickness)
+        if group_key not in group_hashes:
+            group_hashes[group_key] = hashlib.sha1(flags)
+        group_hashes[group_key].update(repr((tuple(snapshot), list(piece_tables.get(snapshot.sheet)))).encode('utf-8'))
+    return {group_key: group_hash.hexdigest() for group_key, group_hash in group_hashes.items()}
 
-                output_pdf = os.path.join(folder, f'Gesamteffizienbericht_{project_name}.pdf')
-            to_pdf(report_file_path, output_pdf, open_all)
 
-    if divide_material and not reports_pdfs_together:
-        report_file_path = os.path.join(folder, f'Gesamteffizienbericht_{project_name}.html')
-        with open(report_file_path, 'w', encoding='utf-8') as html_file_GEB:
+def update_manifest(manifest, old_manifest, errors):
+    """
+    Saves the manifest of this run and deletes the files of the last run, that are not part of the report anymore.
+    Groups, whose PDF could not be converted, are saved without hash, so they are regenerated in the next run.
+
+    :param manifest: the manifest of this run
+    :type manifest: ReportManifest
+    :param old_manifest: the manifest of the last run, or None
+    :type old_manifest: ReportManifest
+    :param errors: (output_pdf, error) for every conversion that failed
+    :type errors: list
+    """
+    failed_pdfs = {os.path.basename(output_pdf) for output_pdf, e in errors}
+    for entry in manifest.groups.values():
+        if failed_pdfs.intersection(entry['files']):
+            entry['hash'] = None
+    if failed_pdfs.intersection(manifest.files):
+        manifest.groups = {key: dict(entry, hash=None) for key, entry in manifest.groups.items()}
+
+    if old_manifest is not None:
+        for name in old_manifest.all_files() - manifest.all_files():
+            try:
+                os.remove(os.path.join(manifest.folder, name))
+            except OSError:
+                pass
 
-            html_header_and_css(html_file_GEB, project_name, nice_design)     
-            for i, material_stats_obj in enumerate(materials_stats_list):
-                material_stats_obj.GEB_to_html(html_file_GEB, project_name, logo, nice_design, i)
-            close_html(html_file_GEB)
+    try:
+        manifest.save()
+    except OSError as e:
+        dlg.output_box(f"Fehler beim Schreiben der Datei '{REPORT_MANIFEST_NAME}': {e}")
 
-        output_pdf = os.path.join(folder, f'Gesamteffizienbericht_{project_name}.pdf')
-            to_pdf(report_file_path, output_pdf, open_all)
-        
 
 def open_pdf(open_all, reports_pdfs_together, folder, browser_path):
     """
@@ -300,7 +1753,7 @@ def open_pdf(open_all, reports_pdfs_together, folder, browser_path):
 
     if not open_all and not reports_pdfs_together: #if the conditions for having separate PDFs for GEB are met AND if the option "open_all" was not chosen:
         for filename in os.listdir(folder):
-            if filename.endswith(".pdf") and filename.startswith("Gesamteffizienzbericht_"):
+            if filename.endswith(".pdf") and filename.startswith("Gesamteffizienbericht_"):
                 pdfs_to_open.append(os.path.join(folder, filename))
 
     else: #if report sheet is together with GEB in one PDF OR if a user chose to open every PDF:
@@ -313,46 +1766,70 @@ def open_pdf(open_all, reports_pdfs_together, folder, browser_path):
         subprocess.Popen([browser_path, pdf], shell=False)
 
 
-def create_object_material_stats(material_and_thickness, sheets_values):
-    """
-    Creates a MaterialStats object for a specific material-thickness pair, calculating total area, reusable material,
-    and garbage material from the provided sheet data. Extracts the area, reusable material percentage, and leftover 
-    material percentage for each sheet.
-
-    :param material_and_thickness: a tuple containing the material and thickness.
-    :type material_and_thickness: tuple (str, float)
-    :param sheets_values: a list of sheets, where properties such as area, reusable material, and garbage material are extracted.
-    :type sheets_values: list
-    :return: a MaterialStats object representing the statistics for the material-thickness pair.
-    :rtype: MaterialStats
-    """
-
-    material, thickness = material_and_thickness
-    number_of_sheets = len(sheets_values)
-
-    total_area = 0
-    total_reusable = 0
-    total_garbage = 0
-    
-    for sheet in sheets_values:
-        area = nest.get_sheet_property(sheet, nest.SheetProperties.AREA)
-        mat_reusable = nest.get_sheet_property(sheet, nest.SheetProperties.RATE_REUSABLE)  # % of sheet reusable material
-        mat_leftover = nest.get_sheet_property(sheet, nest.SheetProperties.RATE_LEFT_OVER)  # % of sheet garbage not reusable material
-        area = area / 1000000  #to m²
-
-        total_area += area
-        total_reusable += mat_reusable
-        total_garbage += mat_leftover
-
-    return MaterialStats(
-        material=material,
-        thickness=thickness,
-        number_of_sheets=number_of_sheets,
-        total_area=total_area,
-        total_reusable=total_reusable,
-        total_garbage=total_garbage
-    )
+def concatenate_pdfs(input_pdfs, output_pdf):
+    """
+    Joins the pages of the PDFs into one PDF, without converting anything again (needs pypdf).
+
+    :param input_pdfs: the PDF files, in the order of their pages in output_pdf
+    :type input_pdfs: list
+    :param output_pdf: the PDF file to be created
+    :type output_pdf: str
+    """
+    writer = pypdf.PdfWriter()
+    for input_pdf in input_pdfs:
+        writer.append(input_pdf)
+    temp_pdf = output_pdf + '.tmp'   #so a half-written PDF is never seen under its name
+    with open(temp_pdf, 'wb') as pdf_file:
+        writer.write(pdf_file)
+    writer.close()
+    os.replace(temp_pdf, output_pdf)
+
+
+def copy_html_pages(html_file_object, group_report_path, start, end):
+    """
+    Copies the pages of one group (the bytes from start to end of its HTML file, without its header and GEB) into a report.
+
+    :param html_file_object: the file object of the report, in text mode
+    :type html_file_object: file-like object
+    :param group_report_path: the HTML file of the group
+    :type group_report_path: str
+    :param start: the position of the first page in the file
+    :type start: int
+    :param end: the position after the last page
+    :type end: int
+    """
+    html_file_object.flush()   #the pages follow the text written so far
+    with open(group_report_path, 'rb') as group_file:
+        group_file.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = group_file.read(min(remaining, HTML_WRITE_BUFFER))
+            if not chunk:
+                break
+            html_file_object.buffer.write(chunk)
+            remaining -= len(chunk)
+
+
+def to_pdf(report_file_path, output_pdf, browser_path):
+    """
+    Converts an HTML report to PDF with the browser in headless mode.
 
+    :param report_file_path: the HTML file to be converted
+    :type report_file_path: str
+    :param output_pdf: the PDF file to be created
+    :type output_pdf: str
+    :param browser_path: the file path to the browser executable (Chrome or Edge)
+    :type browser_path: str
+    """
+    command = [
+        browser_path,
+        '--headless',
+        '--disable-gpu',
+        '--no-pdf-header-footer',
+        f'--print-to-pdf={output_pdf}',
+        f'file:///{report_file_path}',
+    ]
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
 
 
 def run_config():
@@ -367,14 +1844,36 @@ def read_config_ini():
     """
     Returns a set of configuration parameters used for generating reports.
 
-    :return: a tuple containing:
+    :return: a ReportConfig (tuple) containing:
+        - do_report: whether the nesting report should be done (bool)
         - rotate: whether the pages should be 90° rotated (bool)
         - general_folder: where the folder where reports will be stored (str)
         - nice_design: whether the report will have a visually appealing design (bool)
+        - remove_color_fill: whether the color fill of the pieces should be removed (bool)
         - reports_pdfs_together: whether sheet report and material efficiency report will be combined into a single PDF (bool)
-        - only_measures_BW: whether the report will contain only measurements in black and white (bool)
         - divide_material: whether the materials should be divided into separate sections (bool)
-    :rtype: tuple
+        - auto_open: whether the PDFs should be opened in the browser automatically (bool)
+        - open_all: whether all PDFs should be opened, or only the total efficiency report(s) (bool)
+        - browser_path: the file path to the browser executable (str)
+        - ewd_file: whether the program works with .EWD files (True) or .EWB files (False) (bool)
+        - show_warning_delete_folder: whether to show a message when the existing folder is deleted (bool)
+        - incremental: whether only the material-thickness groups that changed since the last run should be regenerated (bool)
+        - profile: whether the run should be measured and written to profile.json (bool)
+        - svg_preview: whether the sheets are drawn as vector graphics from the piece data instead of taking previews from the view (bool)
+        - dedupe_layouts: whether sheets with identical layouts are shown on one page with their number (bool)
+        - aggregate_pieces: whether the pieces with the same label and size are shown in one row with their count (bool)
+        - sort_pieces_by_area: whether the aggregated rows are sorted by their total area (True) or their count (False) (bool)
+        - pieces_appendix: whether the aggregated table is followed by an appendix with every single piece (bool)
+        - history: whether the efficiency of every sheet and group is stored in the history database (bool)
+        - export_csv: whether the sheets, pieces and groups are exported as CSV files (bool)
+        - export_jsonl: whether they are exported as JSON Lines files (bool)
+        - export_parquet: whether they are exported as Parquet files (needs pyarrow) (bool)
+        - export_only: whether only the export files are written, without HTML and PDF (bool)
+        - summary_only: whether only the total efficiency report is written, without the pages and previews of the sheets (bool)
+        - local_build: whether the report is built in the local temp folder and then uploaded to report_pfad (bool)
+        - combined_report: whether the divided report also gets a combined report of all groups, assembled from the groups (bool)
+        - compact_layout: whether several small sheets are packed onto one page, with the header once per page (bool)
+    :rtype: ReportConfig
     """
 
     try:
@@ -389,9 +1888,15 @@ def read_config_ini():
         general_folder = os.path.join(general_folder, 'Report_new')
         #regardless of the user choice, there will be  created a new folde, that will only have report files, that are safe to delete
 
+        do_report = config.get('Druckeinstellungen', 'do_report') #if True, do_report
+        do_report = False if do_report == "0" or do_report == "False" else True
+
         nice_design = config.get('Druckeinstellungen', 'nice_design') #if True, nice_design
         nice_design = False if nice_design == "0" or nice_design =="False" else True
 
+        remove_color_fill = config.get('Druckeinstellungen', 'remove_color_fill') #if True, remove_color_fill
+        remove_color_fill = False if remove_color_fill == "0" or remove_color_fill == "False" else True
+
         reports_pdfs_together = config.get('Druckeinstellungen', 'reports_pdfs_together') #if True, reports_pdfs_together
         reports_pdfs_together = False if reports_pdfs_together == "0" or reports_pdfs_together =="False" else True
 
@@ -404,6 +1909,36 @@ def read_config_ini():
         rotate = config.get('Druckeinstellungen', 'rotate') #if True, rotate
         rotate = False if rotate == "0" or rotate == "False" else True
 
+        show_warning_delete_folder = config.get('Druckeinstellungen', 'show_warning_delete_folder') #if True, show a message before deleting the folder
+        show_warning_delete_folder = False if show_warning_delete_folder == "0" or show_warning_delete_folder == "False" else True
+
+        incremental = config.get('Druckeinstellungen', 'incremental', fallback="0") #if True, regenerate only the changed material-thickness groups
+        incremental = False if incremental == "0" or incremental == "False" else True
+
+        svg_preview = config.get('Druckeinstellungen', 'svg_preview', fallback="0") #if True, draw the sheets as vector graphics instead of taking the previews from the view
+        svg_preview = False if svg_preview == "0" or svg_preview == "False" else True
+
+        dedupe_layouts = config.get('Druckeinstellungen', 'dedupe_layouts', fallback="0") #if True, identical sheets get only one page with their number
+        dedupe_layouts = False if dedupe_layouts == "0" or dedupe_layouts == "False" else True
+
+        aggregate_pieces = config.get('Druckeinstellungen', 'aggregate_pieces', fallback="0") #if True, one row for all pieces with the same label and size
+        aggregate_pieces = False if aggregate_pieces == "0" or aggregate_pieces == "False" else True
+
+        sort_pieces_by_area = config.get('Druckeinstellungen', 'sort_pieces_by_area', fallback="0") #if True, the aggregated rows are sorted by area, else by count
+        sort_pieces_by_area = False if sort_pieces_by_area == "0" or sort_pieces_by_area == "False" else True
+
+        pieces_appendix = config.get('Druckeinstellungen', 'pieces_appendix', fallback="0") #if True, the aggregated table is followed by the list of every single piece
+        pieces_appendix = False if pieces_appendix == "0" or pieces_appendix == "False" else True
+
+        summary_only = config.get('Druckeinstellungen', 'summary_only', fallback="0") #if True, only the GEB is written, without the sheets
+        summary_only = False if summary_only == "0" or summary_only == "False" else True
+
+        combined_report = config.get('Druckeinstellungen', 'combined_report', fallback="0") #if True, the divided report also gets a combined report
+        combined_report = False if combined_report == "0" or combined_report == "False" else True
+
+        compact_layout = config.get('Druckeinstellungen', 'compact_layout', fallback="0") #if True, pack several sheets onto one page
+        compact_layout = False if compact_layout == "0" or compact_layout == "False" else True
+
         auto_open = config.get('Automatisch öffnen', 'auto_open') #if True, open automatically in Chrome
         auto_open = False if auto_open == "0" or auto_open == "False" else True
 
@@ -415,11 +1950,29 @@ def read_config_ini():
         ewd_file = config.get('Programm wählen', 'ewd_file') #if True, .EWD, else .EWB
         ewd_file = False if ewd_file == "0" or ewd_file == "False" else True
 
-        
-        return do_report, rotate, general_folder, nice_design, remove_color_fill, reports_pdfs_together, divide_material, auto_open, open_all, ewd_file
+        profile = config.get('Diagnose', 'profile', fallback="0") #if True, measure the run and write profile.json
+        profile = False if profile == "0" or profile == "False" else True
+
+        history = config.get('Verlauf', 'history', fallback="0") #if True, store the efficiency of the run in the history database
+        history = False if history == "0" or history == "False" else True
+
+        export_csv = config.get('Export', 'export_csv', fallback="0") #if True, export the sheets, pieces and groups as CSV
+        export_csv = False if export_csv == "0" or export_csv == "False" else True
+
+        export_jsonl = config.get('Export', 'export_jsonl', fallback="0") #if True, export them as JSON Lines
+        export_jsonl = False if export_jsonl == "0" or export_jsonl == "False" else True
+
+        export_parquet = config.get('Export', 'export_parquet', fallback="0") #if True, export them as Parquet
+        export_parquet = False if export_parquet == "0" or export_parquet == "False" else True
+
+        export_only = config.get('Export', 'export_only', fallback="0") #if True, only export, without HTML and PDF
+        export_only = False if export_only == "0" or export_only == "False" else True
+
+        local_build = config.get('Pfad', 'local_build', fallback="0") #if True, build the report locally and upload it to report_pfad afterwards
+        local_build = False if local_build == "0" or local_build == "False" else True
 
         
-        return rotate, general_folder, nice_design, reports_pdfs_together, only_measures_BW, divide_material
+        return ReportConfig(do_report, rotate, general_folder, nice_design, remove_color_fill, reports_pdfs_together, divide_material, auto_open, open_all, browser_path, ewd_file, show_warning_delete_folder, incremental, profile, svg_preview, dedupe_layouts, aggregate_pieces, sort_pieces_by_area, pieces_appendix, history, export_csv, export_jsonl, export_parquet, export_only, summary_only, local_build, combined_report, compact_layout)
 
     except FileNotFoundError:
         dlg.output_box('Fehler: Die Konfigurationsdatei "config.ini" wurde nicht gefunden. Bitte überprüfen Sie den Dateipfad.')
@@ -449,35 +2002,143 @@ def get_or_create_project_name():
 
 
 
-def make_or_delete_folder(general_folder, project_name, show_warning_delete_folder):
+def make_or_delete_folder(general_folder, project_name, show_warning_delete_folder, incremental, report_flags, keep_existing=False):
     """
-    Creates a folder for the project if it doesn't exist, or deletes and recreates it if it already exists.
+    Chooses the folder, where the report is built.
+
+    - A new report is built in a fresh staging folder next to the project folder, which replaces the project folder
+      only when the report is complete (see publish_report_folder()), so a half-written report is never seen
+      and the old folder doesn't have to be deleted before the report starts.
+    - In the incremental mode the existing folder is kept, if it has a manifest made with the same config flags.
+    - With keep_existing (only the export files are written) the existing folder is always kept.
+    - If the project folder does not exist yet, the report is built in it directly.
 
-    - If a folder already exists at the specified path, it is deleted and recreated to ensure a clean directory.
-    - If the folder does not exist, it will be created using the provided `general_folder` and `project_name`.
+    The staging and tombstone folders left over by interrupted runs are deleted in the background.
 
     :param general_folder: The base directory where the project folder will be created or recreated.
     :type general_folder: str
     :param project_name: The name of the project, which will be used as the folder name.
     :type project_name: str
-    :return: The full path to the created (or recreated) project folder.
-    :rtype: str
+    :param show_warning_delete_folder: whether to show a message when the existing folder is deleted
+    :type show_warning_delete_folder: bool
+    :param incremental: whether only the changed material-thickness groups should be regenerated
+    :type incremental: bool
+    :param report_flags: the config flags that change the output
+    :type report_flags: dict
+    :param keep_existing: whether an existing folder is kept with the reports of the last run
+    :type keep_existing: bool
+    :return: The folder where the report is built, the project folder (the same one, if the report is built in place) and the manifest of the last run (or None, if the folder is recreated).
+    :rtype: tuple (str, str, ReportManifest)
     """
-    #subfolder with the project name: it will be deleted, if it already exists, then the new folder will be created
+    #subfolder with the project name: if it already exists, it will be replaced by a new folder
     #(so the date of creation of this folder on user's pc will be fresh -> easy to sort)
-    folder = os.path.join(general_folder, f'{os.path.splitext(project_name)[0]}')
+    folder_name = os.path.splitext(project_name)[0]
+    folder = os.path.join(general_folder, folder_name)
+    remove_stale_report_folders(general_folder, folder_name)
+
+    if incremental:
+        old_manifest = ReportManifest.load(folder, report_flags)
+        if old_manifest is not None:
+            return folder, folder, old_manifest
 
+    if keep_existing and os.path.isdir(folder):
+        return folder, folder, None
+
+    build_folder = folder
     if os.path.exists(folder):
-        #maybe later add "ok" and "cancel"
-        remove_existing_folder_with_same_name(folder, show_warning_delete_folder)
+        build_folder = os.path.join(general_folder, f".{folder_name}{STAGING_FOLDER_MARK}{os.getpid()}-{datetime.datetime.now():%Y%m%d%H%M%S%f}")
+
+    try:
+        os.makedirs(build_folder, exist_ok=False)
+    except OSError as e:
+        dlg.output_box(f"Fehler beim Ordner erstellen in {build_folder}")
+    return build_folder, folder, None
+
+
+def local_build_folder(general_folder):
+    """
+    Returns the folder on the local storage, where the reports for general_folder are built with local_build.
+    It's kept between the runs (for the incremental mode and the preview cache), one for every report_pfad.
+
+    :param general_folder: the folder of the reports in report_pfad
+    :type general_folder: str
+    :return: the local folder
+    :rtype: str
+    """
+    path_hash = hashlib.sha1(os.path.normcase(os.path.abspath(general_folder)).encode('utf-8')).hexdigest()[:8]
+    return os.path.join(tempfile.gettempdir(), f"{LOCAL_BUILD_FOLDER}_{path_hash}", os.path.basename(general_folder))
+
+
+def remove_stale_report_folders(general_folder, folder_name):
+    """
+    Deletes in the background the tombstones of replaced reports of this project, that weren't deleted completely
+    (e.g. the program was closed meanwhile), and the staging folders of its interrupted runs. The folders of other projects
+    are left alone, they may belong to a run, that is still going on.
+
+    :param general_folder: the folder with the project folders
+    :type general_folder: str
+    :param folder_name: the name of the project folder
+    :type folder_name: str
+    """
+    try:
+        with os.scandir(general_folder) as entries:
+            stale = [entry.path for entry in entries if entry.is_dir() and
+                     entry.name.startswith((f".{folder_name}{TOMBSTONE_FOLDER_MARK}", f".{folder_name}{STAGING_FOLDER_MARK}"))]
+    except OSError:   #general_folder doesn't exist yet
+        return
+    for path in stale:
+        delete_folder_in_background(path)
 
-    else: #if folder doesn't exist, create
+
+def delete_folder_in_background(folder):
+    """
+    Deletes the folder and its content in a background thread. The thread is not a daemon, so the deletion
+    is finished before the program exits; whatever can't be deleted is left and tried again at the next run.
+
+    :param folder: the folder to delete
+    :type folder: str
+    """
+    threading.Thread(target=shutil.rmtree, args=(folder,), kwargs={'ignore_errors': True}, name='report-folder-cleanup').start()
+
+
+def publish_report_folder(build_folder, folder, show_warning_delete_folder):
+    """
+    Puts the finished report in place: the existing project folder is renamed to a tombstone, which is deleted
+    in the background, and the staging folder is renamed to the project folder. Both are renames inside general_folder,
+    so the project folder holds either the complete old or the complete new report.
+
+    If the old folder can't be renamed (e.g. one of its PDFs is still open), its files are deleted one by one, as before.
+
+    :param build_folder: the staging folder with the new report
+    :type build_folder: str
+    :param folder: the project folder
+    :type folder: str
+    :param show_warning_delete_folder: whether to show a message when the existing folder is deleted
+    :type show_warning_delete_folder: bool
+    :return: the folder of the report: the project folder, or the staging folder, if it couldn't be renamed
+    :rtype: str
+    """
+    if build_folder == folder:   #built in place
+        return folder
+
+    if os.path.exists(folder):
+        if show_warning_delete_folder:
+            dlg.output_box(f"Der Ordner '{folder}' und sein Inhalt werden durch den neuen Bericht ersetzt")
+        general_folder, folder_name = os.path.split(folder)
+        tombstone = os.path.join(general_folder, f".{folder_name}{TOMBSTONE_FOLDER_MARK}{os.getpid()}-{datetime.datetime.now():%Y%m%d%H%M%S%f}")
         try:
-            os.makedirs(folder, exist_ok=False)
-        except OSError as e:
-            dlg.output_box(f"Fehler beim Ordner erstellen in {folder}")
-    return folder
+            os.rename(folder, tombstone)
+        except OSError:
+            remove_existing_folder_with_same_name(folder, False)
+        else:
+            delete_folder_in_background(tombstone)
 
+    try:
+        os.rename(build_folder, folder)
+    except OSError as e:
+        dlg.output_box(f"Der neue Bericht konnte nicht nach '{folder}' verschoben werden, er liegt in '{build_folder}': {e}")
+        return build_folder
+    return folder
 
 
 def remove_existing_folder_with_same_name(folder, show_warning_delete_folder):
@@ -538,142 +2199,321 @@ def set_view_and_shading(nice_design):
         exec_bool("SetShading")
 
 
-def sort_for_material():
+def take_sheet_snapshot(sheet, material_and_thickness=None):
+    """
+    Reads every property of the sheet, that is needed for the report, exactly once.
+
+    :param sheet: the name of the sheet
+    :type sheet: str
+    :param material_and_thickness: (material, thickness) of the sheet, if they were already read (see read_sheet_groups())
+    :type material_and_thickness: tuple
+    :return: the snapshot with the sheet properties
+    :rtype: SheetSnapshot
+    """
+    if material_and_thickness is None:
+        material_and_thickness = (nest.get_sheet_property(sheet, nest.SheetProperties.MATERIAL), nest.get_sheet_property(sheet, nest.SheetProperties.THICKNESS))
+    return SheetSnapshot(
+        sheet=sheet,
+        material=material_and_thickness[0],
+        thickness=material_and_thickness[1],
+        width=nest.get_sheet_property(sheet, nest.SheetProperties.WIDTH),
+        height=nest.get_sheet_property(sheet, nest.SheetProperties.HEIGHT),
+        area=nest.get_sheet_property(sheet, nest.SheetProperties.AREA) / 1000000,    # m²
+        mat_reusable=nest.get_sheet_property(sheet, nest.SheetProperties.RATE_REUSABLE),    # % of sheet   reusable material
+        mat_leftover=nest.get_sheet_property(sheet, nest.SheetProperties.RATE_LEFT_OVER),   # % of sheet   garbage not reusable material
+        pieces_number=nest.get_sheet_property(sheet, nest.SheetProperties.PIECES_NUMBER),
+    )
+
+
+def read_sheet_groups(sheets):
+    """
+    Reads only material and thickness of every sheet, so the sheets of every group are known before the sheets are streamed.
+
+    :param sheets: the names of the sheets, as returned by nest.get_sheets()
+    :type sheets: list
+    :return: (material, thickness) of every sheet, in the order of the sheets
+    :rtype: list of tuple
+    """
+    get_sheet_property = nest.get_sheet_property
+    material, thickness = nest.SheetProperties.MATERIAL, nest.SheetProperties.THICKNESS
+    return [(get_sheet_property(sheet, material), get_sheet_property(sheet, thickness)) for sheet in sheets]
+
+
+def iter_sheet_snapshots(sheets, sheet_groups=None):
+    """
+    First stages of the report pipeline: enumerates the sheets and takes a snapshot of each one, one at a time.
+
+    :param sheets: the names of the sheets, as returned by nest.get_sheets()
+    :type sheets: list
+    :param sheet_groups: (material, thickness) of every sheet, if they were already read (see read_sheet_groups())
+    :type sheet_groups: list
+    :return: a generator of the snapshots of the sheets
+    :rtype: generator of SheetSnapshot
+    """
+    if sheet_groups is None:
+        for sheet in sheets:
+            yield take_sheet_snapshot(sheet)
+        return
+    for sheet, material_and_thickness in zip(sheets, sheet_groups):
+        yield take_sheet_snapshot(sheet, material_and_thickness)
+
+
+def export_sheets(layouts, exporter, piece_tables):
+    """
+    Stage of the report pipeline, that writes every streamed sheet and its pieces into the export files.
+    The pieces are passed on with the sheet, so the next stages (collapse_identical_layouts(), render_sheets()) don't read them again.
+
+    :param layouts: (snapshot, 1, pieces) for every sheet, pieces is None if they were not read yet
+    :type layouts: iterable of tuple
+    :param exporter: the export files
+    :type exporter: report_export.ReportExporter
+    :param piece_tables: the pieces, that were already read (in the incremental mode)
+    :type piece_tables: PieceTableCache
+    :return: a generator of (snapshot, count, pieces) for every sheet layout
+    :rtype: generator of tuple
+    """
+    for snapshot, count, pieces in layouts:
+        if pieces is None:
+            pieces = piece_tables.take(snapshot.sheet)
+        exporter.add_sheet(snapshot, count, pieces)
+        yield snapshot, count, pieces
+
+
+def group_for_material(layouts, sheet_table, skip_groups):
     """
-    Iterates through each sheet and creates a dictionary with key-value pairs to sort the sheets by material.
-    The function collects information about each sheet and organizes it into a dictionary where the keys 
-    are tuples of (material, thickness) and the values are lists of sheets corresponding to those keys. 
-    Additionally, it calculates the total number of sheets in a project.
+    Stage of the report pipeline, that sorts the streamed sheets by material and thickness. Instead of collecting the sheets, 
+    it only adds their values for the GEB to the sheet table, so the memory grows only by a few numbers per sheet.
+
+    :param layouts: (snapshot, count, pieces) for every sheet layout, as yielded by collapse_identical_layouts() 
+        (or by export_sheets(), or (snapshot, 1, None) for every sheet, if the identical sheets are not collapsed)
+    :type layouts: iterable of tuple
+    :param sheet_table: the table of the sheets, filled in place; new groups are added in the order in which they appear
+    :type sheet_table: SheetTable
+    :param skip_groups: the "material_thickness" keys of the groups, that are counted, but don't have to be rendered
+    :type skip_groups: set
+    :return: a generator of (material_and_thickness, snapshot, counter_sheet_in_sheets, count, pieces) for every sheet (layout) to be rendered
+    :rtype: generator of tuple
+    """
+    for snapshot, count, pieces in layouts:
+        key = (snapshot.material, snapshot.thickness) #tuple
+        counter_sheet_in_sheets = sheet_table.add(snapshot, count)   #index of this sheet among the sheets of its group; identical sheets count as often as they occur
+
+        if get_group_key(snapshot.material, snapshot.thickness) not in skip_groups:
+            yield key, snapshot, counter_sheet_in_sheets, count, pieces
 
-    :return: a tuple containing:
-        - materials_dict (dict): a dictionary with materials as keys and lists of sheets as values
-        - total_sheets_amount (int): the total number of sheets processed
+
+def collapse_identical_layouts(layouts, nice_design, piece_tables):
+    """
+    Stage of the report pipeline, that collapses sheets with the same layout (material, thickness, dimensions and 
+    label, size and position of every piece) into one, so only one preview and one page is rendered for them.
+    The count of every layout is only known after the last sheet, so unlike the other stages this one 
+    has to read all sheets before it yields anything. It keeps only the snapshot and the count of every distinct layout: 
+    the pieces are dropped after the fingerprint and read again by the render stage, so a project without repeated layouts 
+    costs the host calls of the pieces twice, but the memory doesn't grow with the pieces of the whole project.
+
+    :param layouts: (snapshot, count, pieces) for every sheet, as yielded by export_sheets() 
+        (or (snapshot, 1, None), if the sheets are not exported)
+    :type layouts: iterable of tuple
+    :param nice_design: specifies if the preview is rendered with shading (True) or in wireframe (False)
+    :type nice_design: bool
+    :param piece_tables: the pieces, that were already read (in the incremental mode)
+    :type piece_tables: PieceTableCache
+    :return: a generator of (snapshot, count, None) for every distinct layout, in the order of the first sheet with this layout
+    :rtype: generator of tuple
     """
-    materials_dict = {}
-    sheets = nest.get_sheets()
-    total_sheets_amount = len(sheets)
-    for sheet in sheets:
-        material = nest.get_sheet_property(sheet, nest.SheetProperties.MATERIAL)
-        thickness = nest.get_sheet_property(sheet, nest.SheetProperties.THICKNESS)
-        key = (material, thickness) #tuple
-        if key in materials_dict:
-            materials_dict[key].append(sheet)
+    distinct_layouts = {}   #fingerprint -> [snapshot of the first sheet, count]
+    for snapshot, count, pieces in layouts:
+        if pieces is None:
+            pieces = piece_tables.take(snapshot.sheet)
+        fingerprint = sheet_fingerprint(snapshot, pieces, nice_design)
+        layout = distinct_layouts.get(fingerprint)
+        if layout is None:
+            distinct_layouts[fingerprint] = [snapshot, count]
         else:
-            #materials_dict[(material, thickness)] = []   #tuple = list
-            materials_dict[key] = [sheet]
-    return materials_dict, total_sheets_amount
+            layout[1] += count
+
+    for snapshot, count in distinct_layouts.values():
+        yield snapshot, count, None
 
 
-def create_report(report_file_path, html_file, project_name, folder, img_ext, logo, nice_design, rotate, reports_pdfs_together, divide_material, sheets_to_report, total_sheets_amount, materials_dict, counter_for_full_pdf, counter_sheet_in_sheets):
+def render_sheets(grouped, folder, img_ext, logo, project_name, nice_design, rotate, reports_pdfs_together, divide_material, total_sheets_amount, preview_cache, svg_preview, piece_list, piece_tables, format_pool, format_page=None, compact_layout=False, group_header=True):
     """
-    Creates an HTML report by calling necessary functions and handles sheet rotation if required.
-    This function is intended to be called exclusively from the nesting_report() function, allowing for different parameters 
-    to be passed based on the specific situation.
-    
-    :param report_file_path: the file path where the report will be saved
-    :type report_file_path: str
-    :param html_file: the HTML file object to which content will be written
-    :type html_file: file-like object
-    :param project_name: the name of the project for inclusion in the report
-    :type project_name: str
+    Stage of the report pipeline, that takes the preview of every streamed sheet in the host thread 
+    and hands the page over to the format threads, so the next preview is taken while the page is formatted.
+
+    :param grouped: (material_and_thickness, snapshot, counter_sheet_in_sheets, count, pieces) for every sheet, as yielded by group_for_material()
+    :type grouped: iterable of tuple
     :param folder: the folder where the report will be located
     :type folder: str
     :param img_ext: the file extension for images included in the report (e.g., '.jpg')
     :type img_ext: str
     :param logo: the file path to the logo image to be included in the report
     :type logo: str
+    :param project_name: the name of the project for inclusion in the report
+    :type project_name: str
     :param nice_design: specifies if the report should use a nice design (True) or a simple design (False)
     :type nice_design: bool
-    :param rotate: indicates whether to rotate the sheets (True) or not (False)
+    :param rotate: indicates whether the sheets should be shown rotated by 90 degrees (True) or not (False)
     :type rotate: bool
     :param reports_pdfs_together: whether sheet report and material efficiency report will be combined into a single PDF
     :type reports_pdfs_together: bool
     :param divide_material: indicates if the report should be divided on separate PDFs by material types, or should it be written in a single PDF
     :type divide_material: bool
-    :param sheets_to_report: a collection of sheets to be included in the report
-    :type sheets_to_report: list
     :param total_sheets_amount: the total number of sheets from the project
     :type total_sheets_amount: int
-    :param materials_dict: a dictionary with keys as tuples of (material, thickness) and values as lists of corresponding sheets
-    :type materials_dict: dict
-    :param counter_for_full_pdf: a counter, that indicates to write the HTML header and CSS at the beginning of the PDF, if counter_for_full_pdf = 0
-    :type counter_for_full_pdf: int
-    :param counter_sheet_in_sheets: an index for tracking the current sheet within sheets_to_report
-    :type counter_sheet_in_sheets: int
+    :param preview_cache: the cache with the previews of the sheets from the previous runs
+    :type preview_cache: PreviewCache
+    :param svg_preview: whether the sheets are drawn as vector graphics (True) or previews are taken from the view (False)
+    :type svg_preview: bool
+    :param piece_list: how the pieces are listed on the pages
+    :type piece_list: PieceListOptions
+    :param piece_tables: the pieces, that were already read by the stages before
+    :type piece_tables: PieceTableCache
+    :param format_pool: the threads, that format the pages
+    :type format_pool: ThreadPoolExecutor
+    :param format_page: formats the page in a format thread (render_sheet_page(), if None; e.g. measured by the profiler)
+    :type format_page: callable
+    :param compact_layout: whether several sheets are packed onto one page (see CompactPageLayout)
+    :type compact_layout: bool
+    :param group_header: whether the pages of the divided report carry the name of their group in the header; 
+        False, if they are joined into the combined report too, which has the header of the project on every page
+    :type group_header: bool
+    :return: a generator of (material_and_thickness, snapshot, count, page) for every sheet, where page is the future of the HTML of the sheet
+    :rtype: generator of tuple
     """
-    
-    #TO DO: counter_sheet_in_sheets to have counter for sheets in sheets_to_report
-    try:
-        # #if reports_pdfs_together and divide_material:
-        # #I ALWAYS count stuff separately for material_thickness
-        #i need to have these variables as 0 for each key only if reports are split for material, 
-        #     or if that's the first key (pdf) for reports_pdfs_together=True
-        #it could be if divide_material or counter_for_full_pdf == 0: , 
-        #     but it's the same thing since in nesting_report if divide_material  I'm always passing 0 for counter_for_full_pdf
-        if counter_for_full_pdf == 0: 
-
-            #HTML header, file name and css
-            html_header_and_css(html_file, project_name, nice_design)
-
-        if rotate: #rotate sheets by 90 degrees
-            for sheet in sheets_to_report:
-                cad.rotate(sheet, 0, 0, -90, False)
-
-
-        for sheet in sheets_to_report:
-            sheet_obj = get_sheet_obj(folder, sheet, counter_sheet_in_sheets, img_ext)
-
-            counter_sheet_in_sheets = write_html(folder, html_file, logo, project_name, sheets_to_report, reports_pdfs_together, nice_design, divide_material, sheet_obj, total_sheets_amount)
-
-            if rotate:
-                cad.rotate(sheet, 0, 0, 90, False)
-
-    except IOError as e:
-        dlg.output_box(f"Ein Fehler ist beim Schreiben der Datei '{report_file_path}' aufgetreten: {e}")
-    except Exception as e:
-        dlg.output_box(f" :C {e}")
-
-
-
-def get_sheet_obj(folder, sheet, counter_sheet_in_sheets, img_ext):
+    if format_page is None:
+        format_page = render_sheet_page
+    page_layouts = {}   #(material, thickness) -> CompactPageLayout: the pages of every group are packed on their own
+    group_sheets = Counter()   #(material, thickness) -> number of pages of the group so far
+    for material_and_thickness, snapshot, counter_sheet_in_sheets, count, pieces in grouped:
+        #the preview is always taken unrotated, in the rotated report it's turned upright in the HTML (see render_picture()),
+        #so the sheets in the project are never changed
+        if pieces is None:
+            pieces = piece_tables.take(snapshot.sheet)
+        sheet_obj = get_sheet_obj(folder, snapshot, counter_sheet_in_sheets, img_ext, preview_cache, nice_design, svg_preview, count, pieces)
+
+        #in the divided report each group is its own report, named after the project, material and thickness
+        page_project_name = f"{project_name}_{get_group_key(*material_and_thickness)}" if divide_material and group_header else project_name
+
+        compact_page = None
+        if compact_layout:
+            page_layout = page_layouts.setdefault(material_and_thickness, CompactPageLayout())
+            #every part file of the combined report starts a new page, so its parts can be converted as chunks of their own
+            new_part = not divide_material and group_sheets[material_and_thickness] % PART_PAGES == 0
+            group_sheets[material_and_thickness] += 1
+            compact_page = page_layout.place(measure_sheet_block(snapshot, pieces, rotate, piece_list.aggregate), new_part)
+            if piece_list.aggregate and piece_list.appendix:   #the appendix with the single pieces follows on a page of its own
+                page_layout.end_page()
+
+        page = format_pool.submit(format_page, logo, page_project_name, reports_pdfs_together, divide_material, rotate, sheet_obj, total_sheets_amount, piece_list, compact_page)
+        yield material_and_thickness, snapshot, count, page
+
+
+def get_sheet_obj(folder, snapshot, counter_sheet_in_sheets, img_ext, preview_cache, nice_design, svg_preview, count=1, pieces=None):
     """
-    Creates a ReportSheet object for a given sheet by extracting its properties 
-    and generating the corresponding image path.
+    Creates a ReportSheet object for a given sheet from its snapshot 
+    and generates the corresponding image, or takes it from the preview cache, if the sheet layout didn't change.
+    With svg_preview no image is made: the sheet is drawn from its pieces in the HTML (see render_svg_picture()).
 
     :param folder: the folder where the sheet images are stored
     :type folder: str
-    :param sheet: the name of the sheet
-    :type sheet: str
+    :param snapshot: the snapshot of the sheet properties
+    :type snapshot: SheetSnapshot
     :param counter_sheet_in_sheets: the index of this sheet among sheets_to_report
     :type counter_sheet_in_sheets: int
     :param img_ext: the file extension for the sheet's image (e.g., '.jpg')
     :type img_ext: str
-
-    :return: a ReportSheet object containing the sheet's details
+    :param preview_cache: the cache with the previews of the sheets from the previous runs
+    :type preview_cache: PreviewCache
+    :param nice_design: specifies if the preview is rendered with shading (True) or in wireframe (False)
+    :type nice_design: bool
+    :param svg_preview: whether the sheet is drawn as vector graphic (True) or a preview is taken from the view (False)
+    :type svg_preview: bool
+    :param count: the number of identical sheets this sheet stands for
+    :type count: int
+    :param pieces: the pieces of the sheet, if they were already read, else None
+    :type pieces: PieceTable
+
+    :return: a ReportSheet object containing the sheet's details (img_path is None with svg_preview)
     :rtype: ReportSheet
     """
-    img_path = f"{folder}\{sheet}{img_ext}"
-    area = nest.get_sheet_property(sheet, nest.SheetProperties.AREA)
-    mat_leftover = nest.get_sheet_property(sheet, nest.SheetProperties.RATE_LEFT_OVER)      # % of sheet   garbage not reusable material
-    mat_reusable = nest.get_sheet_property(sheet, nest.SheetProperties.RATE_REUSABLE)       # % of sheet   reusable material
-    area = (area / 1000000)   # m2
+    sheet = snapshot.sheet
+    if pieces is None:
+        pieces = read_piece_table(sheet)
+    img_path = None
+
+    if not svg_preview:
+        img_path = f"{sheet}{img_ext}"   #the pages refer to the image relative to the report folder
+        img_file = os.path.join(folder, img_path)
 
-    if not os.path.isfile(img_path):
-        os.makedirs(os.path.dirname(img_path), exist_ok=True)
+        if not os.path.isfile(img_file):
+            os.makedirs(os.path.dirname(img_file), exist_ok=True)
 
-    view.zoom_on_object(sheet, ratio=1)
-    nest.get_sheet_preview(sheet, img_path, 0.3) # 0.3, so the lines will be thicker
+        fingerprint = sheet_fingerprint(snapshot, pieces, nice_design)
+
+        if not preview_cache.fetch(fingerprint, img_ext, img_file):
+            view.zoom_on_object(sheet, ratio=1)
+            nest.get_sheet_preview(sheet, img_file, 0.3) # 0.3, so the lines will be thicker
+            preview_cache.store(fingerprint, img_ext, img_file)
 
     return ReportSheet(
         sheet=sheet,
-        mat_leftover=mat_leftover,
-        mat_reusable=mat_reusable,
-        area=area,
+        mat_leftover=snapshot.mat_leftover,
+        mat_reusable=snapshot.mat_reusable,
+        area=snapshot.area,
         counter_sheet_in_sheets=counter_sheet_in_sheets,   #index of this sheet among sheets_to_report
         img_path=img_path,
+        snapshot=snapshot,
+        pieces=pieces,
+        count=count,
     )
 
 
+def read_piece_table(sheet):
+    """
+    Reads label, size and position of every piece on the sheet in one pass - these are all piece properties the report needs, 
+    so no other function has to call nest.get_piece_property().
+
+    :param sheet: the name of the sheet
+    :type sheet: str
+    :return: the pieces of the sheet
+    :rtype: PieceTable
+    """
+    get_piece_property = nest.get_piece_property
+    properties = nest.PieceProperties
+    label, width, height, pos_x, pos_y = properties.LABEL, properties.WIDTH, properties.HEIGHT, properties.POS_X, properties.POS_Y
+
+    table = PieceTable()
+    for piece in nest.get_pieces(sheet):
+        table.append(
+            get_piece_property(piece, label),
+            get_piece_property(piece, width),
+            get_piece_property(piece, height),
+            get_piece_property(piece, pos_x),
+            get_piece_property(piece, pos_y),
+        )
+    return table
+
+
+def sheet_fingerprint(snapshot, pieces, nice_design):
+    """
+    Calculates a fingerprint of everything that is visible on the sheet preview: material, thickness, dimensions 
+    and label, size and position of each piece, as well as the render settings. 
+    Two sheets with the same fingerprint have the same preview.
+
+    :param snapshot: the snapshot of the sheet properties
+    :type snapshot: SheetSnapshot
+    :param pieces: the pieces of the sheet
+    :type pieces: PieceTable
+    :param nice_design: specifies if the preview is rendered with shading (True) or in wireframe (False)
+    :type nice_design: bool
+    :return: the fingerprint as a hex string
+    :rtype: str
+    """
+    layout = (snapshot.material, snapshot.thickness, snapshot.width, snapshot.height, list(pieces), nice_design)
+    return hashlib.sha1(repr(layout).encode('utf-8')).hexdigest()
+
+
 
 def html_header_and_css(html_file_object, project_name, nice_design):
     """
@@ -754,6 +2594,40 @@ def write_nice_css(html_file_object):
             text-align: right;
         }
 
+        .rotated-picture {
+            position: relative;
+            display: inline-block;
+            overflow: hidden;
+        }
+
+        .rotated-picture img {
+            position: absolute;
+            top: 50%;
+            left: 50%;
+            transform: translate(-50%, -50%) rotate(90deg);
+            object-fit: contain;
+        }
+
+        .sheet-preview rect {
+            stroke: #1f3b63;
+            stroke-width: 1px;
+            vector-effect: non-scaling-stroke;
+        }
+
+        .sheet-preview .sheet {
+            fill: #eeeeee;
+        }
+
+        .sheet-preview .piece {
+            fill: #a9c4eb;
+        }
+
+        .sheet-preview text {
+            fill: #1f3b63;
+            text-anchor: middle;
+            dominant-baseline: central;
+        }
+
         #thick-border {
             border-width: 3px;
         }
@@ -783,6 +2657,17 @@ def write_nice_css(html_file_object):
             text-align: right;
             font-size: 20px;
         }
+        .compact-sheet {
+            display: block;
+            page-break-inside: avoid;
+        }
+        .compact-sheet th, .compact-sheet td {
+            font-size: 11px !important;
+            padding: 1px 3px;
+        }
+        .compact-sheet table {
+            margin-bottom: 4px;
+        }
     </STYLE>
 </HEAD>
 
@@ -842,6 +2727,32 @@ def write_css_printing(html_file_object):
             text-align: right;
         }
 
+        .rotated-picture {
+            position: relative;
+            display: inline-block;
+            overflow: hidden;
+        }
+
+        .rotated-picture img {
+            position: absolute;
+            top: 50%;
+            left: 50%;
+            transform: translate(-50%, -50%) rotate(90deg);
+            object-fit: contain;
+        }
+
+        .sheet-preview rect {
+            fill: none;
+            stroke: black;
+            stroke-width: 1px;
+            vector-effect: non-scaling-stroke;
+        }
+
+        .sheet-preview text {
+            text-anchor: middle;
+            dominant-baseline: central;
+        }
+
         .center-text, #thick-border th.center-text {
             font-size: 22px;
             padding: 3px;
@@ -859,6 +2770,17 @@ def write_css_printing(html_file_object):
             text-align: right;
             font-size: 20px;
         }
+        .compact-sheet {
+            display: block;
+            page-break-inside: avoid;
+        }
+        .compact-sheet th, .compact-sheet td {
+            font-size: 11px !important;
+            padding: 1px 3px;
+        }
+        .compact-sheet table {
+            margin-bottom: 4px;
+        }
     </STYLE>
     </HEAD>
     <BODY>
@@ -866,235 +2788,348 @@ def write_css_printing(html_file_object):
     html_file_object.write(line)
 
 
-def write_html(folder, html_file_object, logo, project_name, sheets_to_report, reports_pdfs_together, nice_design, divide_material, sheet_obj, total_sheets_amount):
+def render_sheet_page(logo, project_name, reports_pdfs_together, divide_material, rotate, sheet_obj, total_sheets_amount, piece_list, compact_page=None):
     """
-    Gets the sheet properties, writes HTML file, includes piece properties, 
-    and counts the efficiency for each sheet as well as the total efficiency.
+    Renders the whole page of one sheet - sheet information and picture, piece properties and
+    the efficiency for the sheet - into one string, so it can be written to the HTML file in a single call.
 
-    :param folder: the folder where the report will be saved
-    :type folder: str
-    :param html_file_object: the file object to which the HTML content will be written
-    :type html_file_object: file-like object
     :param logo: the path to the logo to be included in the report
     :type logo: str
     :param project_name: the name of the project for inclusion in the report
     :type project_name: str
-    :param sheets_to_report: a collection of sheets to be included in the report
-    :type sheets_to_report: list
     :param reports_pdfs_together: whether the sheet report and material efficiency report will be combined into a single PDF (bool)
     :type reports_pdfs_together: bool
-    :param nice_design: specifies if the report should use a nice design (True) or a simple design (False)
-    :type nice_design: bool
     :param divide_material: indicates if the report should be divided into separate PDFs by material types, or if it should be written in a single PDF
     :type divide_material: bool
+    :param rotate: indicates whether the sheet should be shown rotated by 90 degrees
+    :type rotate: bool
     :param sheet_obj: the ReportSheet object containing details for the current sheet
     :type sheet_obj: ReportSheet
     :param total_sheets_amount: the total number of sheets being reported on
     :type total_sheets_amount: int
+    :param piece_list: how the pieces are listed on the page
+    :type piece_list: PieceListOptions
+    :param compact_page: None for a page of its own; in the compact layout whether the sheet starts a new page (see CompactPageLayout)
+    :type compact_page: bool
 
-    :return: the updated counter of the current sheet in sheets_to_report
-    :rtype: int
+    :return: the HTML of the sheet page
+    :rtype: str
     """
-    sheet = sheet_obj.sheet   #count 0 for 1st sheet
-    mat_leftover = sheet_obj.mat_leftover
-    mat_reusable = sheet_obj.mat_reusable
-    area = sheet_obj.area
-    counter_sheet_in_sheets = sheet_obj.counter_sheet_in_sheets     # the number of sheet in sheets_to_report
-    img_path = sheet_obj.img_path
-
-
-    pieces = nest.get_sheet_property(sheet, nest.SheetProperties.PIECES_NUMBER)
-
-    write_sheet_info_and_picture(sheet, html_file_object, logo, counter_sheet_in_sheets, img_path, project_name, sheets_to_report, reports_pdfs_together, divide_material, total_sheets_amount)
-
-    #write down the individual information about the pieces on a sheet
-    write_pieces_info(sheet, html_file_object)
-
-    line = '</TABLE>\n' #closing mainTable
-    html_file_object.write(line)
-
-
-    efficiency_for_sheet(html_file_object, pieces, area, mat_leftover, mat_reusable)
-
-    #dlg.output_box(f"Ein Fehler ist beim Schreiben der Datei '{total_report_path}' aufgetreten: {e}")
-
-    line = '    </DIV>\n' #closing <DIV class="table-container">
-
-    html_file_object.write(line)
-    counter_sheet_in_sheets += 1  #the number of sheet in sheets_to_report
-    return counter_sheet_in_sheets
-
+    snapshot = sheet_obj.snapshot
+    box = None
+    if compact_page is not None:   #the picture is scaled to the size of the sheet
+        box = compact_picture_box(*((snapshot.height, snapshot.width) if rotate else (snapshot.width, snapshot.height)))
+    if sheet_obj.img_path is None:   #svg_preview
+        picture = render_svg_picture(snapshot.width, snapshot.height, sheet_obj.pieces, rotate, box)
+    else:
+        picture = render_picture(sheet_obj.img_path, snapshot.width, snapshot.height, rotate, box)
 
-def write_sheet_info_and_picture(sheet, html_file_object, logo, counter_sheet_in_sheets, img_path, project_name, sheets_to_report, reports_pdfs_together, divide_material, total_sheets_amount):
-    #write logo, project name, sheet picture, sheet stats (material, thickness, width, height, current_date)
+    if piece_list.aggregate:   #one row for all pieces with the same label and size
+        pieces_info = render_aggregated_pieces_info(sheet_obj.pieces, piece_list.sort_by_area)
+    else:
+        pieces_info = render_pieces_info(sheet_obj.pieces)
+
+    page = [
+        render_sheet_info_and_picture(snapshot, logo, sheet_obj.counter_sheet_in_sheets, picture, project_name, reports_pdfs_together, divide_material, total_sheets_amount, sheet_obj.count, compact_page),
+        pieces_info,    #the information about the pieces on a sheet
+        '</TABLE>\n',    #closing mainTable
+        render_efficiency_for_sheet(sheet_obj.snapshot.pieces_number, sheet_obj.area, sheet_obj.mat_leftover, sheet_obj.mat_reusable),
+        '    </DIV>\n',    #closing <DIV class="table-container">
+    ]
+    if piece_list.aggregate and piece_list.appendix:   #the single pieces after the sheet
+        page.append(render_pieces_appendix(sheet_obj.sheet, sheet_obj.pieces))
+    return ''.join(page)
+
+
+def render_sheet_info_and_picture(snapshot, logo, counter_sheet_in_sheets, picture, project_name, reports_pdfs_together, divide_material, total_sheets_amount, count=1, compact_page=None):
+    #logo, project name, sheet picture, sheet stats (material, thickness, width, height, current_date)
     """
-    Writes the individual sheet's information, including logo, project name, sheet picture, 
-    and various statistics (material, thickness, width, height, current date) 
-    to the HTML file.
+    Renders the individual sheet's information, including logo, project name, sheet picture, 
+    and various statistics (material, thickness, width, height, current date).
 
-    :param sheet: the name of the sheet
-    :type sheet: str
-    :param html_file_object: the file object to which the HTML content will be written
-    :type html_file_object: file-like object
+    :param snapshot: the snapshot of the sheet properties
+    :type snapshot: SheetSnapshot
     :param logo: the path to the logo to be included in the report
     :type logo: str
-    :param counter_sheet_in_sheets: the index of this sheet among sheets_to_report
+    :param counter_sheet_in_sheets: the index of this sheet among the sheets of its material-thickness group
     :type counter_sheet_in_sheets: int
-    :param img_path: the file path to the image of the sheet
-    :type img_path: str
+    :param picture: the HTML of the sheet picture (see render_picture() and render_svg_picture())
+    :type picture: str
     :param project_name: the name of the project for inclusion in the report
     :type project_name: str
-    :param sheets_to_report: a collection of sheets to be included in the report
-    :type sheets_to_report: list
     :param reports_pdfs_together: whether the sheet report and material efficiency report will be combined into a single PDF (bool)
     :type reports_pdfs_together: bool
     :param divide_material: indicates if the report should be divided into separate PDFs by material types, or if it should be written in a single PDF
     :type divide_material: bool
     :param total_sheets_amount: the total number of sheets being reported on
     :type total_sheets_amount: int
+    :param count: the number of identical sheets this page stands for; more than 1 is shown as "× count" after the sheet name
+    :type count: int
+    :param compact_page: None for a page of its own; in the compact layout whether the sheet starts a new page
+    :type compact_page: bool
+    :return: the HTML of the sheet information
+    :rtype: str
     """
 
-    material = nest.get_sheet_property(sheet, nest.SheetProperties.MATERIAL)
-    thickness = nest.get_sheet_property(sheet, nest.SheetProperties.THICKNESS)
-    width = nest.get_sheet_property(sheet, nest.SheetProperties.WIDTH)
-    height = nest.get_sheet_property(sheet, nest.SheetProperties.HEIGHT)
-    current_date = datetime.datetime.now().strftime("%d.%m.%Y")
-
-    if not divide_material:
-        amount_of_sheets_to_report = total_sheets_amount
-    if divide_material:
-        amount_of_sheets_to_report = len(sheets_to_report)
-    
-    line = ' '
-
-    if not divide_material and not reports_pdfs_together and (counter_sheet_in_sheets + 1) < amount_of_sheets_to_report:    # and reports_pdfs_together and last_sheet == sheet (or if counter == amount_of_sheets_to_report):   # and reports_pdfs_together:
-        line += '\n<DIV class="page-break-after"></DIV>\n'
-    elif not divide_material and reports_pdfs_together:
-        line += '\n<DIV class="page-break-after"></DIV>\n'
-    #elif not divide_material and not reports_pdfs_together:
-    elif divide_material:
-        if counter_sheet_in_sheets < amount_of_sheets_to_report:
-            line += '\n<DIV class="page-break-after"></DIV>\n'
-            
-
-    line += '    <HEADER style="display: inline-block; width: 100%; text-align: left;">\n'
-    line += f'        <IMG src="file:///{logo}" alt="company Logo" style="vertical-align: middle; width: 60px; height: 60px; margin: 0 10px 15px 0;">\n'
-    line += f'        <SPAN style="font-size: 35px; padding: 0 0 8px 0;">Projekt: {os.path.splitext(project_name)[0]} </SPAN>\n'
-    line += '    </HEADER>\n'
-    
-    #table for sheet information
-    line += '\n    <DIV class="table-container">\n'
-    line += '    <TABLE class="mainTable">\n'
-    html_file_object.write(line)
+    page_break = ''
+
+    #a divided report or a report together with the GEB always gets a page break before the sheet,
+    #(the index of the sheet is always smaller than the number of sheets in its group)
+    if compact_page is not None:   #only the first sheet of a page gets the page break and the header
+        page_break = PAGE_BREAK_HTML if compact_page else ''
+    elif divide_material or reports_pdfs_together:
+        page_break = PAGE_BREAK_HTML
+    elif (counter_sheet_in_sheets + 1) < total_sheets_amount:
+        page_break = PAGE_BREAK_HTML
+
+    return render_sheet_header(
+        page_break=page_break,
+        page_header=render_page_header(logo=logo, project=escape(os.path.splitext(project_name)[0])) if compact_page is not False else '',
+        container_class='table-container' if compact_page is None else 'table-container compact-sheet',
+        sheet=escape(str(snapshot.sheet)),
+        repeat=render_repeat(count=count) if count > 1 else '',
+        date=datetime.datetime.now().strftime("%d.%m.%Y"),
+        width=round(snapshot.width, 2),
+        height=round(snapshot.height, 2),
+        thickness=round(snapshot.thickness, 2),
+        material=escape(str(snapshot.material)),
+        picture=picture,
+    )
 
-    line = f'        <TR>\n            <TD style="font-size:30px" colspan="6">{sheet}</TD>\n'
 
-    line += f'            <TD colspan="4" class="right-align">{current_date}</TD>\n        </TR>\n'
-    html_file_object.write(line)
+def render_picture(img_path, width, height, rotate, box=None):
+    """
+    Renders the picture of the sheet. The preview is always taken unrotated; if rotate is True, it's turned by 90 degrees 
+    with CSS inside a box of the rotated size, which is the same as rotating the sheet before taking the preview, 
+    but without changing the project.
 
-    #sheet information - width, height, thickness, name, material
-    line = f"""
-        <TR>
-            <TD align="middle">Breite</TD>
-            <TD align="middle">{round(width, 2)}</TD>
-            <TD align="middle">Höhe</TD>
-            <TD align="middle">{round(height, 2)}</TD>
-            <TD align="middle">Stärke</TD>
-            <TD align="middle">{round(thickness, 2)}</TD>
-            <TD align="middle">Material</TD>
-            <TD align="middle">{material}</TD>
-        </TR>
+    :param img_path: the path of the image of the sheet, relative to the report folder (where the HTML files are)
+    :type img_path: str
+    :param width: the width of the sheet
+    :type width: float
+    :param height: the height of the sheet
+    :type height: float
+    :param rotate: indicates whether the picture should be rotated by 90 degrees
+    :type rotate: bool
+    :param box: (width, height) of the (rotated) picture in pt in the compact layout, else None (see compact_picture_box())
+    :type box: tuple
+    :return: the HTML of the picture
+    :rtype: str
+    """
+    if not rotate:
+        if box is not None:
+            size_img = f'style="width: {box[0]}pt; height: {box[1]}pt;"'
+        else:
+            size_img = "width=\"1200pt\"" if width > 3 * height else "height=\"400pt\""
+        return render_picture_tag(img_path=img_path.replace(os.sep, '/'), size_img=size_img)
+
+    #the rotated sheet is as wide as the sheet is high
+    if box is not None:
+        box_width, box_height = box
+    elif height > 3 * width:
+        box_width, box_height = 1200, 1200 * width / height
+    else:
+        box_width, box_height = 400 * height / width, 400
+    return render_rotated_picture_tag(img_path=img_path.replace(os.sep, '/'), box_width=round(box_width, 1), box_height=round(box_height, 1))
 
+
+def compact_picture_box(view_width, view_height):
     """
-    html_file_object.write(line)
+    Returns the size of the picture in the compact layout: scaled to the size of the sheet, so small offcuts get small pictures,
+    but at least COMPACT_PICTURE_MIN_HEIGHT high and at most COMPACT_PICTURE_MAX_WIDTH x COMPACT_PICTURE_MAX_HEIGHT, with the aspect of the sheet.
+
+    :param view_width: the width of the sheet as it's shown (the height, if it's rotated)
+    :type view_width: float
+    :param view_height: the height of the sheet as it's shown
+    :type view_height: float
+    :return: (width, height) of the picture in pt
+    :rtype: tuple
+    """
+    box_width, box_height = view_width * COMPACT_PICTURE_SCALE, view_height * COMPACT_PICTURE_SCALE
+    factor = max(1, COMPACT_PICTURE_MIN_HEIGHT / box_height) if box_height > 0 else 1
+    factor = min(factor, COMPACT_PICTURE_MAX_WIDTH / box_width if box_width > 0 else factor, COMPACT_PICTURE_MAX_HEIGHT / box_height if box_height > 0 else factor)
+    return round(box_width * factor, 1), round(box_height * factor, 1)
 
-    #picture from the sheet
-    size_img = "width=\"1200pt\"" if width > 3 * height else "height=\"400pt\""
-    line = f'   <TR>\n      <TD colspan="10">\n         <IMG src="file:///{img_path}" {size_img}>\n     </TD>\n        </TR>\n'
-    html_file_object.write(line)
 
+def measure_sheet_block(snapshot, pieces, rotate, aggregate):
+    """
+    Measures the height of one sheet in the compact layout, from the number of its piece rows and the size of its picture.
+
+    :param snapshot: the snapshot of the sheet
+    :type snapshot: SheetSnapshot
+    :param pieces: the pieces of the sheet
+    :type pieces: PieceTable
+    :param rotate: whether the sheet is shown rotated by 90 degrees
+    :type rotate: bool
+    :param aggregate: whether the pieces with the same label and size are shown in one row
+    :type aggregate: bool
+    :return: the height in pt
+    :rtype: float
+    """
+    _, picture_height = compact_picture_box(*((snapshot.height, snapshot.width) if rotate else (snapshot.width, snapshot.height)))
+    rows = len(set(zip(pieces.labels, pieces.widths, pieces.heights))) if aggregate else len(pieces.labels)
+    return COMPACT_SHEET_HEIGHT + picture_height + rows * COMPACT_ROW_HEIGHT
 
 
-def write_pieces_info(sheet, html_file_object):
-    #write down the individual information about the pieces on the sheet (n_piece_count, piece_label, piece_width,piece_height)
+def render_svg_picture(width, height, pieces, rotate, box=None):
+    """
+    Draws the sheet and the outlines of its pieces as inline SVG, from the sizes and positions of the pieces. 
+    Unlike the preview from the view it needs no host calls, so it can be rendered anywhere, and it stays sharp in the PDF.
+    The picture has the same size as the preview would have; if rotate is True, the sheet is turned by 90 degrees clockwise.
+    The colors depend on the design and are set in the CSS (.sheet-preview).
+
+    The positions of the pieces are the lower left corners in sheet coordinates (y upwards), SVG counts y downwards.
+
+    :param width: the width of the sheet
+    :type width: float
+    :param height: the height of the sheet
+    :type height: float
+    :param pieces: the pieces of the sheet, as returned by read_piece_table()
+    :type pieces: PieceTable
+    :param rotate: indicates whether the sheet should be shown rotated by 90 degrees
+    :type rotate: bool
+    :param box: (width, height) of the picture in pt in the compact layout, else None (see compact_picture_box())
+    :type box: tuple
+    :return: the HTML of the picture
+    :rtype: str
     """
-    Writes individual information about the pieces on the specified sheet 
-    to the HTML file.
+    if rotate:
+        view_width, view_height = height, width
+        transform = f"matrix(0 1 -1 0 {height} 0)"   #(x, y) -> (height - y, x)
+    else:
+        view_width, view_height = width, height
+        transform = "matrix(1 0 0 1 0 0)"
+
+    #the same size as render_picture() gives the preview
+    if box is not None:
+        box_width, box_height = box
+    elif view_width > 3 * view_height:
+        box_width, box_height = 1200, 1200 * view_height / view_width
+    else:
+        box_width, box_height = 400 * view_width / view_height, 400
+
+    shapes = []
+    for piece_label, piece_width, piece_height, piece_x, piece_y in pieces:
+        y = height - piece_y - piece_height
+        shapes.append(render_svg_piece(x=round(piece_x, 1), y=round(y, 1), width=round(piece_width, 1), height=round(piece_height, 1)))
+
+        label = str(piece_label)
+        font_size = min(piece_height * 0.5, piece_width / (0.6 * max(len(label), 1)))   #the label has to fit into the piece
+        if font_size >= min(width, height) * 0.02:   #smaller labels can't be read anyway
+            shapes.append(render_svg_label(x=round(piece_x + piece_width / 2, 1), y=round(y + piece_height / 2, 1), font_size=round(font_size, 1), label=escape(label)))
+
+    return render_svg_picture_tag(
+        box_width=round(box_width, 1),
+        box_height=round(box_height, 1),
+        view_width=round(view_width, 1),
+        view_height=round(view_height, 1),
+        transform=transform,
+        sheet_width=round(width, 1),
+        sheet_height=round(height, 1),
+        pieces=''.join(shapes),
+    )
 
-    :param sheet: the name of the sheet containing the pieces
-    :type sheet: str
-    :param html_file_object: the file object to which the HTML content will be written
-    :type html_file_object: file-like object
+
+
+def render_pieces_info(pieces):
+    #the individual information about the pieces on the sheet (n_piece_count, piece_label, piece_width,piece_height)
     """
-    pieces_on_sheet = nest.get_pieces(sheet)
-    n_piece_count = 1
-    for piece in pieces_on_sheet:
-        piece_width = nest.get_piece_property(piece, nest.PieceProperties.WIDTH)
-        piece_height = nest.get_piece_property(piece, nest.PieceProperties.HEIGHT)
-        piece_label = nest.get_piece_property(piece, nest.PieceProperties.LABEL)
+    Renders one table row with the individual information for every piece on the sheet.
 
-        line = f"""
-        <TR class="adjustable-table" style="width: 100%;">
-            <TD align="middle">Nr.</TD>
-            <TD align="middle">{n_piece_count}</TD>
-            <TD align="middle">Bezeichnung</TD>
-            <TD align="middle">{piece_label}</TD>
-            <TD align="middle">Breite</TD>
-            <TD align="middle">{round(piece_width, 2)}</TD>
-            <TD align="middle">Höhe</TD>
-            <TD align="middle">{round(piece_height, 2)}</TD>
-        </TR>
+    :param pieces: the pieces of the sheet, as returned by read_piece_table()
+    :type pieces: PieceTable
+    :return: the HTML of the piece rows
+    :rtype: str
+    """
+    return ''.join([
+        render_piece_row(n_piece_count, escape(str(piece_label)), round(piece_width, 2), round(piece_height, 2))
+        for n_piece_count, (piece_label, piece_width, piece_height, piece_x, piece_y) in enumerate(pieces, 1)
+    ])
 
-        """
-        html_file_object.write(line)
-        n_piece_count += 1
+
+def aggregate_pieces(pieces, sort_by_area):
+    """
+    Groups the pieces of a sheet by label, width and height in one pass over the piece data.
+
+    :param pieces: the pieces of the sheet, as returned by read_piece_table()
+    :type pieces: PieceTable
+    :param sort_by_area: sort the groups by their total area (count * width * height) instead of their count, the biggest first
+    :type sort_by_area: bool
+    :return: a list of (count, label, width, height); groups with the same count or area keep the order of their first piece
+    :rtype: list of tuple
+    """
+    counts = {}   #(label, width, height) -> number of pieces, in the order of the first piece
+    for key in zip(pieces.labels, pieces.widths, pieces.heights):
+        counts[key] = counts.get(key, 0) + 1
+
+    groups = [(count, label, width, height) for (label, width, height), count in counts.items()]
+    if sort_by_area:
+        groups.sort(key=lambda group: group[0] * group[2] * group[3], reverse=True)
+    else:
+        groups.sort(key=lambda group: group[0], reverse=True)
+    return groups
+
+
+def render_aggregated_pieces_info(pieces, sort_by_area):
+    """
+    Renders one table row for all pieces on the sheet with the same label and size, with their count.
+
+    :param pieces: the pieces of the sheet, as returned by read_piece_table()
+    :type pieces: PieceTable
+    :param sort_by_area: sort the rows by the total area of the pieces instead of their count
+    :type sort_by_area: bool
+    :return: the HTML of the piece rows
+    :rtype: str
+    """
+    return ''.join([
+        render_piece_group_row(count=count, label=escape(str(piece_label)), width=round(piece_width, 2), height=round(piece_height, 2))
+        for count, piece_label, piece_width, piece_height in aggregate_pieces(pieces, sort_by_area)
+    ])
 
 
+def render_pieces_appendix(sheet, pieces):
+    """
+    Renders the appendix of the sheet with one row for every single piece, which starts on a new page
+    and, unlike the sheet page, may be split across pages.
+
+    :param sheet: the name of the sheet
+    :type sheet: str
+    :param pieces: the pieces of the sheet, as returned by read_piece_table()
+    :type pieces: PieceTable
+    :return: the HTML of the appendix
+    :rtype: str
+    """
+    return render_pieces_appendix_tag(page_break=PAGE_BREAK_HTML, sheet=escape(str(sheet)), rows=render_pieces_info(pieces))
 
 
 
-def efficiency_for_sheet(html_file_object, pieces, area, mat_leftover, mat_reusable):
+def render_efficiency_for_sheet(pieces, area, mat_leftover, mat_reusable):
     """
-    Generates an efficiency report for the specified sheet, detailing the 
+    Renders an efficiency report for the specified sheet, detailing the 
     effectiveness of material usage.
     This report includes calculations based on the area of the sheet, 
     the percentage of reusable material, and the percentage of leftover material.
 
-    :param html_file_object: the file object to which the HTML report will be written
-    :type html_file_object: file-like object
-    :param pieces: a collection of individual pieces on the sheet
-    :type pieces: list
+    :param pieces: the number of pieces on the sheet
+    :type pieces: int
     :param area: the total area of the sheet in square meters
     :type area: float
     :param mat_leftover: the percentage of material that is not reusable for the sheet
     :type mat_leftover: float
     :param mat_reusable: the percentage of material that is reusable for the sheet
     :type mat_reusable: float
+    :return: the HTML of the efficiency table
+    :rtype: str
     """
+    return render_efficiency_table(
+        pieces=int(pieces),
+        area=round(area, 2),
+        reusable_area=round(mat_reusable * area /100, 2),
+        reusable=round(mat_reusable, 2),
+        leftover_area=round(mat_leftover * area /100, 2),
+        leftover=round(mat_leftover, 2),
+    )
 
-    html_file_object.write(f"""
-    <TABLE class="adjustable-table">
-        <TH colspan="3" class="center-text">Effizienzbericht</TH>
-        <TR>
-            <TD>Gutteile</TD>
-            <TH colspan="2" align="left">{int(pieces)}</TH>
-        </TR>
-        <TR>
-            <TD>Fläche der Platte</TD>
-            <TH colspan="2" align="left">{round(area, 2)} m²</TH>
-        </TR>
-        <TR>
-            <TD class="green">Wiederverwendbares Material</TD>
-            <TD class="green">{round(mat_reusable * area /100, 2)} m²</TD>
-            <TD class="green td-right">{round(mat_reusable, 2)}% der Platte</TD>
-        </TR>
-        <TR>
-            <TD class="grey">Nicht wiederverwendbares Material</TD>
-            <TD class="grey">{round(mat_leftover * area /100, 2) } m²</TD>
-            <TD class="grey td-right">{round(mat_leftover, 2)}% der Platte</TD>
-        </TR>
-    </TABLE>
-""")
 
 
 def close_html(html_file_object):
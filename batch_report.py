@@ -0,0 +1,269 @@
+"""
+Headless batch mode of the nesting report: opens many .ewd projects one after another and creates the report of each one,
+without any dialog. By default every project is reported in this process, in its host session: the host objects belong to
+the process (and thread) that created them, and the report already runs everything that doesn't need the host
+(formatting the pages, the PDF conversion) on threads of its own.
+
+With --processes N the projects are shared between N worker processes instead, each one with a host session of its own,
+that loads Nesting-report.py once and then reports one project after another. This only works, if the host allows
+a second headless session in a child process: if a worker can't start its session, the batch stops with an error.
+
+The reports are written into [Pfad] report_pfad of config.ini, like from the GUI, but the PDFs are never opened
+and no message box is shown: the messages are collected in batch_summary_<date>.json in the same folder,
+together with the time and the result of every project.
+
+    python batch_report.py D:\\Nestings\\2024-05-13
+    python batch_report.py D:\\Nestings\\a.ewd D:\\Nestings\\b.ewd --processes 2
+"""
+import os
+import sys
+import json
+import time
+import datetime
+import argparse
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+
+NESTING_REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Nesting-report.py')
+PROJECT_EXTENSION = '.ewd'
+BATCH_PROCESSES = 0   #worker processes with a host session of their own (--processes); 0: the projects are reported in this process
+
+
+_session = None   #(Nesting-report module, MessageCollector) of this process, see start_session()
+
+
+class MessageCollector:
+    """
+    Stands in for company.dlg in the headless batch mode: the messages of the report are collected for the summary instead of shown.
+
+    Attributes:
+        messages (list): the messages of the current project
+    """
+
+    def __init__(self):
+        self.messages = []
+
+
+    def output_box(self, message):
+        self.messages.append(str(message))
+
+
+def load_nesting_report():
+    """
+    Loads Nesting-report.py (its file name is not a valid module name).
+
+    :return: the loaded module
+    :rtype: module
+    """
+    folder = os.path.dirname(NESTING_REPORT_PATH)
+    if folder not in sys.path:
+        sys.path.insert(0, folder)   #for "import config"
+    spec = importlib.util.spec_from_file_location('nesting_report', NESTING_REPORT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def start_session():
+    """
+    Loads Nesting-report.py into the host session of this process and makes it headless
+    (messages are collected, the PDFs are not opened and the existing folders are deleted without asking).
+    """
+    global _session
+    module = load_nesting_report()
+    dialogs = MessageCollector()
+    module.dlg = dialogs
+
+    read_config_ini = module.read_config_ini
+
+    def read_batch_config():
+        settings = read_config_ini()
+        if settings is None:   #the error is already in dialogs.messages
+            return None
+        return settings._replace(auto_open=False, show_warning_delete_folder=False)
+
+    module.read_config_ini = read_batch_config
+    _session = (module, dialogs)
+
+
+def start_worker_session():
+    """
+    Initializer of a worker process (--processes): starts the session like start_session() and checks, that the host
+    answers in this process. If it doesn't, the initializer fails, the pool breaks and run_batch() stops the batch.
+    """
+    try:
+        start_session()
+        _session[0].ewd.get_project_name()   #the first call into the host session of this process
+    except Exception as e:
+        raise RuntimeError(f"Der Host hat im Worker-Prozess {os.getpid()} keine eigene Sitzung gestartet: {e}") from e
+
+
+def report_project(path):
+    """
+    Opens the project in the host session of this process and creates its report.
+
+    :param path: the path of the .ewd file
+    :type path: str
+    :return: the result of the project for the summary
+    :rtype: dict
+    """
+    module, dialogs = _session
+    dialogs.messages = []
+    result = {'path': path, 'ok': False, 'seconds': 0.0, 'error': None, 'messages': dialogs.messages, 'worker': os.getpid(), 'sheets': 0, 'groups': []}
+
+    start = time.perf_counter()
+    try:
+        module.ewd.open_project(path)
+        sheet_table = module.nesting_report()
+        result['ok'] = not dialogs.messages   #the report shows a message for every error it handles itself
+        if sheet_table is not None:   #the numbers of the GEB, so the summary compares the projects without opening the PDFs
+            result['sheets'] = int(sum(sheet_table.count))
+            result['groups'] = [
+                {'material': stats.material, 'thickness': stats.thickness, 'sheets': stats.number_of_sheets, 'area': stats.total_area,
+                 'average_reusable': stats.average_reusable, 'average_garbage': stats.average_garbage}
+                for stats in sheet_table.material_stats()
+            ]
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def find_projects(sources):
+    """
+    :param sources: .ewd files and folders with .ewd files
+    :type sources: list
+    :return: the paths of the projects, in the given order (the files of a folder sorted by name), without duplicates
+    :rtype: list
+    """
+    projects = []
+    for source in sources:
+        if os.path.isdir(source):
+            names = sorted(name for name in os.listdir(source) if name.lower().endswith(PROJECT_EXTENSION))
+            paths = [os.path.join(source, name) for name in names]
+        else:
+            paths = [source]
+        for path in paths:
+            path = os.path.abspath(path)
+            if path not in projects:
+                projects.append(path)
+    return projects
+
+
+def run_batch(projects, processes=BATCH_PROCESSES):
+    """
+    Reports the projects one after another in this process, or on a pool of worker processes (see --processes).
+
+    :param projects: the paths of the .ewd files
+    :type projects: list
+    :param processes: the number of worker processes, each one with a host session of its own; 0 for this process
+    :type processes: int
+    :return: the results of the projects, in the same order as the projects
+    :rtype: list
+    """
+    results = {}
+    if processes <= 0:
+        if _session is None:
+            start_session()
+        for path in projects:
+            results[path] = report_project(path)
+            print_progress(len(results), len(projects), results[path])
+        return [results[path] for path in projects]
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=start_worker_session) as pool:
+        futures = {pool.submit(report_project, path): path for path in projects}
+        try:
+            for future in as_completed(futures):
+                path = futures[future]
+                results[path] = future.result()   #report_project() catches the errors of the project itself
+                print_progress(len(results), len(projects), results[path])
+        except BrokenProcessPool as e:   #a worker couldn't start its host session, or the host crashed in it
+            for future in futures:
+                future.cancel()
+            raise RuntimeError("Die Worker-Prozesse haben keine eigene Host-Sitzung (siehe die Fehlermeldung oben). "
+                               "Ohne --processes werden die Projekte nacheinander in diesem Prozess erstellt.") from e
+    return [results[path] for path in projects]
+
+
+def print_progress(counter, total, result):
+    """
+    :param counter: the number of the finished projects
+    :type counter: int
+    :param total: the number of all projects
+    :type total: int
+    :param result: the result of the project, that was just finished
+    :type result: dict
+    """
+    print(f"[{counter}/{total}] {'OK    ' if result['ok'] else 'FEHLER'} {result['seconds']:8.1f}s  {result['path']}", flush=True)
+
+
+def write_summary(summary_path, results, processes, wall_time):
+    """
+    Writes the summary of the batch run.
+
+    :param summary_path: the path of the JSON file
+    :type summary_path: str
+    :param results: the results of run_batch()
+    :type results: list
+    :param processes: the number of worker processes (0: the projects were reported in this process)
+    :type processes: int
+    :param wall_time: the duration of the whole batch run in seconds
+    :type wall_time: float
+    """
+    failed = [result for result in results if not result['ok']]
+    summary = {
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'processes': processes,
+        'wall_time': wall_time,
+        'projects': len(results),
+        'succeeded': len(results) - len(failed),
+        'failed': len(failed),
+        'project_seconds': sum(result['seconds'] for result in results),
+        'sheets': sum(result.get('sheets', 0) for result in results),
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(summary_path), exist_ok=True)
+    with open(summary_path, 'w', encoding='utf-8') as summary_file:
+        json.dump(summary, summary_file, ensure_ascii=False, indent=1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('sources', nargs='+', help='.ewd files or folders with .ewd files')
+    parser.add_argument('--processes', type=int, default=BATCH_PROCESSES,
+                        help='number of worker processes, each one with a host session of its own; only if the host allows '
+                             'a second session in a child process (default: 0, every project in this process)')
+    parser.add_argument('--summary', help='path of the summary (default: batch_summary_<date>.json in the report folder)')
+    args = parser.parse_args(argv)
+
+    projects = find_projects(args.sources)
+    if not projects:
+        print(f"Keine {PROJECT_EXTENSION}-Dateien gefunden.")
+        return 1
+
+    summary_path = args.summary
+    if summary_path is None:   #next to the reports: [Pfad] report_pfad
+        settings = load_nesting_report().read_config_ini()
+        if settings is None:
+            return 1
+        summary_path = os.path.join(settings.general_folder, f"batch_summary_{datetime.datetime.now().strftime('%Y%m%d_%H-%M-%S')}.json")
+
+    processes = min(args.processes, len(projects))
+    start = time.perf_counter()
+    try:
+        results = run_batch(projects, processes)
+    except RuntimeError as e:
+        print(e)
+        return 2
+    wall_time = time.perf_counter() - start
+    write_summary(summary_path, results, processes, wall_time)
+
+    failed = sum(1 for result in results if not result['ok'])
+    print(f"{len(results) - failed} von {len(results)} Projekten erfolgreich, {wall_time:.1f}s. Zusammenfassung: {summary_path}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
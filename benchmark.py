@@ -0,0 +1,202 @@
+"""
+Synthetic benchmark of nesting_report() on the offline fake host (see fake_host.py).
+
+Generates projects with N sheets, M materials and K pieces per sheet, runs the whole report on each of them and times
+every stage of the pipeline (snapshot, group, render, PDF conversion and the rest: setup, writing, GEB).
+
+    python benchmark.py                                  #10, 1k and 50k sheets
+    python benchmark.py --sizes 1000 --pieces 200 --latency get_sheet_preview=0.02 --set divide_material=1
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from collections import Counter
+
+import fake_host
+
+
+DEFAULT_SIZES = (10, 1000, 50000)
+
+
+class StageTimer:
+    """
+    Measures the time spent inside the generator stages of the report pipeline. As every stage pulls from the one
+    before it, the measured times are inclusive; exclusive() subtracts the upstream stages.
+
+    Attributes:
+        inclusive (Counter): stage name -> seconds spent in the stage and all stages before it
+    """
+
+    def __init__(self):
+        self.inclusive = Counter()
+
+
+    def wrap(self, name, generator):
+        """
+        :return: the same generator, that adds the time of each step to the stage
+        :rtype: generator
+        """
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(generator)
+            except StopIteration:
+                self.inclusive[name] += time.perf_counter() - start
+                return
+            self.inclusive[name] += time.perf_counter() - start
+            yield item
+
+
+    def exclusive(self, order):
+        """
+        :param order: the names of the stages, from the first to the last
+        :type order: list
+        :return: stage name -> seconds spent only in this stage
+        :rtype: dict
+        """
+        result = {}
+        upstream = 0
+        for name in order:
+            result[name] = self.inclusive[name] - upstream
+            upstream = self.inclusive[name]
+        return result
+
+
+def run_benchmark(sheets_number, materials_number, pieces_per_sheet, layouts_number, latency, preview_size, settings, keep, profile=False, part_types=None):
+    """
+    Runs nesting_report() once on a synthetic project and times its stages.
+
+    :return: the results (stage times in seconds, host API call counts, messages of the report)
+    :rtype: dict
+    """
+    work_folder = tempfile.mkdtemp(prefix=f'nesting_report_{sheets_number}_')
+    project = fake_host.generate_project(sheets_number, materials_number, pieces_per_sheet, layouts_number, part_types)
+    host = fake_host.FakeHost(project, work_folder, latency, preview_size)
+    host.write_config(profile, **settings)
+    host.install()
+    nesting_report = fake_host.load_nesting_report()
+
+    timer = StageTimer()
+    iter_sheet_snapshots = nesting_report.iter_sheet_snapshots
+    group_for_material = nesting_report.group_for_material
+    render_sheets = nesting_report.render_sheets
+    wait = nesting_report.PdfScheduler.wait
+
+    def to_pdf(report_file_path, output_pdf, browser_path):
+        host.call('to_pdf')
+        with open(output_pdf, 'wb') as pdf_file:
+            pdf_file.write(b'%PDF-1.4\n%%EOF\n')
+
+    def timed_wait(scheduler):
+        start = time.perf_counter()
+        try:
+            return wait(scheduler)
+        finally:
+            timer.inclusive['pdf'] += time.perf_counter() - start
+
+    nesting_report.iter_sheet_snapshots = lambda *args: timer.wrap('snapshot', iter_sheet_snapshots(*args))
+    nesting_report.group_for_material = lambda *args: timer.wrap('group', group_for_material(*args))
+    nesting_report.render_sheets = lambda *args: timer.wrap('render', render_sheets(*args))
+    nesting_report.to_pdf = to_pdf
+    nesting_report.PdfScheduler.wait = timed_wait
+
+    start = time.perf_counter()
+    nesting_report.nesting_report()
+    total = time.perf_counter() - start
+
+    stages = timer.exclusive(['snapshot', 'group', 'render'])
+    stages['pdf'] = timer.inclusive['pdf']
+    stages['rest'] = total - sum(stages.values())
+    stages['total'] = total
+
+    profile_data = None
+    if profile:   #profile.json of the report itself (host API latencies, slowest sheets)
+        for root, dirs, files in os.walk(work_folder):
+            if nesting_report.report_profile.PROFILE_FILE_NAME in files:
+                with open(os.path.join(root, nesting_report.report_profile.PROFILE_FILE_NAME), encoding='utf-8') as profile_file:
+                    profile_data = json.load(profile_file)
+
+    if not keep:
+        shutil.rmtree(work_folder, ignore_errors=True)
+
+    return {
+        'sheets': sheets_number,
+        'materials': materials_number,
+        'pieces_per_sheet': pieces_per_sheet,
+        'stages': stages,
+        'calls': dict(host.calls),
+        'messages': host.messages,
+        'profile': profile_data,
+        'work_folder': work_folder if keep else None,
+    }
+
+
+STAGE_NAMES = ['snapshot', 'group', 'render', 'pdf', 'rest', 'total']
+
+
+def print_header():
+    print(f"{'sheets':>8} " + ' '.join(f"{name:>10}" for name in STAGE_NAMES) + f" {'calls':>10} {'per sheet':>10}")
+
+
+def print_result(result):
+    """
+    Prints the table row of one benchmark run.
+
+    :param result: the result of run_benchmark()
+    :type result: dict
+    """
+    calls = sum(result['calls'].values())
+    stages = ' '.join(f"{result['stages'][name]:>9.3f}s" for name in STAGE_NAMES)
+    print(f"{result['sheets']:>8} {stages} {calls:>10} {calls / result['sheets']:>10.1f}")
+    for message in result['messages']:
+        print(f"{'':>8} dlg.output_box: {message}")
+
+
+def parse_assignments(values, convert):
+    """
+    :return: "name=value" strings as a dict
+    :rtype: dict
+    """
+    result = {}
+    for value in values or []:
+        name, _, value = value.partition('=')
+        result[name] = convert(value)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='numbers of sheets (N)')
+    parser.add_argument('--materials', type=int, default=5, help='number of materials (M), each in 2 thicknesses')
+    parser.add_argument('--pieces', type=int, default=20, help='pieces per sheet (K)')
+    parser.add_argument('--layouts', type=int, default=None, help='number of different sheet layouts (default: every sheet is different)')
+    parser.add_argument('--part-types', type=int, default=None, help='number of different parts per sheet (default: every piece is different)')
+    parser.add_argument('--latency', action='append', metavar='CALL=SECONDS', help="latency of a host API call, e.g. get_sheet_preview=0.02; '*' sets all calls")
+    parser.add_argument('--preview-size', type=int, default=8 * 1024, help='size of the synthetic previews in bytes')
+    parser.add_argument('--set', action='append', metavar='OPTION=VALUE', help='option in [Druckeinstellungen], e.g. divide_material=1')
+    parser.add_argument('--json', metavar='PATH', help='write the results as JSON')
+    parser.add_argument('--keep', action='store_true', help='keep the generated reports')
+    parser.add_argument('--profile', action='store_true', help='enable [Diagnose] profile and add profile.json of each run to the JSON results')
+    args = parser.parse_args(argv)
+
+    latency = parse_assignments(args.latency, float)
+    settings = parse_assignments(args.set, str)
+
+    print_header()
+    results = []
+    for sheets_number in args.sizes:
+        results.append(run_benchmark(sheets_number, args.materials, args.pieces, args.layouts, latency, args.preview_size, settings, args.keep, args.profile, args.part_types))
+        print_result(results[-1])
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as json_file:
+            json.dump(results, json_file, indent=1)
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    main()
@@ -30,10 +30,20 @@ def run_config():
     cfg.add_parameter('Druckeinstellungen', 'Druckeinstellungen\\remove_color_fill', 'Farbfüllung des Details entfernen (um Druckertinte zu sparen)', ConfigParamType.BOOLEAN, False)
     cfg.add_parameter('Druckeinstellungen', 'Druckeinstellungen\\reports_pdfs_together', 'Effizienzbericht zusammen mit Gesamteffizienzbericht in einem PDF', ConfigParamType.BOOLEAN, False)
     cfg.add_parameter('Druckeinstellungen', 'Druckeinstellungen\\divide_material', 'Teile den Bericht nach Material und Dicke auf', ConfigParamType.BOOLEAN, False)
+    cfg.add_parameter('Druckeinstellungen', 'Druckeinstellungen\\combined_report', 'Beim aufgeteilten Bericht zusätzlich einen Bericht aller Materialien erstellen (aus den Berichten der Gruppen, ohne die Platten erneut zu erstellen)', ConfigParamType.BOOLEAN, False)
     cfg.add_parameter('Druckeinstellungen', 'Druckeinstellungen\\rotate', 'Die Platten hochkant drehen', ConfigParamType.BOOLEAN, False)
+    cfg.add_parameter('Druckeinstellungen', 'Druckeinstellungen\\compact_layout', 'Mehrere kleine Platten auf einer Seite zusammenfassen (Kopfzeile nur einmal pro Seite)', ConfigParamType.BOOLEAN, False)
     cfg.add_parameter('Druckeinstellungen', 'Druckeinstellungen\\show_warning_delete_folder', 'Meldung anzeigen, wenn der bestehende Ordner gelöscht wird', ConfigParamType.BOOLEAN, True)
+    cfg.add_parameter('Druckeinstellungen', 'Druckeinstellungen\\incremental', 'Nur geänderte Material-/Dicken-Gruppen neu erstellen (der Ordner wird nicht gelöscht)', ConfigParamType.BOOLEAN, False)
+    cfg.add_parameter('Druckeinstellungen', 'Druckeinstellungen\\svg_preview', 'Platten als Vektorgrafik aus den Teilemaßen zeichnen (schneller, ohne Ansicht; nur Umrisse der Teile)', ConfigParamType.BOOLEAN, False)
+    cfg.add_parameter('Druckeinstellungen', 'Druckeinstellungen\\dedupe_layouts', 'Identische Platten nur einmal mit ihrer Anzahl (× N) aufführen', ConfigParamType.BOOLEAN, False)
+    cfg.add_parameter('Druckeinstellungen', 'Druckeinstellungen\\aggregate_pieces', 'Gleiche Teile (Bezeichnung und Maße) in einer Zeile mit ihrer Anzahl zusammenfassen', ConfigParamType.BOOLEAN, False)
+    cfg.add_parameter('Druckeinstellungen', 'Druckeinstellungen\\sort_pieces_by_area', 'Zusammengefasste Teile nach Fläche sortieren (sonst nach Anzahl)', ConfigParamType.BOOLEAN, False)
+    cfg.add_parameter('Druckeinstellungen', 'Druckeinstellungen\\pieces_appendix', 'Zusätzlich alle einzelnen Teile als Anhang nach jeder Platte aufführen', ConfigParamType.BOOLEAN, False)
+    cfg.add_parameter('Druckeinstellungen', 'Druckeinstellungen\\summary_only', 'Nur den Gesamteffizienzbericht erstellen (ohne Platten und Vorschaubilder, schnell zum Prüfen der Ausbeute)', ConfigParamType.BOOLEAN, False)
     
     cfg.add_parameter('Pfad', 'Pfad\\report_pfad', 'Report Pfad wählen', ConfigParamType.DIRECTORY, ewd.explode_file_path('%TEMPPATH%'))
+    cfg.add_parameter('Pfad', 'Pfad\\local_build', 'Bericht lokal im Temp-Ordner erstellen und danach in den Report Pfad hochladen (schneller auf Netzlaufwerken)', ConfigParamType.BOOLEAN, False)
 
     cfg.add_parameter('Automatisch öffnen', 'Automatisch öffnen\\auto_open', 'Die PDF-Datei(en) automatich in Browser öffnen', ConfigParamType.BOOLEAN, False)
     cfg.add_parameter('Automatisch öffnen', 'Automatisch öffnen\\open_all', 'Alle Reports automatisch in Browser öffnen (sonst - nur den Gesamteffizienzbericht(e))', ConfigParamType.BOOLEAN, False)
@@ -41,6 +51,15 @@ def run_config():
 
     cfg.add_parameter('Programm wählen', 'Programm wählen\\ewd_file', 'Aktivieren für .EWD Dateien, sonst .EWB', ConfigParamType.BOOLEAN, True)
 
+    cfg.add_parameter('Export', 'Export\\export_csv', 'Platten, Teile und Material-/Dicken-Gruppen als CSV-Dateien exportieren', ConfigParamType.BOOLEAN, False)
+    cfg.add_parameter('Export', 'Export\\export_jsonl', 'Platten, Teile und Material-/Dicken-Gruppen als JSON-Lines-Dateien exportieren', ConfigParamType.BOOLEAN, False)
+    cfg.add_parameter('Export', 'Export\\export_parquet', 'Platten, Teile und Material-/Dicken-Gruppen als Parquet-Dateien exportieren (benötigt pyarrow)', ConfigParamType.BOOLEAN, False)
+    cfg.add_parameter('Export', 'Export\\export_only', 'Nur exportieren, ohne HTML- und PDF-Bericht (ohne Format: CSV)', ConfigParamType.BOOLEAN, False)
+
+    cfg.add_parameter('Verlauf', 'Verlauf\\history', 'Effizienz jeder Platte und Gruppe in der Verlaufsdatenbank (efficiency_history.sqlite im Report-Pfad) speichern', ConfigParamType.BOOLEAN, False)
+
+    cfg.add_parameter('Diagnose', 'Diagnose\\profile', 'Laufzeiten messen und als profile.json im Report-Ordner speichern', ConfigParamType.BOOLEAN, False)
+
     cfg.run()
 
 
@@ -0,0 +1,357 @@
+"""
+Offline stand-in for the host APIs of the CAD program (ewd, company.nest, company.cad, company.view, company.dlg,
+company.gdb, sclcore and confdlg), so that Nesting-report.py can run and be timed outside of the CAD program.
+
+    host = FakeHost(generate_project(1000, 5, 20), work_folder)
+    host.install()                      #puts the fake modules into sys.modules
+    nesting_report = load_nesting_report()
+
+Every API call can be slowed down with a configurable latency, and nest.get_sheet_preview() writes a synthetic JPEG.
+"""
+import os
+import sys
+import enum
+import time
+import types
+import base64
+import importlib.util
+from collections import Counter
+
+
+#the smallest JPEG browsers accept (1x1 pixel), it's padded with comment segments up to the wanted preview size
+TINY_JPEG = base64.b64decode(
+    '/9j/4AAQSkZJRgABAQEASABIAAD/2wBDAP//////////////////////////////////////////////////////////////////'
+    '////////////////////wgALCAABAAEBAREA/8QAFBABAAAAAAAAAAAAAAAAAAAAAP/aAAgBAQABPxA='
+)
+
+NESTING_REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Nesting-report.py')
+
+
+class SheetProperties(enum.Enum):
+    MATERIAL = 'material'
+    THICKNESS = 'thickness'
+    WIDTH = 'width'
+    HEIGHT = 'height'
+    AREA = 'area'
+    RATE_REUSABLE = 'rate_reusable'
+    RATE_LEFT_OVER = 'rate_left_over'
+    PIECES_NUMBER = 'pieces_number'
+
+
+class PieceProperties(enum.Enum):
+    LABEL = 'label'
+    WIDTH = 'width'
+    HEIGHT = 'height'
+    POS_X = 'pos_x'
+    POS_Y = 'pos_y'
+
+
+class FakeProject:
+    """
+    A synthetic nesting project. The sheets and pieces are not stored, every property is calculated from the index
+    of the sheet and the piece, so even projects with 50k sheets and millions of pieces take almost no memory.
+
+    Attributes:
+        name (str): the name of the project (e.g. 'Synthetic_1000.ewd')
+        sheets_number (int): the number of sheets
+        materials_number (int): the number of materials; every material comes in 2 thicknesses
+        pieces_per_sheet (int): the number of pieces on every sheet
+        layouts_number (int): the number of different sheet layouts; sheets with the same layout are identical copies
+        part_types (int): the number of different parts (label and size) on a sheet; the pieces repeat them (small-parts jobs)
+        sheet_names (list): the names of the sheets, as returned by nest.get_sheets()
+        sheet_index (dict): sheet name -> index of the sheet
+    """
+
+    SHEET_WIDTH = 2800.0
+    SHEET_HEIGHT = 2070.0
+    THICKNESSES = (19.0, 25.0)
+
+    def __init__(self, name, sheets_number, materials_number, pieces_per_sheet, layouts_number=None, part_types=None):
+        self.name = name
+        self.sheets_number = sheets_number
+        self.materials_number = materials_number
+        self.pieces_per_sheet = pieces_per_sheet
+        self.layouts_number = layouts_number or sheets_number
+        self.part_types = part_types or pieces_per_sheet
+        self.sheet_names = [f"Sheet_{i + 1}" for i in range(sheets_number)]
+        self.sheet_index = {sheet: i for i, sheet in enumerate(self.sheet_names)}
+
+
+    def layout(self, i):
+        """
+        :return: the layout index of the sheet with index i
+        :rtype: int
+        """
+        return i % self.layouts_number
+
+
+    def sheet_property(self, i, prop):
+        """
+        :return: the property of the sheet with index i
+        """
+        layout = self.layout(i)
+        group = layout % (self.materials_number * len(self.THICKNESSES))
+        if prop is SheetProperties.MATERIAL:
+            return f"Material_{group // len(self.THICKNESSES) + 1}"
+        if prop is SheetProperties.THICKNESS:
+            return self.THICKNESSES[group % len(self.THICKNESSES)]
+        if prop is SheetProperties.WIDTH:
+            return self.SHEET_WIDTH
+        if prop is SheetProperties.HEIGHT:
+            return self.SHEET_HEIGHT
+        if prop is SheetProperties.AREA:
+            return self.SHEET_WIDTH * self.SHEET_HEIGHT
+        if prop is SheetProperties.RATE_REUSABLE:
+            return 5.0 + layout * 7 % 30
+        if prop is SheetProperties.RATE_LEFT_OVER:
+            return 2.0 + layout * 3 % 10
+        if prop is SheetProperties.PIECES_NUMBER:
+            return float(self.pieces_per_sheet)
+        raise KeyError(prop)
+
+
+    def piece_property(self, i, j, prop):
+        """
+        :return: the property of the piece with index j on the sheet with index i
+        """
+        layout = self.layout(i)
+        columns = max(1, int(self.pieces_per_sheet ** 0.5))
+        part = j % self.part_types
+        width = 100.0 + (layout * 7 + part * 13) % 400
+        height = 50.0 + (layout * 11 + part * 17) % 300
+        if prop is PieceProperties.LABEL:
+            return f"Part_{(layout * 31 + part) % 997}"
+        if prop is PieceProperties.WIDTH:
+            return width
+        if prop is PieceProperties.HEIGHT:
+            return height
+        if prop is PieceProperties.POS_X:
+            return (j % columns) * 500.0
+        if prop is PieceProperties.POS_Y:
+            return (j // columns) * 360.0
+        raise KeyError(prop)
+
+
+def generate_project(sheets_number, materials_number=5, pieces_per_sheet=20, layouts_number=None, part_types=None):
+    """
+    Generates a synthetic project with N sheets, M materials and K pieces per sheet.
+
+    :param sheets_number: the number of sheets (N)
+    :type sheets_number: int
+    :param materials_number: the number of materials (M)
+    :type materials_number: int
+    :param pieces_per_sheet: the number of pieces on every sheet (K)
+    :type pieces_per_sheet: int
+    :param layouts_number: the number of different sheet layouts, None if every sheet is different
+    :type layouts_number: int
+    :param part_types: the number of different parts on a sheet, None if every piece is different
+    :type part_types: int
+    :rtype: FakeProject
+    """
+    return FakeProject(f"Synthetic_{sheets_number}.ewd", sheets_number, materials_number, pieces_per_sheet, layouts_number, part_types)
+
+
+class FakeHost:
+    """
+    Builds the fake host modules for one project and counts every API call.
+
+    Attributes:
+        project (FakeProject): the project that is "open" in the host
+        work_folder (str): the folder for config.ini, the reports and the temp files
+        latency (dict): API call name (e.g. 'get_sheet_property') -> latency in seconds, '*' is the default for all calls
+        preview_size (int): the size of the synthetic previews in bytes
+        calls (Counter): API call name -> number of calls
+        messages (list): the messages shown by dlg.output_box()
+        modules (dict): module name -> fake module
+    """
+
+    def __init__(self, project, work_folder, latency=None, preview_size=30 * 1024):
+        self.project = project
+        self.work_folder = work_folder
+        self.latency = dict(latency or {})
+        self.preview_size = preview_size
+        self.calls = Counter()
+        self.messages = []
+        self.preview_bytes = self.make_preview(preview_size)
+        self.modules = self.build_modules()
+
+
+    @staticmethod
+    def make_preview(size):
+        """
+        :return: a valid JPEG of about the given size
+        :rtype: bytes
+        """
+        padding = b''
+        missing = size - len(TINY_JPEG)
+        while missing > 4:
+            chunk = min(missing - 4, 65533)
+            padding += b'\xff\xfe' + (chunk + 2).to_bytes(2, 'big') + b'\0' * chunk   #COM segment
+            missing -= chunk + 4
+        return TINY_JPEG[:2] + padding + TINY_JPEG[2:]
+
+
+    def call(self, name):
+        """
+        Counts the API call and waits for its latency.
+
+        :param name: the name of the API call
+        :type name: str
+        """
+        self.calls[name] += 1
+        seconds = self.latency.get(name, self.latency.get('*', 0))
+        if seconds <= 0:
+            return
+        if seconds >= 0.002:
+            time.sleep(seconds)
+        else:   #time.sleep() is too coarse for microseconds
+            end = time.perf_counter() + seconds
+            while time.perf_counter() < end:
+                pass
+
+
+    def write_config(self, profile=False, history=False, export=None, local_build=False, **settings):
+        """
+        Writes config.ini for Nesting-report.py into the work folder.
+
+        :param profile: the option [Diagnose] profile (write profile.json into the report folder)
+        :type profile: bool
+        :param history: the option [Verlauf] history (store the run in the efficiency history database)
+        :type history: bool
+        :param export: the options in [Export], e.g. {'export_csv': True}
+        :type export: dict
+        :param local_build: the option [Pfad] local_build (build the report locally, then upload it into report_pfad)
+        :type local_build: bool
+        :param settings: the values of the options in [Druckeinstellungen] (e.g. divide_material=True)
+        """
+        options = {
+            'do_report': True, 'nice_design': False, 'remove_color_fill': False, 'reports_pdfs_together': False,
+            'divide_material': False, 'rotate': False, 'show_warning_delete_folder': False, 'incremental': False,
+        }
+        options.update(settings)
+        lines = ['[Pfad]', f'report_pfad={os.path.join(self.work_folder, "reports")}', f'local_build={int(local_build)}', '', '[Druckeinstellungen]']
+        lines += [f'{option}={int(value) if isinstance(value, bool) else value}' for option, value in options.items()]
+        lines += ['', '[Automatisch öffnen]', 'auto_open=0', 'open_all=0', f'browser_path={sys.executable}', '']
+        lines += ['[Programm wählen]', 'ewd_file=1', '']
+        lines += ['[Verlauf]', f'history={int(history)}', '']
+        lines += ['[Export]'] + [f'{option}={int(value)}' for option, value in (export or {}).items()] + ['']
+        lines += ['[Diagnose]', f'profile={int(profile)}', '']
+        os.makedirs(self.work_folder, exist_ok=True)
+        with open(os.path.join(self.work_folder, 'config.ini'), 'w', encoding='utf-8') as ini_file:
+            ini_file.write('\n'.join(lines))
+
+
+    def build_modules(self):
+        """
+        :return: module name -> fake module
+        :rtype: dict
+        """
+        host = self
+        project = self.project
+
+        nest = types.ModuleType('company.nest')
+        nest.SheetProperties = SheetProperties
+        nest.PieceProperties = PieceProperties
+
+        def get_sheets():
+            host.call('get_sheets')
+            return list(project.sheet_names)
+
+        def get_sheet_property(sheet, prop):
+            host.call('get_sheet_property')
+            return project.sheet_property(project.sheet_index[sheet], prop)
+
+        def get_pieces(sheet):
+            host.call('get_pieces')
+            i = project.sheet_index[sheet]
+            return [(i, j) for j in range(project.pieces_per_sheet)]
+
+        def get_piece_property(piece, prop):
+            host.call('get_piece_property')
+            return project.piece_property(piece[0], piece[1], prop)
+
+        def get_sheet_preview(sheet, img_path, line_width):
+            host.call('get_sheet_preview')
+            with open(img_path, 'wb') as img_file:
+                img_file.write(host.preview_bytes)
+
+        nest.get_sheets = get_sheets
+        nest.get_sheet_property = get_sheet_property
+        nest.get_pieces = get_pieces
+        nest.get_piece_property = get_piece_property
+        nest.get_sheet_preview = get_sheet_preview
+
+        cad = types.ModuleType('company.cad')
+        cad.rotate = lambda obj, x, y, angle, copy: host.call('rotate')
+
+        view = types.ModuleType('company.view')
+        view.set_std_view_eye = lambda: host.call('set_std_view_eye')
+        view.zoom_on_object = lambda obj, ratio=1: host.call('zoom_on_object')
+
+        dlg = types.ModuleType('company.dlg')
+        dlg.output_box = host.messages.append
+
+        gdb = types.ModuleType('company.gdb')
+
+        company = types.ModuleType('company')
+        company.__path__ = []
+        company.nest, company.cad, company.view, company.dlg, company.gdb = nest, cad, view, dlg, gdb
+
+        ewd = types.ModuleType('ewd')
+        ewd.groups = types.ModuleType('ewd.groups')
+        ewd.get_project_name = lambda: project.name
+        ewd.save_project = lambda path: host.call('save_project')
+
+        def open_project(path):   #every project file opens the same synthetic project under its own name
+            host.call('open_project')
+            project.name = os.path.basename(path)
+
+        ewd.open_project = open_project
+
+        def explode_file_path(path):
+            if path.lower().endswith('config.ini'):
+                return os.path.join(host.work_folder, 'config.ini')
+            return host.work_folder
+
+        ewd.explode_file_path = explode_file_path
+
+        sclcore = types.ModuleType('sclcore')
+        sclcore.do_debug = lambda: None
+        sclcore.execute_command_bool = lambda command: host.call(command) or True
+
+        confdlg = types.ModuleType('confdlg')
+        confdlg.ConfigParamType = types.SimpleNamespace(BOOLEAN='bool', DIRECTORY='dir', FILE='file', INTEGER='int', STRING='str')
+        confdlg.ConfigHelperINI = type('ConfigHelperINI', (), {
+            '__init__': lambda self, *args, **kwargs: None,
+            'add_parameter': lambda self, *args: None,
+            'run': lambda self: None,
+        })
+
+        return {
+            'company': company, 'company.nest': nest, 'company.cad': cad, 'company.view': view,
+            'company.dlg': dlg, 'company.gdb': gdb, 'ewd': ewd, 'ewd.groups': ewd.groups,
+            'sclcore': sclcore, 'confdlg': confdlg,
+        }
+
+
+    def install(self):
+        """
+        Puts the fake modules into sys.modules, so that "from company import nest" etc. imports them.
+        """
+        sys.modules.update(self.modules)
+
+
+def load_nesting_report():
+    """
+    Loads Nesting-report.py (its file name is not a valid module name) against the installed fake modules.
+
+    :return: the loaded module
+    :rtype: module
+    """
+    folder = os.path.dirname(NESTING_REPORT_PATH)
+    if folder not in sys.path:
+        sys.path.insert(0, folder)   #for "import config"
+    spec = importlib.util.spec_from_file_location('nesting_report', NESTING_REPORT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
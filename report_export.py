@@ -0,0 +1,250 @@
+"""
+Machine-readable export of the nesting report ([Export] in config.ini), e.g. for the MES or ERP: one row for every sheet,
+for every piece and for every material-thickness group (the numbers of the GEB), as CSV, JSON Lines and/or Parquet.
+The sheets and pieces are written while they stream through the report pipeline, so nothing is collected in memory
+(the Parquet files are written in row groups of PARQUET_ROW_GROUP rows).
+
+The files are written into the project folder: <project>_sheets.csv, <project>_pieces.csv, <project>_groups.csv, ...
+"""
+import os
+import csv
+import json
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:   #optional: without pyarrow there is no Parquet export
+    pyarrow = None
+
+
+PARQUET_ROW_GROUP = 50000   #rows that are buffered, before they are written as one row group of the Parquet file
+EXPORT_WRITE_BUFFER = 1024 * 1024   #bytes, the CSV and JSON Lines files are flushed in chunks of this size
+
+#(column name, type) of the exported tables; the types are those of the Parquet files
+SHEET_COLUMNS = (
+    ('sheet', 'string'),
+    ('material', 'string'),
+    ('thickness', 'float64'),
+    ('width', 'float64'),
+    ('height', 'float64'),
+    ('area', 'float64'),   # m²
+    ('pieces', 'int64'),
+    ('reusable', 'float64'),   # % of the sheet
+    ('leftover', 'float64'),   # % of the sheet
+    ('count', 'int64'),   #number of identical sheets, that this row stands for (see dedupe_layouts)
+)
+PIECE_COLUMNS = (
+    ('sheet', 'string'),
+    ('material', 'string'),
+    ('thickness', 'float64'),
+    ('piece', 'string'),
+    ('width', 'float64'),
+    ('height', 'float64'),
+    ('x', 'float64'),
+    ('y', 'float64'),
+)
+GROUP_COLUMNS = (
+    ('material', 'string'),
+    ('thickness', 'float64'),
+    ('sheets', 'int64'),
+    ('area', 'float64'),   # m²
+    ('average_reusable', 'float64'),   # % per sheet
+    ('average_garbage', 'float64'),   # % per sheet
+    ('reusable_area', 'float64'),   # m²
+    ('non_reusable_area', 'float64'),   # m²
+)
+
+
+class CsvExportWriter:
+    """
+    Writes the rows of one table into a CSV file (comma separated, with a header row).
+    """
+
+    extension = '.csv'
+
+    def __init__(self, path, columns):
+        """
+        :param path: the path of the file
+        :type path: str
+        :param columns: (column name, type) of the table
+        :type columns: tuple
+        """
+        self.file = open(path, 'w', encoding='utf-8', newline='', buffering=EXPORT_WRITE_BUFFER)
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(name for name, _ in columns)
+
+
+    def write_rows(self, rows):
+        """
+        :param rows: the rows, every one a tuple in the order of the columns
+        :type rows: iterable of tuple
+        """
+        self.writer.writerows(rows)
+
+
+    def close(self):
+        self.file.close()
+
+
+class JsonLinesExportWriter:
+    """
+    Writes the rows of one table into a JSON Lines file: one JSON object per row.
+    """
+
+    extension = '.jsonl'
+
+    def __init__(self, path, columns):
+        """
+        :param path: the path of the file
+        :type path: str
+        :param columns: (column name, type) of the table
+        :type columns: tuple
+        """
+        self.file = open(path, 'w', encoding='utf-8', buffering=EXPORT_WRITE_BUFFER)
+        self.names = [name for name, _ in columns]
+
+
+    def write_rows(self, rows):
+        """
+        :param rows: the rows, every one a tuple in the order of the columns
+        :type rows: iterable of tuple
+        """
+        names = self.names
+        self.file.writelines(json.dumps(dict(zip(names, row)), ensure_ascii=False) + '\n' for row in rows)
+
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetExportWriter:
+    """
+    Writes the rows of one table into a Parquet file (needs pyarrow). The rows are buffered column by column
+    and written as a row group, whenever PARQUET_ROW_GROUP rows are collected.
+    """
+
+    extension = '.parquet'
+
+    def __init__(self, path, columns):
+        """
+        :param path: the path of the file
+        :type path: str
+        :param columns: (column name, type) of the table
+        :type columns: tuple
+        """
+        self.schema = pyarrow.schema([(name, getattr(pyarrow, column_type)()) for name, column_type in columns])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        self.columns = [[] for _ in columns]
+        self.rows = 0
+
+
+    def write_rows(self, rows):
+        """
+        :param rows: the rows, every one a tuple in the order of the columns
+        :type rows: iterable of tuple
+        """
+        for row in rows:
+            for column, value in zip(self.columns, row):
+                column.append(value)
+            self.rows += 1
+        if self.rows >= PARQUET_ROW_GROUP:
+            self.flush()
+
+
+    def flush(self):
+        if self.rows:
+            self.writer.write_table(pyarrow.Table.from_arrays(
+                [pyarrow.array(column, type=field.type) for column, field in zip(self.columns, self.schema)], schema=self.schema))
+            self.columns = [[] for _ in self.columns]
+            self.rows = 0
+
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+EXPORT_WRITERS = {'csv': CsvExportWriter, 'jsonl': JsonLinesExportWriter, 'parquet': ParquetExportWriter}
+
+
+class ReportExporter:
+    """
+    The export files of one report run: a writer for every table (sheets, pieces, groups) and every format.
+
+    Attributes:
+        folder (str): the folder of the files
+        file_names (list): the names of the export files
+        writers (dict): table name -> list of the writers of this table
+    """
+
+    def __init__(self, folder, project_name, formats):
+        """
+        Creates the export files.
+
+        :param folder: the folder of the files (the project folder)
+        :type folder: str
+        :param project_name: the name of the project, the file names start with it
+        :type project_name: str
+        :param formats: the formats, keys of EXPORT_WRITERS (e.g. ['csv', 'parquet'])
+        :type formats: list
+        """
+        self.folder = folder
+        self.file_names = []
+        self.writers = {'sheets': [], 'pieces': [], 'groups': []}
+        tables = {'sheets': SHEET_COLUMNS, 'pieces': PIECE_COLUMNS, 'groups': GROUP_COLUMNS}
+
+        try:
+            for export_format in formats:
+                writer_class = EXPORT_WRITERS[export_format]
+                for table, columns in tables.items():
+                    file_name = f"{project_name}_{table}{writer_class.extension}"
+                    self.writers[table].append(writer_class(os.path.join(folder, file_name), columns))
+                    self.file_names.append(file_name)
+        except BaseException:
+            self.close()
+            raise
+
+
+    def add_sheet(self, snapshot, count, pieces):
+        """
+        Writes the row of one sheet (or of count identical sheets) and the rows of its pieces.
+
+        :param snapshot: the snapshot of the sheet
+        :type snapshot: SheetSnapshot
+        :param count: the number of identical sheets with this snapshot
+        :type count: int
+        :param pieces: the pieces of the sheet
+        :type pieces: PieceTable
+        """
+        sheet, material, thickness = snapshot.sheet, snapshot.material, snapshot.thickness
+        sheet_row = (sheet, material, thickness, snapshot.width, snapshot.height, snapshot.area,
+                     int(snapshot.pieces_number), snapshot.mat_reusable, snapshot.mat_leftover, int(count))
+        for writer in self.writers['sheets']:
+            writer.write_rows((sheet_row,))
+        for writer in self.writers['pieces']:
+            writer.write_rows((sheet, material, thickness, str(label), width, height, x, y) for label, width, height, x, y in pieces)   #the piece column is a string, also for numeric labels
+
+
+    def add_groups(self, materials_stats_list):
+        """
+        Writes the rows of the material-thickness groups.
+
+        :param materials_stats_list: the totals of the groups
+        :type materials_stats_list: list of MaterialStats
+        """
+        rows = [
+            (stats.material, stats.thickness, stats.number_of_sheets, stats.total_area, stats.average_reusable,
+             stats.average_garbage, stats.total_reusable_material, stats.total_non_reusable_material)
+            for stats in materials_stats_list
+        ]
+        for writer in self.writers['groups']:
+            writer.write_rows(rows)
+
+
+    def close(self):
+        """
+        Closes all files. Can be called more than once.
+        """
+        writers, self.writers = self.writers, {table: [] for table in self.writers}
+        for table_writers in writers.values():
+            for writer in table_writers:
+                writer.close()
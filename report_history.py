@@ -0,0 +1,452 @@
+"""
+Efficiency history of the nesting reports ([Verlauf] history in config.ini): every run appends the values of its sheets
+and the totals of its material-thickness groups (the numbers of the GEB) to a SQLite database in the report folder.
+
+Besides the raw rows, the totals are summed per week and per month and material-thickness in the table trends
+while they are stored, so a trend over a year reads only a few hundred rows, no matter how many runs are stored.
+
+    python report_history.py trend --period week --material Oak
+    python report_history.py runs --project Auftrag_4711
+    python report_history.py groups --project Auftrag_4711 --csv
+    python report_history.py sheets 123
+"""
+import os
+import sys
+import csv
+import json
+import sqlite3
+import datetime
+import argparse
+
+
+HISTORY_FILE_NAME = 'efficiency_history.sqlite'   #inside general_folder, next to the reports of all projects
+HISTORY_TIMEOUT = 30   #seconds, how long a run waits for another one (e.g. of the batch mode) that is writing
+PERIODS = ('week', 'month')   #the periods of the table trends
+TREND_DAYS = 365   #the default time span of a trend
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    project TEXT NOT NULL,
+    date TEXT NOT NULL,
+    sheets INTEGER NOT NULL,
+    flags TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_project_date ON runs (project, date);
+CREATE INDEX IF NOT EXISTS runs_date ON runs (date);
+
+CREATE TABLE IF NOT EXISTS material_groups (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    project TEXT NOT NULL,
+    date TEXT NOT NULL,
+    material TEXT NOT NULL,
+    thickness REAL NOT NULL,
+    sheets INTEGER NOT NULL,
+    area REAL NOT NULL,
+    total_reusable REAL NOT NULL,
+    total_garbage REAL NOT NULL,
+    average_reusable REAL NOT NULL,
+    average_garbage REAL NOT NULL,
+    reusable_area REAL NOT NULL,
+    non_reusable_area REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS material_groups_project_date ON material_groups (project, date);
+CREATE INDEX IF NOT EXISTS material_groups_material_date ON material_groups (material, thickness, date);
+CREATE INDEX IF NOT EXISTS material_groups_date ON material_groups (date);
+CREATE INDEX IF NOT EXISTS material_groups_run ON material_groups (run_id);
+
+CREATE TABLE IF NOT EXISTS sheets (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    row INTEGER NOT NULL,
+    sheet TEXT NOT NULL,
+    material TEXT NOT NULL,
+    thickness REAL NOT NULL,
+    count INTEGER NOT NULL,
+    area REAL NOT NULL,
+    mat_reusable REAL NOT NULL,
+    mat_leftover REAL NOT NULL,
+    pieces_number INTEGER NOT NULL,
+    PRIMARY KEY (run_id, row)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS trends (
+    period TEXT NOT NULL,
+    start TEXT NOT NULL,
+    material TEXT NOT NULL,
+    thickness REAL NOT NULL,
+    runs INTEGER NOT NULL,
+    sheets INTEGER NOT NULL,
+    area REAL NOT NULL,
+    total_reusable REAL NOT NULL,
+    total_garbage REAL NOT NULL,
+    reusable_area REAL NOT NULL,
+    non_reusable_area REAL NOT NULL,
+    PRIMARY KEY (period, start, material, thickness)
+) WITHOUT ROWID;
+"""
+
+#the project and date of the run are copied into material_groups, so its indexes answer the queries without a join
+INSERT_GROUP = """
+INSERT INTO material_groups (run_id, project, date, material, thickness, sheets, area, total_reusable, total_garbage,
+                             average_reusable, average_garbage, reusable_area, non_reusable_area)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+INSERT_SHEET = """
+INSERT INTO sheets (run_id, row, sheet, material, thickness, count, area, mat_reusable, mat_leftover, pieces_number)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+UPSERT_TREND = """
+INSERT INTO trends (period, start, material, thickness, runs, sheets, area, total_reusable, total_garbage, reusable_area, non_reusable_area)
+VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (period, start, material, thickness) DO UPDATE SET
+    runs = runs + 1,
+    sheets = sheets + excluded.sheets,
+    area = area + excluded.area,
+    total_reusable = total_reusable + excluded.total_reusable,
+    total_garbage = total_garbage + excluded.total_garbage,
+    reusable_area = reusable_area + excluded.reusable_area,
+    non_reusable_area = non_reusable_area + excluded.non_reusable_area
+"""
+
+
+def period_start(date, period):
+    """
+    :param date: an ISO date or date and time, e.g. '2024-05-16T10:20:00'
+    :type date: str
+    :param period: 'week' or 'month'
+    :type period: str
+    :return: the first day of the week (Monday) or month of the date, e.g. '2024-05-13'
+    :rtype: str
+    """
+    day = datetime.date.fromisoformat(date[:10])
+    if period == 'week':
+        day -= datetime.timedelta(days=day.weekday())
+    elif period == 'month':
+        day = day.replace(day=1)
+    else:
+        raise ValueError(f"Unbekannter Zeitraum: {period}")
+    return day.isoformat()
+
+
+def add_filters(conditions, parameters, **filters):
+    """
+    Adds a "column = ?" (or "column >= ?" / "column < ?" for since / until) condition for every filter that is not None.
+
+    :param conditions: the conditions of the WHERE clause, extended in place
+    :type conditions: list
+    :param parameters: the parameters of the query, extended in place
+    :type parameters: list
+    :param filters: column name (or since / until, which filter the column date) -> value or None
+    """
+    for name, value in filters.items():
+        if value is None:
+            continue
+        if name == 'since':
+            conditions.append("date >= ?")
+        elif name == 'until':
+            conditions.append("date < ?")
+        else:
+            conditions.append(f"{name} = ?")
+        parameters.append(value)
+
+
+def where(conditions):
+    return f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+
+class EfficiencyHistory:
+    """
+    The history database. It can be used as a context manager, which closes the connection at the end.
+
+    Attributes:
+        path (str): the path of the SQLite file
+        connection (sqlite3.Connection): the open connection; the rows of the queries can be used like dicts
+    """
+
+    def __init__(self, path, timeout=HISTORY_TIMEOUT):
+        """
+        Opens the database and creates its tables, if they don't exist yet.
+
+        :param path: the path of the SQLite file
+        :type path: str
+        :param timeout: how long to wait for another process that is writing, in seconds
+        :type timeout: float
+        """
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=timeout)
+        self.connection.row_factory = sqlite3.Row
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def close(self):
+        self.connection.close()
+
+
+    def add_run(self, project, sheet_table, materials_stats_list, flags=None, date=None):
+        """
+        Stores one report run in one transaction: a row for the run, for every group and for every sheet,
+        and adds the group totals to the week and month of the run in trends.
+
+        :param project: the name of the project
+        :type project: str
+        :param sheet_table: the values of every sheet of the run
+        :type sheet_table: SheetTable (see Nesting-report.py)
+        :param materials_stats_list: the totals of the groups, in the order of sheet_table.groups
+        :type materials_stats_list: list of MaterialStats
+        :param flags: the config flags of the run, stored as JSON
+        :type flags: dict
+        :param date: the ISO date and time of the run (now, if None)
+        :type date: str
+        :return: the id of the run
+        :rtype: int
+        """
+        if date is None:
+            date = datetime.datetime.now().isoformat(timespec='seconds')
+        sheets_number = int(sum(sheet_table.count))
+        group_rows = [
+            (stats.material, stats.thickness, stats.number_of_sheets, stats.total_area, stats.total_reusable, stats.total_garbage,
+             stats.average_reusable, stats.average_garbage, stats.total_reusable_material, stats.total_non_reusable_material)
+            for stats in materials_stats_list
+        ]
+
+        with self.connection:
+            run_id = self.connection.execute(
+                "INSERT INTO runs (project, date, sheets, flags) VALUES (?, ?, ?, ?)",
+                (project, date, sheets_number, json.dumps(flags) if flags is not None else None)
+            ).lastrowid
+
+            self.connection.executemany(INSERT_GROUP, ((run_id, project, date) + row for row in group_rows))
+
+            groups = sheet_table.groups
+            self.connection.executemany(INSERT_SHEET, (
+                (run_id, row, sheet, groups[group_index][0], groups[group_index][1], int(count), area, mat_reusable, mat_leftover, int(pieces_number))
+                for row, (sheet, group_index, count, area, mat_reusable, mat_leftover, pieces_number) in enumerate(zip(
+                    sheet_table.sheet, sheet_table.group, sheet_table.count, sheet_table.area,
+                    sheet_table.mat_reusable, sheet_table.mat_leftover, sheet_table.pieces_number))
+            ))
+
+            for period in PERIODS:
+                start = period_start(date, period)
+                self.connection.executemany(UPSERT_TREND, (
+                    (period, start, material, thickness, sheets, area, total_reusable, total_garbage, reusable_area, non_reusable_area)
+                    for material, thickness, sheets, area, total_reusable, total_garbage, _, _, reusable_area, non_reusable_area in group_rows
+                ))
+        return run_id
+
+
+    def runs(self, project=None, since=None, until=None, limit=None):
+        """
+        :param project: only the runs of this project
+        :type project: str
+        :param since: only the runs from this ISO date on
+        :type since: str
+        :param until: only the runs before this ISO date
+        :type until: str
+        :param limit: only the latest runs
+        :type limit: int
+        :return: the runs (id, project, date, sheets, flags), the latest first
+        :rtype: list of sqlite3.Row
+        """
+        conditions, parameters = [], []
+        add_filters(conditions, parameters, project=project, since=since, until=until)
+        query = f"SELECT id, project, date, sheets, flags FROM runs{where(conditions)} ORDER BY date DESC, id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            parameters.append(limit)
+        return self.connection.execute(query, parameters).fetchall()
+
+
+    def groups(self, project=None, material=None, thickness=None, since=None, until=None):
+        """
+        :param project: only the groups of this project
+        :type project: str
+        :param material: only the groups of this material
+        :type material: str
+        :param thickness: only the groups of this thickness
+        :type thickness: float
+        :param since: only the runs from this ISO date on
+        :type since: str
+        :param until: only the runs before this ISO date
+        :type until: str
+        :return: the totals of the groups of every run, in the order of the runs
+        :rtype: list of sqlite3.Row
+        """
+        conditions, parameters = [], []
+        add_filters(conditions, parameters, project=project, material=material, thickness=thickness, since=since, until=until)
+        query = f"SELECT * FROM material_groups{where(conditions)} ORDER BY date, run_id, material, thickness"
+        return self.connection.execute(query, parameters).fetchall()
+
+
+    def sheets(self, run_id):
+        """
+        :param run_id: the id of the run
+        :type run_id: int
+        :return: the sheets of the run, in the order of the report
+        :rtype: list of sqlite3.Row
+        """
+        return self.connection.execute("SELECT * FROM sheets WHERE run_id = ? ORDER BY row", (run_id,)).fetchall()
+
+
+    def trend(self, period='week', material=None, thickness=None, since=None, until=None, by_thickness=True):
+        """
+        The efficiency per week or month, from the totals summed in trends (so it doesn't depend on the number of stored runs).
+        The averages are per sheet, like in the GEB.
+
+        :param period: 'week' or 'month'
+        :type period: str
+        :param material: only this material
+        :type material: str
+        :param thickness: only this thickness
+        :type thickness: float
+        :param since: only the periods from this ISO date on (default: TREND_DAYS ago)
+        :type since: str
+        :param until: only the periods before the period of this ISO date
+        :type until: str
+        :param by_thickness: whether every thickness of a material gets its own rows (True) or they are summed (False)
+        :type by_thickness: bool
+        :return: start, material, thickness (only by_thickness), runs, sheets, area, average_reusable, average_garbage,
+            reusable_area and non_reusable_area of every period and material (-thickness), ordered by material and start
+        :rtype: list of sqlite3.Row
+        """
+        if period not in PERIODS:
+            raise ValueError(f"Unbekannter Zeitraum: {period}")
+        if since is None:
+            since = (datetime.date.today() - datetime.timedelta(days=TREND_DAYS)).isoformat()
+
+        conditions, parameters = ["period = ?", "start >= ?"], [period, period_start(since, period)]
+        if until is not None:
+            conditions.append("start < ?")
+            parameters.append(period_start(until, period))   #like since, a whole period: none that ends after until
+        add_filters(conditions, parameters, material=material, thickness=thickness)
+
+        group_columns = "material, thickness" if by_thickness else "material"
+        query = f"""
+            SELECT start, {group_columns}, SUM(runs) AS runs, SUM(sheets) AS sheets, SUM(area) AS area,
+                   SUM(total_reusable) / SUM(sheets) AS average_reusable, SUM(total_garbage) / SUM(sheets) AS average_garbage,
+                   SUM(reusable_area) AS reusable_area, SUM(non_reusable_area) AS non_reusable_area
+            FROM trends{where(conditions)}
+            GROUP BY {group_columns}, start
+            ORDER BY {group_columns}, start
+        """
+        return self.connection.execute(query, parameters).fetchall()
+
+
+def record_run(path, project, sheet_table, materials_stats_list, flags=None):
+    """
+    Stores one report run in the history database (see EfficiencyHistory.add_run()).
+
+    :return: the id of the run
+    :rtype: int
+    """
+    with EfficiencyHistory(path) as history:
+        return history.add_run(project, sheet_table, materials_stats_list, flags)
+
+
+def print_rows(rows, as_csv):
+    """
+    Prints the rows of a query as an aligned table or as CSV.
+
+    :param rows: the rows
+    :type rows: list of sqlite3.Row
+    :param as_csv: whether CSV (semicolon separated, for Excel) is printed
+    :type as_csv: bool
+    """
+    if not rows:
+        print("Keine Einträge gefunden.")
+        return
+    columns = rows[0].keys()
+    if as_csv:
+        writer = csv.writer(sys.stdout, delimiter=';', lineterminator='\n')
+        writer.writerow(columns)
+        writer.writerows(tuple(row) for row in rows)
+        return
+
+    def cell(value):
+        return f"{value:.2f}" if isinstance(value, float) else str(value)
+
+    table = [columns] + [[cell(value) for value in row] for row in rows]
+    widths = [max(len(line[i]) for line in table) for i in range(len(columns))]
+    for line in table:
+        print('  '.join(value.rjust(width) for value, width in zip(line, widths)))
+
+
+def default_history_path():
+    """
+    :return: the history database in [Pfad] report_pfad of config.ini, or None if the config can't be read
+    :rtype: str
+    """
+    import batch_report   #only here: loading the report needs the host modules
+    settings = batch_report.load_nesting_report().read_config_ini()
+    if settings is None:
+        return None
+    return os.path.join(settings.general_folder, HISTORY_FILE_NAME)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', help=f'path of the database (default: {HISTORY_FILE_NAME} in the report folder)')
+    parser.add_argument('--csv', action='store_true', help='print CSV instead of a table')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    trend = commands.add_parser('trend', help='efficiency per week or month')
+    trend.add_argument('--period', choices=PERIODS, default='week')
+    trend.add_argument('--material')
+    trend.add_argument('--thickness', type=float)
+    trend.add_argument('--since', help=f'ISO date (default: {TREND_DAYS} days ago)')
+    trend.add_argument('--until', help='ISO date')
+    trend.add_argument('--all-thicknesses', action='store_true', help='sum the thicknesses of every material')
+
+    runs = commands.add_parser('runs', help='the stored runs, the latest first')
+    runs.add_argument('--project')
+    runs.add_argument('--since')
+    runs.add_argument('--until')
+    runs.add_argument('--limit', type=int, default=50)
+
+    groups = commands.add_parser('groups', help='the totals of the material-thickness groups of every run')
+    groups.add_argument('--project')
+    groups.add_argument('--material')
+    groups.add_argument('--thickness', type=float)
+    groups.add_argument('--since')
+    groups.add_argument('--until')
+
+    sheets = commands.add_parser('sheets', help='the sheets of one run')
+    sheets.add_argument('run_id', type=int)
+
+    args = parser.parse_args(argv)
+
+    path = args.db or default_history_path()
+    if path is None:
+        return 1
+    if not os.path.isfile(path):
+        print(f"Die Verlaufsdatenbank '{path}' existiert nicht.")
+        return 1
+
+    with EfficiencyHistory(path) as history:
+        if args.command == 'trend':
+            rows = history.trend(args.period, args.material, args.thickness, args.since, args.until, by_thickness=not args.all_thicknesses)
+        elif args.command == 'runs':
+            rows = history.runs(args.project, args.since, args.until, args.limit)
+        elif args.command == 'groups':
+            rows = history.groups(args.project, args.material, args.thickness, args.since, args.until)
+        else:
+            rows = history.sheets(args.run_id)
+    print_rows(rows, args.csv)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,253 @@
+"""
+Upload of a report, that was built on the fast local storage ([Pfad] local_build in config.ini), into report_pfad,
+which is often a network share: instead of thousands of small writes while the report is built (the appends of the
+HTML files, every preview, every PDF), the finished files are copied in large sequential writes on a background thread.
+
+The files are copied into ".<project>.upload" next to the project folder; every copy is read back and compared by size
+and SHA-256 checksum. The verified files are noted in a journal in that folder, so an interrupted upload resumes where
+it stopped (at the next attempt or the next run): verified files with the same checksum are skipped, a partially
+copied file is continued from its end. When all files are verified, the folder can replace the project folder.
+
+The journal is published with the folder, so the next run knows the checksums of the files in the project folder:
+a file that is unchanged (e.g. the previews and the PDFs of the groups, that the incremental mode didn't regenerate)
+isn't uploaded again, it's hard-linked from the project folder into the upload folder on the same share. The project
+folder isn't changed by that, so it keeps the complete old report until the upload folder replaces it. If the share
+doesn't support hard links, the file is uploaded as usual.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+
+
+UPLOAD_FOLDER_MARK = '.upload'   #the files are uploaded into ".<project>.upload" next to the project folder
+UPLOAD_JOURNAL_NAME = '.upload_journal.json'   #inside the upload folder: relative path -> [size, checksum] of the verified files
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024   #bytes, the files are read, written and verified in chunks of this size
+UPLOAD_RETRIES = 3   #attempts per file; after a network error the next attempt continues the partial file
+UPLOAD_RETRY_DELAY = 2.0   #seconds between the attempts
+UPLOAD_JOURNAL_INTERVAL = 32   #files, after which the journal is saved (and at the end of the upload)
+
+
+def file_checksum(path, offset=0, checksum=None):
+    """
+    Reads the file in chunks and returns its size and SHA-256 checksum.
+
+    :param path: the path of the file
+    :type path: str
+    :param offset: the position where the reading starts; the bytes before it are already in checksum
+    :type offset: int
+    :param checksum: the checksum of the first offset bytes (hashlib object), if offset is not 0
+    :return: the size of the file and the hex digest of its checksum
+    :rtype: tuple (int, str)
+    """
+    checksum = checksum or hashlib.sha256()
+    size = offset
+    with open(path, 'rb') as source:
+        source.seek(offset)
+        while True:
+            chunk = source.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            checksum.update(chunk)
+            size += len(chunk)
+    return size, checksum.hexdigest()
+
+
+class ReportUploader:
+    """
+    Uploads the files of a local report folder into the upload folder next to the remote project folder,
+    in a background thread. The host thread starts it with start() and collects the result with wait().
+
+    Attributes:
+        local_folder (str): the folder of the finished report on the local storage
+        remote_folder (str): the project folder in report_pfad
+        upload_folder (str): the folder the files are uploaded into (".<project>.upload" next to remote_folder)
+        uploaded (int): the number of the copied files
+        skipped (int): the number of the files, that were already verified by an earlier attempt
+        reused (int): the number of the files, that were linked from the project folder instead of uploaded
+        uploaded_bytes (int): the bytes written to remote_folder
+        errors (list): (relative path, exception) of every file, that couldn't be uploaded
+    """
+
+    def __init__(self, local_folder, remote_folder):
+        """
+        :param local_folder: the folder of the finished report on the local storage
+        :type local_folder: str
+        :param remote_folder: the project folder in report_pfad
+        :type remote_folder: str
+        """
+        self.local_folder = local_folder
+        self.remote_folder = remote_folder
+        remote_general_folder, folder_name = os.path.split(remote_folder)
+        self.upload_folder = os.path.join(remote_general_folder, f".{folder_name}{UPLOAD_FOLDER_MARK}")
+        self.journal_path = os.path.join(self.upload_folder, UPLOAD_JOURNAL_NAME)
+        self.uploaded = 0
+        self.skipped = 0
+        self.reused = 0
+        self.uploaded_bytes = 0
+        self.errors = []
+        self.thread = threading.Thread(target=self.run, name='report-upload')
+
+
+    def start(self):
+        self.thread.start()
+
+
+    def wait(self):
+        """
+        Waits until the upload is finished.
+
+        :return: (relative path, exception) of every file, that couldn't be uploaded; empty if the upload folder is complete
+        :rtype: list
+        """
+        self.thread.join()
+        return self.errors
+
+
+    def run(self):
+        try:
+            self.upload()
+        except Exception as e:   #e.g. the share isn't reachable: reported by wait()
+            self.errors.append(('', e))
+
+
+    def upload(self):
+        """
+        Uploads all files of the local folder, except those the project folder already has, removes the files 
+        of earlier attempts that aren't part of the report anymore, and saves the journal (for the next attempt, 
+        or published with the folder for the next run).
+        """
+        os.makedirs(self.upload_folder, exist_ok=True)
+        journal = self.load_journal(self.journal_path)
+        published_journal = self.load_journal(os.path.join(self.remote_folder, UPLOAD_JOURNAL_NAME))
+
+        files = []
+        for root, _, names in os.walk(self.local_folder):
+            files += [os.path.relpath(os.path.join(root, name), self.local_folder) for name in names]
+
+        for counter, relative_path in enumerate(files, 1):
+            try:
+                self.upload_file(relative_path, journal, published_journal)
+            except OSError as e:
+                self.errors.append((relative_path, e))
+            if counter % UPLOAD_JOURNAL_INTERVAL == 0:
+                self.save_journal(journal)
+
+        keep = set(files)
+        keep.add(UPLOAD_JOURNAL_NAME)
+        for root, _, names in os.walk(self.upload_folder):
+            for name in names:
+                path = os.path.join(root, name)
+                if os.path.relpath(path, self.upload_folder) not in keep:
+                    os.remove(path)
+
+        self.save_journal(journal)
+
+
+    def upload_file(self, relative_path, journal, published_journal):
+        """
+        Copies one file, unless it was already verified with the same size and checksum, in the upload folder
+        or in the project folder. A partially copied file (after an interrupted attempt) is continued from its end. 
+        The copy is read back and verified; if it doesn't match, the file is copied again from the start.
+
+        :param relative_path: the path of the file relative to the folders
+        :type relative_path: str
+        :param journal: relative path -> [size, checksum] of the verified files, updated with this file
+        :type journal: dict
+        :param published_journal: relative path -> [size, checksum] of the files in the project folder
+        :type published_journal: dict
+        """
+        local_path = os.path.join(self.local_folder, relative_path)
+        remote_path = os.path.join(self.upload_folder, relative_path)
+        expected = list(file_checksum(local_path))   #the local storage is fast, the remote file is only read back once
+
+        remote_size = os.path.getsize(remote_path) if os.path.isfile(remote_path) else 0
+        if journal.get(relative_path) == expected and remote_size == expected[0]:
+            self.skipped += 1
+            return
+        journal.pop(relative_path, None)
+
+        os.makedirs(os.path.dirname(remote_path), exist_ok=True)
+        if os.path.isfile(remote_path) and os.stat(remote_path).st_nlink > 1:   #linked from the project folder by an earlier attempt: never written in place
+            os.remove(remote_path)
+            remote_size = 0
+
+        published_path = os.path.join(self.remote_folder, relative_path)
+        if published_journal.get(relative_path) == expected and os.path.isfile(published_path) and os.path.getsize(published_path) == expected[0]:
+            try:
+                if remote_size:
+                    os.remove(remote_path)
+                    remote_size = 0
+                os.link(published_path, remote_path)
+            except OSError:   #e.g. the share doesn't support hard links: uploaded below
+                pass
+            else:
+                journal[relative_path] = expected
+                self.reused += 1
+                return
+
+        offset = remote_size if remote_size < expected[0] else 0   #continue a partial copy
+        for attempt in range(UPLOAD_RETRIES):
+            try:
+                self.copy_file(local_path, remote_path, offset)
+                if list(file_checksum(remote_path)) == expected:
+                    journal[relative_path] = expected
+                    self.uploaded += 1
+                    return
+                offset = 0   #the partial copy didn't belong to this file
+            except OSError:
+                if attempt == UPLOAD_RETRIES - 1:
+                    raise
+                time.sleep(UPLOAD_RETRY_DELAY)
+                offset = os.path.getsize(remote_path) if os.path.isfile(remote_path) else 0
+                offset = offset if offset < expected[0] else 0
+        raise OSError(f"Die Prüfsumme der hochgeladenen Datei '{relative_path}' stimmt nicht überein")
+
+
+    def copy_file(self, local_path, remote_path, offset):
+        """
+        Copies the local file from offset on to the end of the remote file, in chunks of UPLOAD_CHUNK_SIZE.
+
+        :param local_path: the path of the local file
+        :type local_path: str
+        :param remote_path: the path of the remote file
+        :type remote_path: str
+        :param offset: the bytes, that the remote file already has (0: it's written from the start)
+        :type offset: int
+        """
+        with open(local_path, 'rb') as source, open(remote_path, 'r+b' if offset else 'wb') as target:
+            source.seek(offset)
+            target.seek(offset)
+            target.truncate()
+            while True:
+                chunk = source.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                target.write(chunk)
+                self.uploaded_bytes += len(chunk)
+
+
+    def load_journal(self, journal_path):
+        """
+        :param journal_path: the path of the journal (in the upload folder, or published in the project folder)
+        :type journal_path: str
+        :return: relative path -> [size, checksum] of the files verified by an earlier attempt (empty, if there is none)
+        :rtype: dict
+        """
+        try:
+            with open(journal_path, encoding='utf-8') as journal_file:
+                return json.load(journal_file)
+        except (OSError, ValueError):
+            return {}
+
+
+    def save_journal(self, journal):
+        """
+        :param journal: relative path -> [size, checksum] of the verified files
+        :type journal: dict
+        """
+        temp_path = self.journal_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as journal_file:
+            json.dump(journal, journal_file)
+        os.replace(temp_path, self.journal_path)
@@ -0,0 +1,557 @@
+"""
+Regression tests of the nesting report on the offline fake host (see fake_host.py).
+
+    python -m pytest -q
+"""
+import os
+import re
+import csv
+import json
+import tempfile
+import threading
+
+import fake_host
+import batch_report
+import report_export
+import report_history
+import report_profile
+import report_upload
+
+
+def fake_to_pdf(report_file_path, output_pdf, browser_path):
+    """
+    Stands in for the conversion with the browser: the "PDF" is a copy of the HTML file.
+    """
+    with open(report_file_path, encoding='utf-8') as html_file, open(output_pdf, 'w', encoding='utf-8') as pdf_file:
+        pdf_file.write(html_file.read())
+
+
+def make_host(work_folder, sheets_number=12, materials_number=2, pieces_per_sheet=20, **project_options):
+    """
+    :return: a fake host with a synthetic project, that works in work_folder
+    :rtype: fake_host.FakeHost
+    """
+    project = fake_host.generate_project(sheets_number, materials_number, pieces_per_sheet, **project_options)
+    return fake_host.FakeHost(project, str(work_folder))
+
+
+def load_report(host, **config):
+    """
+    Writes config.ini (see FakeHost.write_config()) and loads Nesting-report.py on the fake host, 
+    so a test can replace a part of it before the run.
+
+    :return: the loaded Nesting-report module
+    :rtype: module
+    """
+    host.write_config(**config)
+    host.install()
+    nesting_report = fake_host.load_nesting_report()
+    nesting_report.to_pdf = fake_to_pdf
+    nesting_report.pypdf = None   #the same output, whether pypdf is installed or not
+    return nesting_report
+
+
+def run_report(host, **config):
+    """
+    Runs the whole report on the fake host (see load_report()).
+
+    :return: the loaded Nesting-report module and the result of nesting_report()
+    :rtype: tuple
+    """
+    nesting_report = load_report(host, **config)
+    return nesting_report, nesting_report.nesting_report()
+
+
+def report_folder(host):
+    """
+    :return: the project folder of the report in report_pfad
+    :rtype: str
+    """
+    return os.path.join(host.work_folder, 'reports', 'Report_new', os.path.splitext(host.project.name)[0])
+
+
+def test_batch_reports_the_projects_in_this_process(tmp_path, monkeypatch):
+    host = make_host(tmp_path, sheets_number=4)
+    host.write_config()
+    host.install()
+    monkeypatch.setattr(batch_report, '_session', None)
+    batch_report.start_session()
+    batch_report._session[0].to_pdf = fake_to_pdf
+
+    results = batch_report.run_batch([str(tmp_path / 'a.ewd'), str(tmp_path / 'b.ewd')])
+
+    assert [result['ok'] for result in results] == [True, True], results
+    assert {result['worker'] for result in results} == {os.getpid()}   #no worker process, the host session of this process
+    assert [result['sheets'] for result in results] == [4, 4]
+    for name in ('a', 'b'):
+        assert os.path.isfile(os.path.join(host.work_folder, 'reports', 'Report_new', name, f'{name}.pdf'))
+
+
+def test_host_calls_per_sheet(tmp_path):
+    sheets, pieces = 10, 20
+    host = make_host(tmp_path, sheets_number=sheets, pieces_per_sheet=pieces)
+    run_report(host)
+
+    assert host.calls['get_piece_property'] == sheets * pieces * 5   #label, size and position, for the preview cache key
+    #per sheet: 8 properties, the pieces, zoom and preview; once: the sheets and the view
+    assert sum(host.calls.values()) == sheets * (pieces * 5 + 8 + 3) + 2
+
+    host.calls.clear()   #the second run takes the previews from the cache
+    run_report(host)
+    assert host.calls['get_sheet_preview'] == 0
+    assert host.calls['get_piece_property'] == sheets * pieces * 5
+
+
+def test_preview_cache_tells_the_piece_positions_apart(tmp_path):
+    host = make_host(tmp_path, sheets_number=2, pieces_per_sheet=4, layouts_number=1)   #two identical sheets
+    project = host.project
+    piece_property = project.piece_property
+
+    def piece_property_swapped(i, j, prop):   #on the second sheet the first two pieces trade places
+        if i == 1 and j < 2 and prop in (fake_host.PieceProperties.POS_X, fake_host.PieceProperties.POS_Y):
+            j = 1 - j
+        return piece_property(i, j, prop)
+
+    project.piece_property = piece_property_swapped
+    run_report(host)
+    assert host.calls['get_sheet_preview'] == 2
+
+    host.calls.clear()
+    project.piece_property = piece_property   #now both sheets have the same layout: the second one is taken from the cache
+    run_report(host)
+    assert host.calls['get_sheet_preview'] == 0
+
+
+def test_piece_positions_are_read_for_the_vector_preview(tmp_path):
+    host = make_host(tmp_path, sheets_number=4, pieces_per_sheet=5)
+    run_report(host, svg_preview=True)
+    assert host.calls['get_piece_property'] == 4 * 5 * 5
+    assert host.calls['get_sheet_preview'] == 0
+
+
+def test_divided_report_reports_the_groups_after_a_render_error(tmp_path):
+    host = make_host(tmp_path, sheets_number=12, materials_number=2)   #4 groups, Sheet_2 is the first sheet of the second one
+    nest = host.modules['company.nest']
+    get_sheet_preview = nest.get_sheet_preview
+
+    def get_sheet_preview_failing(sheet, img_path, line_width):
+        if sheet == 'Sheet_2':
+            raise RuntimeError('Vorschau fehlgeschlagen')
+        get_sheet_preview(sheet, img_path, line_width)
+
+    nest.get_sheet_preview = get_sheet_preview_failing
+    nesting_report, sheet_table = run_report(host, divide_material=True)
+
+    assert len(sheet_table.groups) == 4
+    errors = [message for message in host.messages if message.startswith('Fehler beim Erstellen der PDF-Datei(en)')]
+    assert len(errors) == 1 and 'Vorschau fehlgeschlagen' in errors[0]
+    folder = report_folder(host)
+    for material_and_thickness in sheet_table.groups:   #every group is converted or named in the error report
+        group_pdf = f"Synthetic_12_{nesting_report.get_group_key(*material_and_thickness)}.pdf"
+        assert os.path.isfile(os.path.join(folder, group_pdf)) or group_pdf in errors[0]
+    assert os.path.isfile(os.path.join(folder, 'Gesamteffizienbericht_Synthetic_12.pdf'))
+
+
+def test_divided_report_streams_the_sheets(tmp_path):
+    sheets = 12
+    host = make_host(tmp_path, sheets_number=sheets, materials_number=2)   #the 4 groups take turns, Sheet_9 is the last one of the first group
+    nest = host.modules['company.nest']
+    get_sheet_preview = nest.get_sheet_preview
+    snapshots_before_preview = []
+    group_converted = threading.Event()
+    converted_before_last_preview = []
+
+    def get_sheet_preview_counting(sheet, img_path, line_width):
+        snapshots_before_preview.append((host.calls['get_sheet_property'] - 2 * sheets) // 6)   #material and thickness are read first
+        if sheet == f'Sheet_{sheets}':   #the first group is converted, while the last sheet is still rendered
+            converted_before_last_preview.append(group_converted.wait(5))
+        get_sheet_preview(sheet, img_path, line_width)
+
+    def to_pdf_signalling(report_file_path, output_pdf, browser_path):
+        fake_to_pdf(report_file_path, output_pdf, browser_path)
+        group_converted.set()
+
+    nest.get_sheet_preview = get_sheet_preview_counting
+    nesting_report = load_report(host, divide_material=True)
+    nesting_report.to_pdf = to_pdf_signalling
+    sheet_table = nesting_report.nesting_report()
+
+    assert snapshots_before_preview[0] < sheets   #the first page is rendered before the last sheet is read
+    assert converted_before_last_preview == [True]
+    assert host.calls['get_sheet_property'] == sheets * 8   #the groups read in advance cost no extra host calls
+    folder = report_folder(host)
+    for material_and_thickness in sheet_table.groups:
+        assert os.path.isfile(os.path.join(folder, f"Synthetic_12_{nesting_report.get_group_key(*material_and_thickness)}.pdf"))
+    assert not host.messages
+
+    run_report(host, divide_material=True, incremental=True)
+    run_report(host, divide_material=True, incremental=True)
+    assert not host.messages
+
+
+def read_csv_rows(path):
+    """
+    :return: the rows of an export file, without the header
+    :rtype: list of dict
+    """
+    with open(path, encoding='utf-8', newline='') as csv_file:
+        return list(csv.DictReader(csv_file))
+
+
+def test_export_has_every_sheet_with_dedupe(tmp_path):
+    sheets, pieces = 12, 5
+    host = make_host(tmp_path, sheets_number=sheets, pieces_per_sheet=pieces, layouts_number=2)
+    run_report(host, dedupe_layouts=True, export={'export_csv': True})
+
+    assert host.calls['get_sheet_preview'] < sheets   #the identical sheets are still rendered on one page
+    folder = report_folder(host)
+    sheet_rows = read_csv_rows(os.path.join(folder, 'Synthetic_12_sheets.csv'))
+    assert sorted(row['sheet'] for row in sheet_rows) == sorted(f'Sheet_{i}' for i in range(1, sheets + 1))
+    assert {row['count'] for row in sheet_rows} == {'1'}
+    piece_rows = read_csv_rows(os.path.join(folder, 'Synthetic_12_pieces.csv'))
+    assert len(piece_rows) == sheets * pieces
+    assert {row['sheet'] for row in piece_rows} == {row['sheet'] for row in sheet_rows}
+
+
+def test_export_only_parquet_without_pyarrow_is_a_configuration_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(report_export, 'pyarrow', None)
+    host = make_host(tmp_path, sheets_number=4)
+    nesting_report, sheet_table = run_report(host, export={'export_parquet': True, 'export_only': True})
+
+    assert sheet_table is None
+    assert len(host.messages) == 1 and host.messages[0].startswith('Fehler:') and 'pyarrow' in host.messages[0]
+    assert sum(host.calls.values()) == 0   #nothing is read or written
+    assert not os.path.exists(report_folder(host))
+
+
+def test_local_build_uploads_only_the_changed_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path / 'local'))
+    host = make_host(tmp_path / 'work', sheets_number=6)
+
+    def upload_info():
+        with open(os.path.join(report_folder(host), report_profile.PROFILE_FILE_NAME), encoding='utf-8') as profile_file:
+            return json.load(profile_file)
+
+    run_report(host, local_build=True, profile=True)
+    first = upload_info()
+    assert first['uploaded_files'] > 0 and first['reused_files'] == 0
+
+    run_report(host, local_build=True, profile=True)   #the same report: every file is already in the project folder
+    second = upload_info()
+    assert second['uploaded_files'] == 0 and second['uploaded_bytes'] == 0
+    assert second['reused_files'] == first['uploaded_files']
+    assert not host.messages
+    published = set(os.listdir(report_folder(host)))
+    assert {'Synthetic_6.pdf', 'Synthetic_6.html', report_upload.UPLOAD_JOURNAL_NAME} <= published
+
+
+def test_combined_report_has_one_project_header(tmp_path):
+    host = make_host(tmp_path, sheets_number=6)
+    nesting_report, sheet_table = run_report(host, divide_material=True, combined_report=True, reports_pdfs_together=True)
+
+    with open(os.path.join(report_folder(host), 'Synthetic_6.html'), encoding='utf-8') as html_file:
+        combined = html_file.read()
+    assert len(sheet_table.groups) == 4
+    assert 'Projekt: Synthetic_6_' not in combined   #no header of a group
+    assert combined.count('Projekt: Synthetic_6 ') == 6 + 1   #the page header of every sheet and one GEB header
+    assert combined.count('<HEADER style="display: block;') == 1   #the GEB header
+    assert combined.count('Gesamtwirkungsgradbericht') == 4   #every group is still followed by its GEB
+    with open(os.path.join(report_folder(host), 'Synthetic_6_Material_1_19.0.html'), encoding='utf-8') as html_file:
+        assert 'Projekt: Synthetic_6_' not in html_file.read()   #the pages are shared with the reports of the groups
+
+
+def test_combined_report_joins_the_group_pdfs(tmp_path):
+    host = make_host(tmp_path, sheets_number=6)
+    nesting_report = load_report(host, divide_material=True, combined_report=True)
+    nesting_report.pypdf = object()   #only needed by concatenate_pdfs()
+    conversions, concatenations = [], []
+
+    def to_pdf_counting(report_file_path, output_pdf, browser_path):
+        conversions.append(os.path.basename(output_pdf))
+        fake_to_pdf(report_file_path, output_pdf, browser_path)
+
+    def concatenate_pdfs(input_pdfs, output_pdf):
+        concatenations.append(([os.path.basename(path) for path in input_pdfs], os.path.basename(output_pdf)))
+        with open(output_pdf, 'w', encoding='utf-8') as pdf_file:
+            for path in input_pdfs:
+                with open(path, encoding='utf-8') as input_file:
+                    pdf_file.write(input_file.read())
+
+    nesting_report.to_pdf = to_pdf_counting
+    nesting_report.concatenate_pdfs = concatenate_pdfs
+    sheet_table = nesting_report.nesting_report()
+
+    group_pdfs = [f"Synthetic_6_{nesting_report.get_group_key(*material_and_thickness)}.pdf" for material_and_thickness in sheet_table.groups]
+    assert concatenations == [(group_pdfs, 'Synthetic_6.pdf')]
+    assert 'Synthetic_6.pdf' not in conversions   #the pages are converted only once, in the PDFs of the groups
+    assert not host.messages
+    assert os.path.isfile(os.path.join(report_folder(host), 'Synthetic_6.pdf'))
+
+
+def test_export_with_combined_report_and_dedupe(tmp_path):
+    sheets, pieces = 12, 4
+    host = make_host(tmp_path, sheets_number=sheets, pieces_per_sheet=pieces, layouts_number=3)
+    nesting_report, sheet_table = run_report(host, divide_material=True, combined_report=True, dedupe_layouts=True, export={'export_csv': True})
+
+    folder = report_folder(host)
+    assert not host.messages
+    assert 0 < host.calls['get_sheet_preview'] < sheets
+    assert len(read_csv_rows(os.path.join(folder, 'Synthetic_12_sheets.csv'))) == sheets
+    assert len(read_csv_rows(os.path.join(folder, 'Synthetic_12_pieces.csv'))) == sheets * pieces
+    group_rows = read_csv_rows(os.path.join(folder, 'Synthetic_12_groups.csv'))
+    assert len(group_rows) == len(sheet_table.groups) and sum(int(row['sheets']) for row in group_rows) == sheets
+    with open(os.path.join(folder, 'Synthetic_12.html'), encoding='utf-8') as html_file:
+        assert html_file.read().count('Projekt: Synthetic_12 ') == host.calls['get_sheet_preview']   #one page per distinct layout
+
+
+def test_failed_publish_keeps_the_project_folder_complete(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path / 'local'))
+    host = make_host(tmp_path / 'work', sheets_number=6)
+    run_report(host, local_build=True)
+    folder = report_folder(host)
+    published = {name: os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder)}
+
+    nesting_report = load_report(host, local_build=True)
+    publish_report_folder = nesting_report.publish_report_folder
+
+    def publish_failing_upload(build_folder, folder, show_warning_delete_folder):
+        if build_folder.endswith(report_upload.UPLOAD_FOLDER_MARK):   #the share refuses the swap
+            return build_folder
+        return publish_report_folder(build_folder, folder, show_warning_delete_folder)
+
+    nesting_report.publish_report_folder = publish_failing_upload
+    nesting_report.nesting_report()
+    assert {name: os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder)} == published
+
+
+def test_dedupe_keeps_only_the_counts_of_the_layouts(tmp_path):
+    nesting_report = load_report(make_host(tmp_path, sheets_number=9, pieces_per_sheet=4, layouts_number=3))
+    piece_tables = nesting_report.PieceTableCache()
+    snapshots = nesting_report.iter_sheet_snapshots(nesting_report.nest.get_sheets())
+
+    layouts = list(nesting_report.collapse_identical_layouts(((snapshot, 1, None) for snapshot in snapshots), False, piece_tables))
+
+    assert [(snapshot.sheet, count, pieces) for snapshot, count, pieces in layouts] == [('Sheet_1', 3, None), ('Sheet_2', 3, None), ('Sheet_3', 3, None)]
+    assert not piece_tables.tables   #the pieces are read again by the render stage
+
+
+def test_stale_folders_of_other_projects_are_kept(tmp_path):
+    host = make_host(tmp_path, sheets_number=1)
+    nesting_report = load_report(host)
+    stale = ['.Synthetic_1.deleted-1-2', '.Synthetic_1.staging-1-2']
+    kept = ['.Synthetic_10.deleted-1-2', '.Other.deleted-1-2', '.Other.staging-1-2', 'Synthetic_1']
+    for name in stale + kept:
+        (tmp_path / name).mkdir()
+
+    nesting_report.remove_stale_report_folders(str(tmp_path), 'Synthetic_1')
+    for thread in threading.enumerate():
+        if thread.name == 'report-folder-cleanup':
+            thread.join()
+    assert sorted(name for name in os.listdir(tmp_path) if name in stale + kept) == sorted(kept)
+
+
+def test_export_writes_numeric_piece_labels_as_strings(tmp_path):
+    host = make_host(tmp_path, sheets_number=2, pieces_per_sheet=3)
+    piece_property = host.project.piece_property
+
+    def numeric_label(i, j, prop):
+        if prop is fake_host.PieceProperties.LABEL:
+            return 1000 + j
+        return piece_property(i, j, prop)
+
+    host.project.piece_property = numeric_label
+    run_report(host, export={'export_jsonl': True, 'export_only': True})
+    with open(os.path.join(report_folder(host), 'Synthetic_2_pieces.jsonl'), encoding='utf-8') as jsonl_file:
+        labels = [json.loads(line)['piece'] for line in jsonl_file]
+    assert labels == ['1000', '1001', '1002'] * 2   #the type of the column is string (see PIECE_COLUMNS), like in Parquet
+
+
+def test_history_stores_the_run_and_sums_the_trend_periods(tmp_path, monkeypatch):
+    host = make_host(tmp_path / 'work', sheets_number=6)
+    recorded = []
+    record_run = report_history.record_run
+
+    def record_run_keeping_the_tables(path, project, sheet_table, materials_stats_list, flags=None):
+        recorded.append((path, sheet_table, materials_stats_list))
+        return record_run(path, project, sheet_table, materials_stats_list, flags)
+
+    monkeypatch.setattr(report_history, 'record_run', record_run_keeping_the_tables)
+    run_report(host, history=True)
+    (path, sheet_table, materials_stats_list), = recorded
+    with report_history.EfficiencyHistory(path) as history:
+        run, = history.runs(project='Synthetic_6')
+        assert run['sheets'] == 6
+        assert [row['sheet'] for row in history.sheets(run['id'])] == list(sheet_table.sheet)
+        assert len(history.groups(project='Synthetic_6')) == len(sheet_table.groups)
+
+    with report_history.EfficiencyHistory(str(tmp_path / 'trend.sqlite')) as history:
+        for date in ('2024-05-13T08:00:00', '2024-05-19T20:00:00', '2024-05-20T09:00:00', '2024-06-03T09:00:00'):
+            history.add_run('Synthetic_6', sheet_table, materials_stats_list, date=date)
+        #since and until are moved to the start of their week: the runs of Monday to Sunday are summed, the next week is left out
+        weeks = history.trend('week', since='2024-05-15', until='2024-05-22')
+        assert [(row['start'], row['material'], row['thickness'], row['runs'], row['sheets']) for row in weeks] == sorted(
+            ('2024-05-13', stats.material, stats.thickness, 2, 2 * stats.number_of_sheets) for stats in materials_stats_list)
+        months = history.trend('month', since='2024-05-31', until='2024-06-15', by_thickness=False)
+        assert {(row['start'], row['runs']) for row in months} == {('2024-05-01', 3 * 2)}   #3 runs with 2 thicknesses of every material
+
+
+def test_incremental_report_regenerates_only_the_changed_groups(tmp_path):
+    host = make_host(tmp_path, sheets_number=8)
+    sheet_property = host.project.sheet_property
+    changes = {}   #(sheet index, property) -> changed value
+
+    def changed_sheet_property(i, prop):
+        return changes.get((i, prop), sheet_property(i, prop))
+
+    host.project.sheet_property = changed_sheet_property
+
+    def converted_group_pdfs():
+        nesting_report = load_report(host, divide_material=True, incremental=True)
+        conversions = []
+
+        def to_pdf_counting(report_file_path, output_pdf, browser_path):
+            conversions.append(os.path.basename(output_pdf))
+            fake_to_pdf(report_file_path, output_pdf, browser_path)
+
+        nesting_report.to_pdf = to_pdf_counting
+        nesting_report.nesting_report()
+        assert not host.messages
+        return sorted(name for name in conversions if name.startswith('Synthetic_8_Material'))
+
+    all_groups = ['Synthetic_8_Material_1_19.0.pdf', 'Synthetic_8_Material_1_25.0.pdf', 'Synthetic_8_Material_2_19.0.pdf', 'Synthetic_8_Material_2_25.0.pdf']
+    assert converted_group_pdfs() == all_groups
+    assert converted_group_pdfs() == []   #nothing changed
+
+    changes[(0, fake_host.SheetProperties.RATE_REUSABLE)] = 33.0   #Sheet_1 is in the group Material_1_19
+    assert converted_group_pdfs() == ['Synthetic_8_Material_1_19.0.pdf']
+
+    for i in range(8):   #the sheets of Material_2 become Material_1 of the same thickness
+        changes[(i, fake_host.SheetProperties.MATERIAL)] = 'Material_1'
+    assert converted_group_pdfs() == ['Synthetic_8_Material_1_19.0.pdf', 'Synthetic_8_Material_1_25.0.pdf']
+    folder = report_folder(host)
+    assert not [name for name in os.listdir(folder) if 'Material_2' in name]   #the files of the groups, that are gone, are deleted
+    with open(os.path.join(folder, 'report_manifest.json'), encoding='utf-8') as manifest_file:
+        assert sorted(json.load(manifest_file)['groups']) == ['Material_1_19.0', 'Material_1_25.0']
+
+
+def test_aggregated_pieces_are_followed_by_the_appendix(tmp_path):
+    host = make_host(tmp_path, sheets_number=1, pieces_per_sheet=5, part_types=2)
+    run_report(host, aggregate_pieces=True, pieces_appendix=True)
+    with open(os.path.join(report_folder(host), 'Synthetic_1.html'), encoding='utf-8') as html_file:
+        html = html_file.read()
+
+    rows = re.findall(r'<TD align="middle">(Anzahl|Nr\.)</TD>\s*<TD align="middle">(\d+)</TD>\s*'
+                      r'<TD align="middle">Bezeichnung</TD>\s*<TD align="middle">([^<]*)</TD>', html)
+    assert rows == [('Anzahl', '3', 'Part_0'), ('Anzahl', '2', 'Part_1')] + [('Nr.', str(n), f'Part_{(n - 1) % 2}') for n in range(1, 6)]
+    appendix = html.index('Anhang: Teileliste Sheet_1')
+    assert html.rindex('>Anzahl<') < appendix < html.index('>Nr.<')   #the single pieces follow the aggregated rows
+
+
+def test_aggregate_pieces_sorts_by_count_or_area(tmp_path):
+    nesting_report = load_report(make_host(tmp_path, sheets_number=1))
+    pieces = nesting_report.PieceTable()
+    for label, width, height in (('A', 100, 10), ('B', 20, 20), ('C', 50, 50), ('B', 20, 20), ('B', 20, 20), ('D', 10, 10), ('D', 10, 10)):
+        pieces.append(label, width, height, 0, 0)
+
+    by_count = nesting_report.aggregate_pieces(pieces, sort_by_area=False)
+    assert [(count, label) for count, label, width, height in by_count] == [(3, 'B'), (2, 'D'), (1, 'A'), (1, 'C')]   #A and C keep the order of their pieces
+    by_area = nesting_report.aggregate_pieces(pieces, sort_by_area=True)
+    assert [label for count, label, width, height in by_area] == ['C', 'B', 'A', 'D']
+
+
+def test_summary_only_writes_the_GEB_without_previews(tmp_path):
+    host = make_host(tmp_path, sheets_number=8)
+    run_report(host, summary_only=True)
+    folder = report_folder(host)
+    assert host.calls['get_sheet_preview'] == 0
+    assert sorted(os.listdir(folder)) == ['Gesamteffizienbericht_Synthetic_8.html', 'Gesamteffizienbericht_Synthetic_8.pdf']
+    with open(os.path.join(folder, 'Gesamteffizienbericht_Synthetic_8.html'), encoding='utf-8') as html_file:
+        assert html_file.read().count('Gesamtwirkungsgradbericht') == 4   #one table per group
+
+    run_report(host)
+    full_report = os.listdir(folder)
+    previews = host.calls['get_sheet_preview']
+    run_report(host, summary_only=True)
+    assert host.calls['get_sheet_preview'] == previews
+    assert set(full_report) <= set(os.listdir(folder))   #the quick run keeps the full report of the last run
+    assert not host.messages
+
+
+def test_chunks_of_the_combined_report_have_every_page_once(tmp_path):
+    host = make_host(tmp_path, sheets_number=11)
+    nesting_report = load_report(host)
+    nesting_report.pypdf = object()   #only needed by concatenate_pdfs()
+    nesting_report.PDF_CHUNK_PAGES, nesting_report.PART_PAGES = 4, 2
+    chunks = []
+
+    def concatenate_pdfs(input_pdfs, output_pdf):
+        for path in input_pdfs:
+            with open(path, encoding='utf-8') as pdf_file:
+                chunks.append(pdf_file.read())
+
+    nesting_report.concatenate_pdfs = concatenate_pdfs
+    nesting_report.nesting_report()
+    with open(os.path.join(report_folder(host), 'Synthetic_11.html'), encoding='utf-8') as html_file:
+        report = html_file.read()
+
+    page_header = 'Projekt: Synthetic_11 '
+    assert not host.messages
+    assert [chunk.count(page_header) for chunk in chunks] == [3, 3, 3, 2]   #whole parts of the groups (3, 3, 3 and 2 sheets), at most 4 pages
+    for chunk in chunks[1:]:   #a new PDF starts with the first sheet, without a blank page before it
+        assert chunk.count(nesting_report.PAGE_BREAK_HTML) == chunk.count(page_header) - 1
+        assert chunk.index(page_header) < chunk.index(nesting_report.PAGE_BREAK_HTML)
+    assert sum(chunk.count(nesting_report.PAGE_BREAK_HTML) for chunk in chunks) == report.count(nesting_report.PAGE_BREAK_HTML) - (len(chunks) - 1)
+    assert ''.join(chunks).count(page_header) == report.count(page_header) == 11
+
+
+def test_compact_layout_starts_a_page_with_every_part(tmp_path):
+    host = make_host(tmp_path, sheets_number=20, pieces_per_sheet=2)
+    nesting_report = load_report(host, compact_layout=True)
+    nesting_report.PART_PAGES = 3
+    nesting_report.nesting_report()
+    with open(os.path.join(report_folder(host), 'Synthetic_20.html'), encoding='utf-8') as html_file:
+        pages = html_file.read().split(nesting_report.PAGE_BREAK_HTML)[1:]
+
+    assert all('Projekt: Synthetic_20 ' in page for page in pages)   #the header once per page
+    sheets_on_pages = [sorted(set(int(number) for number in re.findall(r'Sheet_(\d+)', page))) for page in pages]
+    #every group has 5 sheets (Sheet_g, g+4, ...), two fit onto a page; the 4th sheet of a group starts the 2nd part and a new page
+    assert sheets_on_pages == [page for g in range(1, 5) for page in ([g, g + 4], [g + 8], [g + 12, g + 16])]
+
+
+def test_preview_cache_evicts_the_least_recently_used_previews(tmp_path):
+    nesting_report = load_report(make_host(tmp_path / 'work', sheets_number=1))
+    cache_folder = str(tmp_path / 'cache')
+    preview_cache = nesting_report.PreviewCache(cache_folder, max_size=25)
+    for name in ('a', 'b', 'c'):
+        (tmp_path / f'{name}.jpg').write_bytes(name.encode('ascii') * 10)
+
+    preview_cache.store('a', '.jpg', str(tmp_path / 'a.jpg'))
+    preview_cache.store('b', '.jpg', str(tmp_path / 'b.jpg'))
+    assert preview_cache.fetch('a', '.jpg', str(tmp_path / 'fetched.jpg'))   #a is used again, so b is the oldest now
+    preview_cache.store('c', '.jpg', str(tmp_path / 'c.jpg'))
+
+    assert sorted(os.listdir(cache_folder)) == ['a.jpg', 'c.jpg']
+    assert preview_cache.total_size == 20
+    reopened = nesting_report.PreviewCache(cache_folder, max_size=25)   #the next run finds the previews of this one
+    assert not reopened.fetch('b', '.jpg', str(tmp_path / 'fetched.jpg'))
+    assert reopened.fetch('c', '.jpg', str(tmp_path / 'fetched.jpg'))
+    assert (tmp_path / 'fetched.jpg').read_bytes() == b'c' * 10
+
+
+def test_rotated_svg_preview_turns_the_sheet_clockwise(tmp_path):
+    nesting_report = load_report(make_host(tmp_path, sheets_number=1))
+    pieces = nesting_report.PieceTable()
+    pieces.append('P', 500, 200, 0, 0)   #in the lower left corner of the sheet (y upwards)
+    svg = nesting_report.render_svg_picture(2800, 2000, pieces, rotate=True)
+
+    assert 'viewBox="0 0 2000 2800"' in svg   #the rotated sheet is as wide as the sheet is high
+    a, b, c, d, e, f = (float(value) for value in re.search(r'transform="matrix\(([^)]*)\)"', svg).group(1).split())
+    x, y, width, height = (float(value) for value in re.search(r'<rect class="piece" x="([^"]*)" y="([^"]*)" width="([^"]*)" height="([^"]*)"', svg).groups())
+
+    def turned(x, y):
+        return a * x + c * y + e, b * x + d * y + f
+
+    assert turned(0, 0) == (2000, 0)   #the upper left corner of the sheet goes to the upper right
+    assert turned(0, 2000) == (0, 0)   #the lower left corner to the upper left
+    (x1, y1), (x2, y2) = turned(x, y), turned(x + width, y + height)
+    assert (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)) == (0, 0, 200, 500)   #so the piece is in the upper left corner, turned upright